@@ -1,8 +1,28 @@
 import os
+import json
+import time
+import base64
+import asyncio
+import uuid
+import random
+import re
+import inspect
 import functools
+import contextlib
+from bisect import bisect_left
+from contextvars import ContextVar
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from weakref import WeakKeyDictionary, WeakSet
+from urllib.parse import parse_qsl
 from typing import Any
 
-import psycopg2
+import pydantic_core
+from pydantic import AnyUrl
+from psycopg import AsyncConnection, OperationalError, errors, sql
+from psycopg.conninfo import make_conninfo, conninfo_to_dict
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from fastmcp.server.dependencies import get_context
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,64 +35,1373 @@ DB_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 DB_HOST = "postgresdb"  # This is the service name in docker-compose
 DB_PORT = "5432"
 
+# Connection pool configuration from environment variables
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+DB_POOL_CHECK_INTERVAL = float(os.getenv("DB_POOL_CHECK_INTERVAL", "30"))
+
+# Read/write split: the primary DSN (built from the settings above by default) and the
+# comma-separated replica DSNs reads are spread over. A replica whose lag, checked every
+# DB_REPLICA_CHECK_INTERVAL seconds, exceeds DB_REPLICA_MAX_LAG seconds (or that cannot be reached)
+# is skipped, and a session reads from the primary for DB_READ_YOUR_WRITES_WINDOW seconds after
+# it wrote
+DB_PRIMARY_DSN = os.getenv("DB_PRIMARY_DSN")
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(",") if dsn.strip()]
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1"))
+DB_READ_YOUR_WRITES_WINDOW = float(os.getenv("DB_READ_YOUR_WRITES_WINDOW", "5"))
+
+# Pagination configuration from environment variables
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+
+# Maximum number of data URIs resolved by a single batched fetch
+BATCH_MAX_URIS = int(os.getenv("BATCH_MAX_URIS", "50"))
+
+# Maximum number of batched lookups running at the same time, across all batched fetches, well
+# below DB_POOL_MAX_SIZE so a batch never takes the connections the other requests need
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(max(1, DB_POOL_MAX_SIZE // 3))))
+
+# Number of rows fetched per round trip when streaming large results
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+# In-process read-through cache configuration from environment variables
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", "1024"))
+
+# Cross-process cache invalidation: "local" drops entries in this process only, "postgres" also
+# broadcasts every invalidation on a LISTEN/NOTIFY channel, for servers with several workers
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "local")
+CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+
+# Resource subscriptions: the orders and products triggers of migrations/004 send the changed rows
+# on this channel, and the resources/updated notifications of a write burst are sent together,
+# once per URI, after the given delay (seconds) following the first change
+RESOURCE_CHANGES_CHANNEL = "resource_changes"
+RESOURCE_UPDATE_DELAY = float(os.getenv("RESOURCE_UPDATE_DELAY", "0.1"))
+
+# Slow-query log: every statement slower than the threshold is kept in a ring buffer of the given
+# size, and the plan of a sampled share of them is captured by replaying them
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "250"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "0.1"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+
+# Process-wide pool state: the async pool, idle timestamps and checkout wait metrics
+_pool = None
+_pool_lock = asyncio.Lock()
+_idle_since = WeakKeyDictionary()
+_pool_metrics = {"checkout_wait_seconds_max": 0.0}
+
+# Process-wide replica state: a pool per replica DSN, the last lag check of each replica and the
+# time each session last wrote to the primary
+_replica_pools = {}
+_replica_status = {}
+_replica_checks = set()
+_last_write = {}
+_read_primary = ContextVar("read_primary", default=False)
+
+# Process-wide caches, by name, the id of this process in invalidation broadcasts and the task
+# listening to the broadcasts of the other processes
+_caches = {}
+_process_id = uuid.uuid4().hex
+_invalidation_listener = None
+
+# Process-wide subscription state: the URI templates notified for each table, the sessions
+# subscribed to each URI, the URIs waiting for the next flush and the listening and flush tasks
+_change_uris = {}
+_subscriptions = {}
+_pending_updates = set()
+_change_listener = None
+_update_flush = None
+
+# Time-ordered IDs: Crockford base32 digits (lowercase), and the timestamp and random part of the
+# last ID generated by this process, so that IDs generated within one millisecond still increase
+ID_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+ID_PATTERN = re.compile(r"^[a-z]+_[0-9a-hjkmnp-tv-z]{26}$")
+_last_id = {"ms": 0, "random": 0}
+
+# Histogram buckets: seconds for latencies, rows per result and bytes per payload
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 10000, 100000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Process-wide instrumentation: histograms and counters keyed by (metric name, labels), the
+# tool or resource being served, the time the current query spent building rows and the outcome
+# of the current MCP request's handler, for record_response_size
+_histograms = {}
+_counters = {}
+_operation = ContextVar("operation", default="direct")
+_parse_seconds = ContextVar("parse_seconds", default=None)
+_response = ContextVar("response", default=None)
+
+# Process-wide slow-query log and the plan captures still running in the background
+_slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_explain_tasks = set()
+
+
+async def _mark_idle(conn):
+    """
+    Pool reset callback recording when a connection went back to the pool.
+
+    Args:
+        - conn: The psycopg connection returned to the pool.
+    """
+    # Remember the release time for the next health check
+    _idle_since[conn] = time.monotonic()
+
+
+async def _check_connection(conn):
+    """
+    Pool check callback run on every checkout.
+
+    Args:
+        - conn: The psycopg connection about to be lent.
+
+    Notes:
+        - Connections idle for less than DB_POOL_CHECK_INTERVAL are only checked locally,
+          so the hot path does not pay an extra round trip.
+        - Raising makes the pool discard the connection and try another one.
+    """
+    # A broken connection is never reused
+    if conn.broken or conn.closed:
+        raise ConnectionError("Pooled connection is no longer usable.")
+
+    # Ping connections that have been idle for a while
+    if time.monotonic() - _idle_since.get(conn, 0.0) >= DB_POOL_CHECK_INTERVAL:
+        await AsyncConnectionPool.check_connection(conn)
+
+
+def get_conninfo() -> str:
+    """
+    Builds the libpq connection string of the database (the primary).
+
+    Returns: The connection string: DB_PRIMARY_DSN if set, otherwise built from the DB_* settings.
+    """
+    # Combine the connection details from the environment
+    return DB_PRIMARY_DSN or make_conninfo(
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=DB_HOST,
+        port=DB_PORT
+    )
+
+
+async def connect(autocommit: bool = False) -> AsyncConnection:
+    """
+    Opens a dedicated connection outside of the pool, for maintenance tasks such as migrations.
+
+    Args:
+        - autocommit: Whether statements run outside of an implicit transaction.
+
+    Returns: A new psycopg AsyncConnection, to be closed by the caller.
+    """
+    # Connect with the same details as the pool
+    return await AsyncConnection.connect(get_conninfo(), autocommit=autocommit)
+
+
+async def _open_pool(conninfo: str) -> AsyncConnectionPool:
+    """
+    Opens an async connection pool with the configured size, timeout and health checks.
+
+    Args:
+        - conninfo: The connection string of the database.
+
+    Returns: The opened psycopg AsyncConnectionPool.
+    """
+    pool = AsyncConnectionPool(
+        conninfo,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        check=_check_connection,
+        reset=_mark_idle,
+        open=False,
+    )
+    await pool.open()
+    return pool
+
+
+async def get_pool() -> AsyncConnectionPool:
+    """
+    Returns the process-wide async connection pool of the primary, opening it on first use.
+
+    Returns: The opened psycopg AsyncConnectionPool.
+
+    Notes:
+        - At most DB_POOL_MAX_SIZE connections are lent at the same time; callers wait up to
+          DB_POOL_TIMEOUT seconds for a free one and get a PoolTimeout afterwards.
+    """
+    global _pool
+    # Create and open the pool only once, even with concurrent first callers
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await _open_pool(get_conninfo())
+    return _pool
+
+
+async def get_replica_pool(dsn: str) -> AsyncConnectionPool:
+    """
+    Returns the process-wide async connection pool of a replica, opening it on first use.
+
+    Args:
+        - dsn: The connection string of the replica, one of DB_REPLICA_DSNS.
+
+    Returns: The opened psycopg AsyncConnectionPool, sized like the primary one.
+    """
+    async with _pool_lock:
+        if dsn not in _replica_pools:
+            _replica_pools[dsn] = await _open_pool(dsn)
+    return _replica_pools[dsn]
+
+
+async def close_pool():
+    """
+    Closes the process-wide connection pools (primary and replicas), if they were opened.
+    """
+    global _pool
+    # Let the pending plan captures and replica checks finish, then close the pools and forget
+    # them, so the next call opens fresh ones
+    if _explain_tasks or _replica_checks:
+        await asyncio.gather(*_explain_tasks, *_replica_checks, return_exceptions=True)
+    async with _pool_lock:
+        if _pool is not None:
+            await _pool.close()
+            _pool = None
+        for pool in _replica_pools.values():
+            await pool.close()
+        _replica_pools.clear()
+        _replica_status.clear()
+
+
+@contextlib.asynccontextmanager
+async def pooled_connection(pool: AsyncConnectionPool | None = None):
+    """
+    Async context manager that lends a connection from a pool.
+
+    Args:
+        - pool: The pool to borrow from, the primary one by default.
+
+    Returns: A psycopg AsyncConnection, given back to the pool when the block exits.
+
+    Notes:
+        - The transaction is committed when the block exits normally and rolled back otherwise.
+    """
+    # Borrow a connection and record how long the caller waited for it
+    pool = pool or await get_pool()
+    start = time.perf_counter()
+    async with pool.connection() as conn:
+        waited = time.perf_counter() - start
+        _pool_metrics["checkout_wait_seconds_max"] = max(
+            _pool_metrics["checkout_wait_seconds_max"], waited
+        )
+        observe_phase("connect", waited)
+        yield conn
+
+
+def replica_name(dsn: str) -> str:
+    """
+    Names a replica by its host, port and database, without its credentials.
+    """
+    params = conninfo_to_dict(dsn)
+    return f"{params.get('host', 'localhost')}:{params.get('port', '5432')}/{params.get('dbname', '')}"
+
+
+def current_session() -> str | None:
+    """
+    Returns the id of the MCP session being served, the key of its read-your-writes window.
+
+    Returns: Over HTTP, the mcp-session-id header, or else the mcp-client-id header a client can
+        send to identify itself in stateless mode (MCP_STATELESS_HTTP=true); over other
+        transports, the id of the session; None outside of an MCP request and for HTTP requests
+        with neither header.
+
+    Notes:
+        - HTTP requests with neither header share the None key: a write keeps all such reads of
+          the worker on the primary for DB_READ_YOUR_WRITES_WINDOW seconds.
+        - The windows live in the memory of each worker, which is why main.py refuses to run
+          several workers with read replicas.
+    """
+    try:
+        context = get_context()
+        request = context.request_context.request
+    except (RuntimeError, ValueError):
+        return None
+    if request is None:
+        return context.session_id
+    return request.headers.get("mcp-session-id") or request.headers.get("mcp-client-id")
+
+
+def record_write():
+    """
+    Records that the current session just wrote to the primary, for read-your-writes.
+    """
+    # Forget the sessions whose window is over once in a while, so the map stays small
+    now = time.monotonic()
+    if len(_last_write) > 10000:
+        for session, written in list(_last_write.items()):
+            if now - written >= DB_READ_YOUR_WRITES_WINDOW:
+                del _last_write[session]
+    _last_write[current_session()] = now
+
+
+async def _check_replica(dsn: str):
+    """
+    Measures the replay lag of a replica, in seconds.
+
+    Args:
+        - dsn: The connection string of the replica.
+
+    Notes:
+        - A replica that has replayed the primary's WAL up to where it was when the check started
+          has no lag, nor has one still streaming from the primary with nothing left to replay. A
+          database that is not in recovery (not a replica) has none either.
+        - Otherwise, e.g. when its WAL receiver is disconnected and the primary moved on, the lag
+          is the age of its last replayed transaction. An unreachable replica, or one that never
+          replayed a transaction, has an infinite lag.
+        - The streaming status needs the pg_read_all_stats role; without it, only the comparison
+          with the primary's position applies.
+    """
+    try:
+        # Read the primary's WAL position first, so a replica past it is caught up
+        async with pooled_connection() as conn:
+            cursor = await conn.execute("SELECT pg_current_wal_lsn();")
+            primary_lsn = (await cursor.fetchone())[0]
+
+        # Compare the replica with it
+        pool = await get_replica_pool(dsn)
+        async with pool.connection(timeout=DB_REPLICA_CHECK_INTERVAL) as conn:
+            cursor = await conn.execute(
+                """
+                SELECT CASE
+                    WHEN NOT pg_is_in_recovery() THEN 0
+                    WHEN pg_last_wal_replay_lsn() >= %s::pg_lsn THEN 0
+                    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+                     AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming')
+                        THEN 0
+                    ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())
+                END;
+                """,
+                (primary_lsn,)
+            )
+            lag = (await cursor.fetchone())[0]
+        _replica_status[dsn] = {
+            "lag_seconds": float("inf") if lag is None else float(lag),
+            "checked_at": time.monotonic(),
+            "error": None,
+        }
+    except Exception as e:
+        mark_replica_down(dsn, e)
+
+
+def mark_replica_down(dsn: str, error: Exception):
+    """
+    Takes a replica out of the rotation until its next lag check.
+    """
+    _replica_status[dsn] = {
+        "lag_seconds": float("inf"),
+        "checked_at": time.monotonic(),
+        "error": f"{type(error).__name__}: {error}",
+    }
+
+
+async def choose_read_pool() -> tuple[AsyncConnectionPool, str | None]:
+    """
+    Chooses the pool a read runs on.
+
+    Returns: A replica pool and its DSN, or the primary pool and None when there is no replica,
+        when the read fills a cache (see cached), when the session wrote within
+        DB_READ_YOUR_WRITES_WINDOW seconds, or when no replica is within DB_REPLICA_MAX_LAG
+        seconds of the primary.
+
+    Notes:
+        - Lag checks run in the background, at most every DB_REPLICA_CHECK_INTERVAL seconds per
+          replica, so reads never wait for them; a replica is used once its first check passed.
+    """
+    # Reads of a session that just wrote stay on the primary, so it sees its own writes
+    if not DB_REPLICA_DSNS:
+        return await get_pool(), None
+    if _read_primary.get():
+        increment("db_reads_total", target="primary", reason="cache_fill")
+        return await get_pool(), None
+    written = _last_write.get(current_session())
+    if written is not None and time.monotonic() - written < DB_READ_YOUR_WRITES_WINDOW:
+        increment("db_reads_total", target="primary", reason="read_your_writes")
+        return await get_pool(), None
+
+    # Refresh the lag of the replicas not checked recently, in the background
+    now = time.monotonic()
+    for dsn in DB_REPLICA_DSNS:
+        status = _replica_status.setdefault(
+            dsn, {"lag_seconds": float("inf"), "checked_at": float("-inf"), "error": None}
+        )
+        if now - status["checked_at"] >= DB_REPLICA_CHECK_INTERVAL:
+            status["checked_at"] = now
+            task = asyncio.create_task(_check_replica(dsn))
+            _replica_checks.add(task)
+            task.add_done_callback(_replica_checks.discard)
+
+    # Spread the reads over the replicas within the lag bound, or fall back to the primary
+    eligible = [
+        dsn for dsn in DB_REPLICA_DSNS
+        if _replica_status[dsn]["lag_seconds"] <= DB_REPLICA_MAX_LAG
+    ]
+    if not eligible:
+        increment("db_reads_total", target="primary", reason="no_usable_replica")
+        return await get_pool(), None
+    dsn = random.choice(eligible)
+    increment("db_reads_total", target="replica", reason="routed")
+    return await get_replica_pool(dsn), dsn
+
+
+def get_replica_status() -> list[dict[str, Any]]:
+    """
+    Returns the last lag check of every replica: its name, lag in seconds (inf if unusable),
+    whether it is within DB_REPLICA_MAX_LAG and the error of the check, if any.
+    """
+    return [
+        {
+            "replica": replica_name(dsn),
+            "lag_seconds": _replica_status.get(dsn, {}).get("lag_seconds", float("inf")),
+            "usable": _replica_status.get(dsn, {}).get("lag_seconds", float("inf"))
+            <= DB_REPLICA_MAX_LAG,
+            "error": _replica_status.get(dsn, {}).get("error"),
+        }
+        for dsn in DB_REPLICA_DSNS
+    ]
+
+
+def get_pool_metrics() -> dict[str, Any]:
+    """
+    Returns a snapshot of the connection pool metrics.
+
+    Returns: A dictionary with pool size, usage and checkout wait statistics.
+    """
+    # Read the pool statistics, if the pool was opened already
+    stats = _pool.get_stats() if _pool is not None else {}
+    checkouts = stats.get("requests_num", 0)
+    wait_total = stats.get("requests_wait_ms", 0) / 1000
+    return {
+        "checkouts": checkouts,
+        "checkout_timeouts": stats.get("requests_errors", 0),
+        "checkout_waiting": stats.get("requests_waiting", 0),
+        "checkout_wait_seconds_total": wait_total,
+        "checkout_wait_seconds_max": _pool_metrics["checkout_wait_seconds_max"],
+        "checkout_wait_seconds_avg": wait_total / checkouts if checkouts else 0.0,
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_discarded": stats.get("returns_bad", 0) + stats.get("connections_lost", 0),
+        "in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "idle": stats.get("pool_available", 0),
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+    }
+
+
+def observe(name: str, value: float, buckets: tuple, **labels: str):
+    """
+    Records a value in a histogram.
+
+    Args:
+        - name: The metric name.
+        - value: The observed value.
+        - buckets: The upper bounds of the histogram buckets, used when the histogram is created.
+        - labels: The label values of the series.
+    """
+    # Create the series on first use, with one extra bucket for values above the last bound
+    key = (name, tuple(sorted(labels.items())))
+    histogram = _histograms.get(key)
+    if histogram is None:
+        histogram = _histograms[key] = {
+            "buckets": buckets, "counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0
+        }
+    histogram["counts"][bisect_left(histogram["buckets"], value)] += 1
+    histogram["sum"] += value
+    histogram["count"] += 1
+
+
+def increment(name: str, amount: int = 1, **labels: str):
+    """
+    Increments a counter.
+
+    Args:
+        - name: The metric name.
+        - amount: The increment.
+        - labels: The label values of the series.
+    """
+    key = (name, tuple(sorted(labels.items())))
+    _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe_phase(phase: str, seconds: float):
+    """
+    Records the time the current tool or resource spent in a phase (connect, query, parse or
+    serialize).
+    """
+    observe(
+        "mcp_phase_duration_seconds", seconds, LATENCY_BUCKETS,
+        operation=_operation.get(), phase=phase
+    )
+
+
+def render_metrics() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format.
+
+    Returns: The metrics page, with the tool and resource histograms and error counters, the
+        connection pool and replica lag gauges and the cache counters.
+
+    Notes:
+        - Histogram buckets are cumulative, as Prometheus expects.
+    """
+    def series(name: str, labels: tuple, value: Any) -> str:
+        # Format one sample line, escaping the label values
+        pairs = ",".join(
+            f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+            for k, v in labels
+        )
+        return f"{name}{{{pairs}}} {value}" if pairs else f"{name} {value}"
+
+    # Histograms, grouped by metric name
+    lines, declared = [], set()
+    for (name, labels), histogram in sorted(_histograms.items()):
+        if name not in declared:
+            lines.append(f"# TYPE {name} histogram")
+            declared.add(name)
+        cumulative = 0
+        for bound, count in zip(histogram["buckets"] + ("+Inf",), histogram["counts"]):
+            cumulative += count
+            lines.append(series(f"{name}_bucket", labels + (("le", bound),), cumulative))
+        lines.append(series(f"{name}_sum", labels, histogram["sum"]))
+        lines.append(series(f"{name}_count", labels, histogram["count"]))
+
+    # Counters, including the cache counters
+    cache_counters = {
+        (f"cache_{counter}_total", (("cache", cache),)): value
+        for cache, counters in get_cache_metrics().items()
+        for counter, value in counters.items() if counter != "size"
+    }
+    for (name, labels), value in sorted({**_counters, **cache_counters}.items()):
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(series(name, labels, value))
+
+    # Gauges: cache sizes and connection pool state
+    lines.append("# TYPE cache_size gauge")
+    lines.extend(
+        series("cache_size", (("cache", cache),), counters["size"])
+        for cache, counters in get_cache_metrics().items()
+    )
+    for key, value in get_pool_metrics().items():
+        lines.append(f"# TYPE db_pool_{key} gauge")
+        lines.append(series(f"db_pool_{key}", (), value))
+    lines.append("# TYPE resource_subscriptions gauge")
+    lines.append(series(
+        "resource_subscriptions", (), sum(len(sessions) for sessions in _subscriptions.values())
+    ))
+    lines.append("# TYPE db_replica_lag_seconds gauge")
+    lines.extend(
+        series(
+            "db_replica_lag_seconds", (("replica", status["replica"]),),
+            "+Inf" if status["lag_seconds"] == float("inf") else status["lag_seconds"]
+        )
+        for status in get_replica_status()
+    )
+    return "\n".join(lines) + "\n"
+
+
+class TracingCursor:
+    """
+    Cursor proxy that times every statement it executes, for the slow-query log.
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.statements = []
+
+    async def execute(self, query, params=None, **kwargs):
+        # Run the statement, then remember it with its duration
+        start = time.perf_counter()
+        try:
+            return await self._cursor.execute(query, params, **kwargs)
+        finally:
+            self.statements.append((query, params, time.perf_counter() - start))
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def redact_params(params: Any) -> Any:
+    """
+    Redacts query parameters for the slow-query log, keeping only their types.
+
+    Args:
+        - params: The parameters of a statement: a sequence, a mapping or None.
+
+    Returns: The same structure with every value but None replaced by its type name.
+    """
+    def redact(value: Any) -> Any:
+        return None if value is None else f"<{type(value).__name__}>"
+
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: redact(value) for key, value in params.items()}
+    return [redact(value) for value in params]
+
+
+async def _explain_slow_query(entry: dict[str, Any], query: Any, params: Any, dsn: str | None):
+    """
+    Captures the plan of a slow statement into its log entry: its EXPLAIN (ANALYZE, BUFFERS) plan
+    for a read, its EXPLAIN plan for a write.
+
+    Args:
+        - entry: The slow-query log entry to complete with the plan (or the error that prevented
+            it).
+        - query: The statement, as executed.
+        - params: Its actual (unredacted) parameters.
+        - dsn: The replica the statement ran on, or None for the primary.
+
+    Notes:
+        - The plan comes from the server that ran the statement, with its own cache and
+          statistics: the same replica, or the primary.
+        - ANALYZE runs the statement again, so it is replayed on its own pooled connection in a
+          read-only transaction that is always rolled back, with a statement timeout of ten times
+          the slow-query threshold. PostgreSQL refuses to start writes there (INSERT, UPDATE,
+          DELETE, data-modifying CTEs, SELECT ... FOR UPDATE), so they are never run again nor
+          take row locks: they only get their estimated plan (plan_analyzed is False).
+        - Statements that cannot be replayed on another connection or after their own commit
+          (e.g. reading a temporary table) record the error instead of a plan.
+    """
+    def explain(options: str) -> sql.Composed:
+        return sql.SQL("EXPLAIN {} {}").format(
+            sql.SQL(options), query if isinstance(query, sql.Composable) else sql.SQL(query)
+        )
+
+    try:
+        pool = await get_replica_pool(dsn) if dsn else None
+        async with pooled_connection(pool) as conn:
+            async with conn.transaction(force_rollback=True), conn.cursor() as cur:
+                await cur.execute("SET TRANSACTION READ ONLY;")
+                await cur.execute(
+                    sql.SQL("SET LOCAL statement_timeout = {}").format(
+                        int(SLOW_QUERY_THRESHOLD_MS * 10)
+                    )
+                )
+
+                # Replay reads with ANALYZE, and only plan the writes the transaction refuses
+                try:
+                    async with conn.transaction():
+                        await cur.execute(explain("(ANALYZE, BUFFERS)"), params)
+                    entry["plan_analyzed"] = True
+                except errors.ReadOnlySqlTransaction:
+                    await cur.execute(explain(""), params)
+                    entry["plan_analyzed"] = False
+                entry["plan"] = "\n".join(row[0] for row in await cur.fetchall())
+    except Exception as e:
+        entry["plan_error"] = f"{type(e).__name__}: {e}"
+
+
+def log_slow_statements(helper: str, statements: list[tuple], dsn: str | None = None):
+    """
+    Adds the statements slower than SLOW_QUERY_THRESHOLD_MS to the slow-query log, and schedules
+    the capture of the plans of a SLOW_QUERY_SAMPLE_RATE share of them in the background.
+
+    Args:
+        - helper: The name of the database helper that ran the statements.
+        - statements: The (query, params, seconds) triples recorded by a TracingCursor.
+        - dsn: The replica the statements ran on, or None for the primary.
+
+    Notes:
+        - Timing a statement is cheap, so every slow statement is logged; only the replay that
+          captures its plan is sampled (plan_sampled is False for the others).
+    """
+    for query, params, seconds in statements:
+        if seconds * 1000 < SLOW_QUERY_THRESHOLD_MS:
+            continue
+        entry = {
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "operation": _operation.get(),
+            "helper": helper,
+            "duration_ms": round(seconds * 1000, 3),
+            "query": query.as_string() if isinstance(query, sql.Composable) else query,
+            "params": redact_params(params),
+            "server": replica_name(dsn) if dsn else "primary",
+            "plan": None,
+            "plan_sampled": random.random() < SLOW_QUERY_SAMPLE_RATE,
+        }
+        _slow_queries.append(entry)
+        increment("mcp_slow_queries_total", operation=entry["operation"])
+        if not entry["plan_sampled"]:
+            continue
+        task = asyncio.create_task(_explain_slow_query(entry, query, params, dsn))
+        _explain_tasks.add(task)
+        task.add_done_callback(_explain_tasks.discard)
+
+
+def get_slow_queries() -> list[dict[str, Any]]:
+    """
+    Returns the slow-query log, newest first: for each statement, its operation and helper, its
+    duration, its SQL text, its redacted parameters, the server it ran on and its plan (None while
+    being captured, or when the statement was not sampled for a plan).
+    """
+    return list(reversed(_slow_queries))
+
+
+async def _run_with_cursor(func, conn: AsyncConnection, dsn: str | None, *args, **kwargs):
+    """
+    Creates a cursor on a borrowed connection and awaits a database helper with it.
+
+    Args:
+        - func: The database helper.
+        - conn: The borrowed connection.
+        - dsn: The replica the connection belongs to, or None for the primary.
+
+    Notes:
+        - The time spent in the helper is recorded as the "query" phase of the current tool or
+          resource, minus the time parse_output and parse_page spent building rows ("parse").
+        - The helper gets a TracingCursor, which times each statement; the statements slower
+          than SLOW_QUERY_THRESHOLD_MS go to the slow-query log (see log_slow_statements).
+    """
+    # Create a cursor and pass it to the function, timing the query apart from parsing
+    parse_seconds = _parse_seconds.set([0.0])
+    start = time.perf_counter()
+    try:
+        async with conn.cursor() as cur:
+            tracing = TracingCursor(cur)
+            try:
+                return await func(tracing, *args, **kwargs)
+            finally:
+                log_slow_statements(func.__qualname__, tracing.statements, dsn)
+    finally:
+        observe_phase("query", time.perf_counter() - start - _parse_seconds.get()[0])
+        _parse_seconds.reset(parse_seconds)
+
 
 def db_connector(func):
     """
     Decorator to handle database connection and cursor management.
-    It opens a connection, creates a cursor, passes it to the decorated function,
-    commits the transaction, and closes the connection.
+    It borrows a connection from the async pool, creates a cursor, awaits the decorated coroutine
+    with it, commits the transaction (or rolls it back on error), and gives the connection back.
+
+    Notes:
+        - It always runs on the primary: use it for writes, and for reads that must see the latest
+          data. Once it succeeds, the reads of the same MCP session stay on the primary for
+          DB_READ_YOUR_WRITES_WINDOW seconds.
     """
     @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = None
-        try:
-            # Establish the connection
-            conn = psycopg2.connect(
-                dbname=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                host=DB_HOST,
-                port=DB_PORT
-            )
-            # Create a cursor and pass it to the function
-            with conn.cursor() as cur:
-                result = func(cur, *args, **kwargs)
-                conn.commit()
-                return result
-        finally:
-            # Ensure the connection is closed
-            if conn:
-                conn.close()
+    async def wrapper(*args, **kwargs):
+        async with pooled_connection() as conn:
+            result = await _run_with_cursor(func, conn, None, *args, **kwargs)
+        record_write()
+        return result
+    return wrapper
+
+
+def db_reader(func):
+    """
+    Decorator to handle database connection and cursor management for read-only helpers.
+    Like db_connector, but the connection is borrowed from a replica (see choose_read_pool) when
+    replicas are configured, and from the primary otherwise.
+
+    Notes:
+        - If the replica cannot be reached, it is taken out of the rotation until its next lag
+          check and the read runs again on the primary.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        pool, dsn = await choose_read_pool()
+        if dsn is not None:
+            try:
+                async with pooled_connection(pool) as conn:
+                    return await _run_with_cursor(func, conn, dsn, *args, **kwargs)
+            except (OperationalError, PoolTimeout) as e:
+                mark_replica_down(dsn, e)
+                increment("db_reads_total", target="primary", reason="replica_error")
+        async with pooled_connection() as conn:
+            return await _run_with_cursor(func, conn, None, *args, **kwargs)
     return wrapper
 
 
+def db_streamer(func):
+    """
+    Decorator to handle database connection and server-side cursor management for streams.
+    It borrows a connection from the async pool (a replica one when replicas are configured, see
+    choose_read_pool), opens a named (server-side) cursor, passes it to the decorated async
+    generator and keeps both open until the stream is fully consumed.
+
+    Notes:
+        - Rows stay on the database server until fetched, so only one batch at a time is held
+          in memory instead of the whole result.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        pool, _ = await choose_read_pool()
+        async with pooled_connection(pool) as conn:
+            # Create a uniquely named server-side cursor and relay the generator output
+            async with conn.cursor(name=f"stream_{uuid.uuid4().hex}") as cur:
+                async for chunk in func(cur, *args, **kwargs):
+                    yield chunk
+    return wrapper
+
+
+def _cache_key(args: tuple, kwargs: dict) -> tuple:
+    """
+    Builds a hashable cache key from the arguments of a call.
+
+    Args:
+        - args: The positional arguments of the call.
+        - kwargs: The keyword arguments of the call.
+
+    Returns: A tuple usable as dictionary key.
+    """
+    # Lists become tuples and keyword arguments are sorted, so that their order does not matter
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in args + tuple(sorted(kwargs.items()))
+    )
+
+
+def cached(name: str, ttl: float = CACHE_TTL, maxsize: int = CACHE_MAX_SIZE):
+    """
+    Decorator factory for an in-process read-through cache with TTL and LRU eviction.
+
+    Args:
+        - name: The name of the cache, used to invalidate it and to report its metrics.
+        - ttl: Seconds an entry stays valid.
+        - maxsize: Maximum number of entries; the least recently used one is evicted beyond it.
+
+    Returns: A decorator for async functions whose results should be cached.
+
+    Notes:
+        - Cached results are shared between callers and must be treated as read-only.
+        - A result read before an invalidation is never stored, so a write followed by
+          invalidate_cache cannot be overwritten by a slower concurrent read of stale data.
+        - Misses are read from the primary, even with replicas configured (see choose_read_pool):
+          an entry outlives replica lag by far (ttl against DB_REPLICA_MAX_LAG), so filling it
+          from a lagging replica right after an invalidation would serve the stale rows for the
+          whole ttl, to every session, including the one that just wrote.
+    """
+    # Register the cache with its entries, its generation and its counters
+    cache = _caches.setdefault(name, {
+        "entries": OrderedDict(),
+        "generation": 0,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "expirations": 0,
+        "invalidations": 0,
+    })
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Serve a fresh entry and mark it as most recently used
+            key = _cache_key(args, kwargs)
+            entry = cache["entries"].get(key)
+            if entry and entry[0] > time.monotonic():
+                cache["hits"] += 1
+                cache["entries"].move_to_end(key)
+                return entry[1]
+            if entry:
+                cache["expirations"] += 1
+                del cache["entries"][key]
+
+            # Read through to the decorated function, on the primary
+            cache["misses"] += 1
+            generation = cache["generation"]
+            token = _read_primary.set(True)
+            try:
+                result = await func(*args, **kwargs)
+            finally:
+                _read_primary.reset(token)
+
+            # Store the result unless an invalidation happened meanwhile, then enforce the size
+            if cache["generation"] == generation:
+                cache["entries"][key] = (time.monotonic() + ttl, result)
+                while len(cache["entries"]) > maxsize:
+                    cache["entries"].popitem(last=False)
+                    cache["evictions"] += 1
+            return result
+        return wrapper
+    return decorator
+
+
+def invalidate_cache(name: str, *args):
+    """
+    Drops entries of a cache.
+
+    Args:
+        - name: The name of the cache.
+        - args: The leading positional arguments of the cached calls to drop (e.g. an ID);
+          the whole cache is cleared when omitted.
+    """
+    # Nothing to drop if the cache was never registered in this process
+    cache = _caches.get(name)
+    if cache is None:
+        return
+
+    # Bump the generation so in-flight reads do not store stale results, then drop entries
+    cache["generation"] += 1
+    cache["invalidations"] += 1
+    if args:
+        # Entries of calls starting with these arguments, whatever their other arguments
+        for key in [key for key in cache["entries"] if key[:len(args)] == args]:
+            del cache["entries"][key]
+    else:
+        cache["entries"].clear()
+
+
+def invalidates_cache(name: str, key_from=None):
+    """
+    Decorator factory invalidating a cache after the decorated write succeeded.
+
+    Args:
+        - name: The name of the cache to invalidate.
+        - key_from: Optional callable receiving the call arguments and returning the list of
+          cache keys (first positional argument of the cached call) to drop; the whole cache
+          is cleared when omitted.
+
+    Returns: A decorator for async functions writing data read through the cache.
+
+    Notes:
+        - Put it above @db_connector, so the invalidation runs after the commit.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            # Run the write first, then invalidate what it changed, here and in the other workers
+            result = await func(*args, **kwargs)
+            keys = None if key_from is None else list(key_from(*args, **kwargs))
+            if keys is None:
+                invalidate_cache(name)
+            else:
+                for key in keys:
+                    invalidate_cache(name, key)
+            await broadcast_invalidation(name, keys)
+            return result
+        return wrapper
+    return decorator
+
+
+async def broadcast_invalidation(name: str, keys: list | None):
+    """
+    Sends a cache invalidation to the other server processes, when CACHE_INVALIDATION is
+    "postgres".
+
+    Args:
+        - name: The name of the cache.
+        - keys: The keys to drop (first positional argument of the cached calls), or None to clear
+          the whole cache.
+
+    Notes:
+        - The notification is sent after the write committed, so a process that drops its entry
+          and reads again sees the new data.
+    """
+    if CACHE_INVALIDATION != "postgres":
+        return
+    payload = json.dumps({"process": _process_id, "cache": name, "keys": keys})
+    async with pooled_connection() as conn:
+        await conn.execute("SELECT pg_notify(%s, %s);", (CACHE_INVALIDATION_CHANNEL, payload))
+
+
+async def _listen_for_invalidations():
+    """
+    Applies the cache invalidations broadcast by the other server processes, reconnecting with a
+    growing delay (up to 30 seconds) if the listening connection is lost.
+
+    Notes:
+        - Every cache is cleared after a reconnection, since invalidations may have been missed
+          while disconnected.
+    """
+    delay = 1
+    while True:
+        try:
+            async with await connect(autocommit=True) as conn:
+                await conn.execute(
+                    sql.SQL("LISTEN {};").format(sql.Identifier(CACHE_INVALIDATION_CHANNEL))
+                )
+                for name in _caches:
+                    invalidate_cache(name)
+                delay = 1
+                async for notify in conn.notifies():
+                    message = json.loads(notify.payload)
+                    if message["process"] == _process_id:
+                        continue
+                    increment("cache_invalidations_received_total", cache=message["cache"])
+                    if message["keys"] is None:
+                        invalidate_cache(message["cache"])
+                    for key in message["keys"] or []:
+                        invalidate_cache(message["cache"], key)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def start_invalidation_listener():
+    """
+    Starts listening to the cache invalidations of the other server processes, when
+    CACHE_INVALIDATION is "postgres". Call it once per process, from its event loop.
+    """
+    global _invalidation_listener
+    if CACHE_INVALIDATION == "postgres" and _invalidation_listener is None:
+        _invalidation_listener = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_invalidation_listener():
+    """
+    Stops listening to the cache invalidations of the other server processes.
+    """
+    global _invalidation_listener
+    if _invalidation_listener is not None:
+        _invalidation_listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await _invalidation_listener
+        _invalidation_listener = None
+
+
+def publishes_changes(table: str, *templates: str):
+    """
+    Registers the resource URIs to notify when rows of a table change.
+
+    Args:
+        - table: The table, "orders" or "products" (the tables with change triggers).
+        - templates: URI templates filled with the key columns sent by the trigger, e.g.
+          "data://orders/orders/order/{order_id}". A template without placeholders (a listing) is
+          notified on any change to the table.
+
+    Notes:
+        - The URIs are the ones clients read, with the prefixes of the mounted servers.
+    """
+    _change_uris.setdefault(table, []).extend(templates)
+
+
+def changed_uris(table: str, rows: list[dict[str, Any]]) -> set[str]:
+    """
+    Returns the resource URIs affected by changed rows.
+
+    Args:
+        - table: The table of the rows.
+        - rows: The key columns of each changed row.
+
+    Returns: The URIs of publishes_changes for these rows.
+    """
+    return {template.format(**row) for template in _change_uris.get(table, []) for row in rows}
+
+
+def enable_resource_subscriptions(server):
+    """
+    Lets the clients of a FastMCP server subscribe to resources (resources/subscribe and
+    resources/unsubscribe) and receive resources/updated notifications when they change.
+
+    Args:
+        - server: The root FastMCP server, the one clients connect to.
+
+    Notes:
+        - FastMCP does not handle subscriptions itself: the handlers are registered on its
+          low-level server, whose advertised capabilities are patched to include subscribe.
+        - Subscriptions live in the session that made them, so they need stateful HTTP sessions
+          (not MCP_STATELESS_HTTP) and end with the session.
+        - The database listener starts with the first subscription.
+    """
+    low_level = server._mcp_server
+
+    # Subscribe the session of the request to the URI
+    @low_level.subscribe_resource()
+    async def subscribe(uri: AnyUrl):
+        _subscriptions.setdefault(str(uri), WeakSet()).add(low_level.request_context.session)
+        start_change_listener()
+
+    # Remove the subscription of the session of the request
+    @low_level.unsubscribe_resource()
+    async def unsubscribe(uri: AnyUrl):
+        sessions = _subscriptions.get(str(uri))
+        if sessions is not None:
+            sessions.discard(low_level.request_context.session)
+            if not sessions:
+                del _subscriptions[str(uri)]
+
+    # Advertise the subscribe capability next to the handlers
+    get_capabilities = low_level.get_capabilities
+
+    @functools.wraps(get_capabilities)
+    def with_subscribe(*args, **kwargs):
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    low_level.get_capabilities = with_subscribe
+
+
+def queue_resource_updates(uris: set[str]):
+    """
+    Queues resources/updated notifications for the subscribed URIs among uris. The queued URIs
+    are sent by one flush, RESOURCE_UPDATE_DELAY seconds after the first of them was queued.
+
+    Args:
+        - uris: The changed resource URIs.
+    """
+    global _update_flush
+    # Queue each subscribed URI once, however many changes it gets before the flush
+    for uri in uris:
+        if not _subscriptions.get(uri):
+            continue
+        if uri in _pending_updates:
+            increment("resource_updates_coalesced_total")
+        _pending_updates.add(uri)
+    if _pending_updates and _update_flush is None:
+        _update_flush = asyncio.create_task(_flush_resource_updates())
+
+
+async def _flush_resource_updates():
+    """
+    Sends the queued resources/updated notifications to every subscribed session.
+
+    Notes:
+        - A session that can no longer be notified loses its subscriptions.
+    """
+    global _update_flush
+    await asyncio.sleep(RESOURCE_UPDATE_DELAY)
+
+    # Take the queued URIs: changes arriving from now on go to the next flush
+    uris = list(_pending_updates)
+    _pending_updates.clear()
+    _update_flush = None
+
+    # Notify every subscriber of every URI concurrently
+    deliveries = [
+        (uri, session) for uri in uris for session in list(_subscriptions.get(uri, ()))
+    ]
+    results = await asyncio.gather(
+        *[session.send_resource_updated(AnyUrl(uri)) for uri, session in deliveries],
+        return_exceptions=True,
+    )
+    for (uri, session), result in zip(deliveries, results):
+        if not isinstance(result, Exception):
+            increment("resource_updates_sent_total")
+            continue
+        increment("resource_update_errors_total")
+        for sessions in _subscriptions.values():
+            sessions.discard(session)
+
+
+async def _listen_for_resource_changes():
+    """
+    Turns the row changes sent by the database triggers into resources/updated notifications,
+    reconnecting with a growing delay (up to 30 seconds) if the listening connection is lost.
+
+    Notes:
+        - Every subscribed URI is notified after a reconnection, since changes may have been
+          missed while disconnected.
+    """
+    delay, reconnecting = 1, False
+    while True:
+        try:
+            async with await connect(autocommit=True) as conn:
+                await conn.execute(
+                    sql.SQL("LISTEN {};").format(sql.Identifier(RESOURCE_CHANGES_CHANNEL))
+                )
+                if reconnecting:
+                    queue_resource_updates(set(_subscriptions))
+                delay, reconnecting = 1, False
+                async for notify in conn.notifies():
+                    message = json.loads(notify.payload)
+                    increment("resource_changes_received_total", table=message["table"])
+                    queue_resource_updates(changed_uris(message["table"], message["rows"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+
+def start_change_listener():
+    """
+    Starts listening to the row changes of the database triggers, once per process, from its
+    event loop.
+    """
+    global _change_listener
+    if _change_listener is None:
+        _change_listener = asyncio.create_task(_listen_for_resource_changes())
+
+
+async def stop_change_listener():
+    """
+    Stops listening to the row changes and drops the notifications not sent yet.
+    """
+    global _change_listener, _update_flush
+    for task in (_change_listener, _update_flush):
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    _change_listener = _update_flush = None
+    _pending_updates.clear()
+
+
+def get_cache_metrics() -> dict[str, dict[str, int]]:
+    """
+    Returns a snapshot of the counters of every cache.
+
+    Returns: A dictionary with, for each cache name, its size and hit/miss/eviction counters.
+    """
+    # Copy the counters and add the current number of entries
+    return {
+        name: {
+            **{k: v for k, v in cache.items() if k not in ("entries", "generation")},
+            "size": len(cache["entries"]),
+        }
+        for name, cache in _caches.items()
+    }
+
+
 def handle_errors(func):
     """
     Decorator to catch exceptions during function execution and return a
     standardized JSON error response.
+    Works for both regular functions and coroutines.
+
+    Notes:
+        - It also instruments the decorated tool or resource: its latency and its errors by type
+          (raised exceptions and returned failure responses alike) are recorded under its
+          function name. The size and serialization time of its result are recorded by
+          record_response_size, from the response FastMCP encodes.
     """
+    def error_response(e: Exception) -> dict[str, Any]:
+        # Return a dictionary with error information
+        return {
+            "status": "failure",
+            "error_type": type(e).__name__,
+            "error_message": str(e)
+        }
+
+    def record(result: Any, start: float) -> Any:
+        # Record the latency and the errors, then hand the outcome over to record_response_size
+        operation, finished = func.__name__, time.perf_counter()
+        observe("mcp_request_duration_seconds", finished - start, LATENCY_BUCKETS,
+                operation=operation)
+        failed = isinstance(result, dict) and result.get("status") == "failure"
+        if failed:
+            increment("mcp_errors_total", operation=operation,
+                      error_type=result.get("error_type", "Failure"))
+        if (response := _response.get()) is not None:
+            response.update(operation=operation, finished=finished, failed=failed)
+        return result
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            token, start = _operation.set(func.__name__), time.perf_counter()
+            try:
+                # Attempt to execute the coroutine
+                return record(await func(*args, **kwargs), start)
+            except Exception as e:
+                return record(error_response(e), start)
+            finally:
+                _operation.reset(token)
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        token, start = _operation.set(func.__name__), time.perf_counter()
         try:
             # Attempt to execute the function
-            return func(*args, **kwargs)
+            return record(func(*args, **kwargs), start)
         except Exception as e:
-            # Return a dictionary with error information
-            return {
-                "status": "failure",
-                "error_type": type(e).__name__,
-                "error_message": str(e)
-            }
+            return record(error_response(e), start)
+        finally:
+            _operation.reset(token)
     return wrapper
 
 
-def parse_output(cursor, one=False):
+async def record_response_size(context: Any, call_next: Any) -> Any:
     """
-    Parses the output of a psycopg2 cursor into a dictionary or a list of dictionaries.
+    FastMCP middleware measuring tool and resource responses where FastMCP encodes them.
 
     Args:
-        cursor: The psycopg2 cursor after a fetch operation.
+        - context: The FastMCP middleware context of the request.
+        - call_next: The rest of the middleware chain.
+
+    Returns: The response, unchanged.
+
+    Notes:
+        - For a successful handler decorated with handle_errors, records mcp_payload_bytes (the
+          length of the JSON text FastMCP built for the response) and the "serialize" phase (the
+          time from the handler's return to that text being ready), so results are never encoded
+          a second time just to be measured.
+        - Register it on the root server (add_middleware) so it sees the mounted servers' calls.
+    """
+    if context.method not in ("tools/call", "resources/read"):
+        return await call_next(context)
+
+    # Let handle_errors report the outcome of the handler
+    response = {}
+    token = _response.set(response)
+    try:
+        result = await call_next(context)
+    finally:
+        _response.reset(token)
+    if "operation" not in response or response["failed"]:
+        return result
+
+    # Measure the text content already encoded (tool results) or read (resources)
+    token = _operation.set(response["operation"])
+    try:
+        observe_phase("serialize", time.perf_counter() - response["finished"])
+        if context.method == "tools/call":
+            size = sum(len(getattr(block, "text", "")) for block in result.content)
+        else:
+            size = sum(len(contents.content) for contents in result)
+        observe("mcp_payload_bytes", size, BYTE_BUCKETS, operation=response["operation"])
+    finally:
+        _operation.reset(token)
+    return result
+
+
+def timed_parse(func):
+    """
+    Decorator recording the time a result parser spends fetching and shaping rows (the "parse"
+    phase) and the number of rows it returns.
+
+    Notes:
+        - The parse time is also added to the enclosing db_connector call, which subtracts it from
+          its "query" phase.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = await func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        observe_phase("parse", elapsed)
+        if (parse_seconds := _parse_seconds.get()) is not None:
+            parse_seconds[0] += elapsed
+
+        # Count the rows of a list, a compact result, a page or a single record
+        if isinstance(result, list):
+            rows = len(result)
+        elif "rows" in result or "items" in result:
+            rows = len(result.get("rows", result.get("items")))
+        else:
+            rows = int(bool(result))
+        observe("mcp_result_rows", rows, ROW_BUCKETS, operation=_operation.get())
+        return result
+    return wrapper
+
+
+@timed_parse
+async def parse_output(cursor, one=False, compact=False):
+    """
+    Parses the output of a psycopg async cursor into a dictionary or a list of dictionaries.
+
+    Args:
+        cursor: The psycopg async cursor after an execute operation.
         one (bool): If True, returns a single dictionary, otherwise a list.
+        compact (bool): If True (and one is False), returns the compact format instead of a list:
+            {"columns": [...], "rows": [[...], ...]}, where column names are not repeated per row.
 
     Returns:
         A dictionary or a list of dictionaries representing the query result.
@@ -80,15 +1409,256 @@ def parse_output(cursor, one=False):
     # Get column names from the cursor description
     desc = cursor.description
     if not desc:
-        return {} if one else []
+        return {} if one else {"columns": [], "rows": []} if compact else []
 
     # Create a list of column names
-    column_names = [col[0] for col in desc]
+    column_names = [col.name for col in desc]
 
     if one:
         # Fetch one record and convert it to a dictionary
-        record = cursor.fetchone()
+        record = await cursor.fetchone()
         return dict(zip(column_names, record)) if record else {}
+    elif compact:
+        # Fetch all records and keep them as value rows, next to the column names
+        return {"columns": column_names, "rows": await cursor.fetchall()}
     else:
         # Fetch all records and convert them to a list of dictionaries
-        return [dict(zip(column_names, row)) for row in cursor.fetchall()]
\ No newline at end of file
+        return [dict(zip(column_names, row)) for row in await cursor.fetchall()]
+
+
+def encode_json(data: Any) -> str:
+    """
+    Encodes query results to JSON with pydantic-core's native encoder, the one FastMCP uses.
+
+    Args:
+        - data: Rows, pages or any structure of JSON types, Decimal, date and datetime values.
+
+    Returns: The JSON text.
+
+    Notes:
+        - Decimal values are encoded as strings, to keep their exact precision; dates and
+          datetimes as ISO 8601 strings. Other unknown types fall back to str().
+    """
+    # Encode in a single native pass, without per-value Python callbacks
+    return pydantic_core.to_json(data, fallback=str).decode()
+
+
+async def stream_output(cursor, batch_size: int = STREAM_BATCH_SIZE):
+    """
+    Streams the output of a psycopg server-side cursor as JSON lines, one batch at a time.
+
+    Args:
+        cursor: The psycopg async server-side cursor after an execute operation.
+        batch_size (int): The number of rows fetched from the database per round trip.
+
+    Returns:
+        An async generator of text chunks, each holding the JSON lines of one batch.
+
+    Notes:
+        - Rows are encoded with encode_json, so Decimal and date values become strings.
+    """
+    # Fetch batches until the cursor is exhausted, encoding each row as soon as it arrives
+    column_names = None
+    while rows := await cursor.fetchmany(batch_size):
+        column_names = column_names or [col.name for col in cursor.description]
+        yield "".join(encode_json(dict(zip(column_names, row))) + "\n" for row in rows)
+
+
+def new_id(prefix: str, timestamp_ms: int | None = None) -> str:
+    """
+    Generates a time-ordered, collision-free ID: the prefix, then 26 base32 digits encoding
+    48 bits of Unix time in milliseconds followed by 80 random bits (the ULID layout),
+    e.g. "ord_01k7x3h5ftq2m8c4vb6e9gdzqa".
+
+    Args:
+        - prefix: The entity prefix, e.g. "ord" or "usr".
+        - timestamp_ms: The time to encode, in milliseconds (default: now).
+
+    Returns: The new ID.
+
+    Notes:
+        - IDs sort by creation time, as strings, so new rows are appended to the end of the
+          primary key index instead of scattered over it, and an ID can serve as a page cursor.
+        - Within the same millisecond, the random part of the previous ID is incremented, so the
+          IDs of this process always increase; other processes draw their own random parts.
+        - With an explicit timestamp_ms (used to rekey existing rows), the random part is only
+          drawn at random.
+    """
+    # Draw the random part, or increment the previous one within the same millisecond
+    now = timestamp_ms is None
+    ms = time.time_ns() // 1_000_000 if now else timestamp_ms
+    random_part = int.from_bytes(os.urandom(10), "big")
+    if now and ms <= _last_id["ms"]:
+        ms, random_part = _last_id["ms"], _last_id["random"] + 1
+        if random_part >> 80:
+            ms, random_part = ms + 1, 0
+    if now:
+        _last_id.update(ms=ms, random=random_part)
+
+    # Encode the 128-bit value as 26 base32 digits, most significant first
+    value = (ms << 80) | random_part
+    digits = [ID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5)]
+    return f"{prefix}_{''.join(digits)}"
+
+
+def is_time_ordered_id(value: str) -> bool:
+    """
+    Tells whether an ID was generated by new_id, rather than by the former random scheme
+    (e.g. "ord_1a2b3c4d") or by the seed data (e.g. "ord_001").
+    """
+    return bool(ID_PATTERN.match(value))
+
+
+def parse_data_uri(data_detail: str) -> tuple[str, dict[str, str]]:
+    """
+    Splits a data URI into its path and its query parameters.
+
+    Args:
+        - data_detail: A data URI such as data://orders?page_size=20&cursor=...
+
+    Returns: A tuple with the URI without query string and a dictionary of query parameters.
+    """
+    # Separate the query string and parse it into a dictionary
+    path, _, query = data_detail.partition("?")
+    return path, dict(parse_qsl(query))
+
+
+def wants_compact(params: dict[str, str]) -> bool:
+    """
+    Resolves the response format requested in the query parameters of a data URI.
+
+    Args:
+        - params: The query parameters returned by parse_data_uri.
+
+    Returns: True for format=compact, False for format=json or when no format is given.
+
+    Notes:
+        - Any other format raises a ValueError.
+    """
+    # Default to the list-of-dicts format
+    response_format = params.get("format", "json")
+    if response_format not in ("json", "compact"):
+        raise ValueError(f"Unknown format '{response_format}', use 'json' or 'compact'.")
+    return response_format == "compact"
+
+
+def encode_cursor(keys: list[Any], page_size: int, compact: bool = False) -> str:
+    """
+    Builds an opaque continuation token from the sort keys of the last row of a page.
+
+    Args:
+        - keys: The sort key values of the last returned row.
+        - page_size: The page size, reused when the next page is requested.
+        - compact: Whether the pages are in the compact format, reused for the next page too.
+
+    Returns: A URL-safe token.
+    """
+    # Serialize keys (dates become ISO strings) and make the token URL-safe
+    state = {"keys": keys, "page_size": page_size, **({"compact": True} if compact else {})}
+    payload = json.dumps(state, default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str | None, page_size: int | str | None = None, compact: bool = False
+) -> tuple[list[Any], int, bool]:
+    """
+    Reads a continuation token and resolves the page size and format to use.
+
+    Args:
+        - cursor: A token built by encode_cursor, or None for the first page.
+        - page_size: An explicit page size, taking precedence over the one stored in the cursor.
+        - compact: Whether the compact format was explicitly requested.
+
+    Returns: A tuple with the sort keys to start after (empty for the first page), the page size
+        and whether to use the compact format.
+
+    Notes:
+        - The page size is clamped between 1 and MAX_PAGE_SIZE.
+        - A malformed token raises a ValueError.
+    """
+    # The first page has no keys to start after
+    state = {"keys": [], "page_size": DEFAULT_PAGE_SIZE}
+    if cursor:
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except ValueError as e:
+            raise ValueError(f"Invalid pagination cursor: {cursor}") from e
+
+    # Resolve the page size and keep it within bounds, and keep the format of the first page
+    page_size = min(max(int(page_size or state["page_size"]), 1), MAX_PAGE_SIZE)
+    return state["keys"], page_size, compact or state.get("compact", False)
+
+
+def project_columns(
+    fields: str | list[str] | None, allowed: list[str], required: list[str] = ()
+) -> tuple[sql.Composable, list[str]]:
+    """
+    Builds a validated SELECT column list from requested fields.
+
+    Args:
+        - fields: The requested columns, as a list or a comma-separated string; all the allowed
+          columns when empty.
+        - allowed: The whitelist of columns that can be selected from the table.
+        - required: Columns the query needs anyway (e.g. the pagination sort key).
+
+    Returns: A tuple with the column list, safe to format into SQL, and the required columns that
+        were not requested and must be dropped from the output.
+
+    Notes:
+        - Unknown columns raise a ValueError, so only whitelisted identifiers reach the SQL.
+        - Braces around the fields are ignored ("{a,b}" is read as "a,b").
+    """
+    # Normalize the requested fields and reject the ones outside the whitelist
+    requested = fields.split(",") if isinstance(fields, str) else fields or allowed
+    requested = [field.strip().strip("{}").strip() for field in requested]
+    requested = list(dict.fromkeys(field for field in requested if field))
+    unknown = [field for field in requested if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}. Allowed fields are: {', '.join(allowed)}.")
+
+    # Add the required columns that were not requested, remembering to hide them
+    hidden = [col for col in required if col not in requested]
+    return sql.SQL(", ").join(map(sql.Identifier, requested + hidden)), hidden
+
+
+@timed_parse
+async def parse_page(
+    cursor, page_size: int, key_columns: list[str], hidden: list[str] = (), compact: bool = False
+) -> dict[str, Any]:
+    """
+    Parses a keyset-paginated query result into a page with a continuation token.
+
+    Args:
+        cursor: The psycopg async cursor after executing a query with LIMIT page_size + 1.
+        page_size: The number of rows in a page.
+        key_columns: The columns of the sort key, in ORDER BY order.
+        hidden: Columns selected only to build the token, dropped from the returned rows.
+        compact: If True, returns the rows in the compact format (see parse_output).
+
+    Returns:
+        A dictionary with the page rows under "items" (or "columns" and "rows" in the compact
+        format) and the token of the next page under "next_cursor" (None on the last page).
+    """
+    # Fetch one row more than the page size to know whether a next page exists
+    columns = [col.name for col in cursor.description]
+    rows = await cursor.fetchall()
+    items = rows[:page_size]
+    next_cursor = (
+        encode_cursor([items[-1][columns.index(col)] for col in key_columns], page_size, compact)
+        if len(rows) > page_size else None
+    )
+
+    # Drop the hidden columns and shape the rows in the requested format
+    visible = [i for i, col in enumerate(columns) if col not in hidden]
+    if compact:
+        page = {
+            "columns": [columns[i] for i in visible],
+            "rows": (
+                items if len(visible) == len(columns)
+                else [[row[i] for i in visible] for row in items]
+            ),
+        }
+    else:
+        page = {"items": [{columns[i]: row[i] for i in visible} for row in items]}
+    return {**page, "page_size": page_size, "next_cursor": next_cursor}
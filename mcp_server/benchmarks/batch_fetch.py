@@ -0,0 +1,91 @@
+"""
+Batched data fetch benchmark.
+
+Answers "show a user's profile, their orders and the products they bought" twice through an
+in-process MCP client: once with one get_*_data tool call per URI, made one after another (as an
+agent does, one tool turn per URI), and once with a single get_batch_data call. Reports the
+end-to-end latency of each approach (tool call round trips included, LLM turns excluded).
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.batch_fetch --repeat 50
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from fastmcp import Client
+
+from backend import close_pool
+from main import mcp_server
+
+
+async def build_uris(client: Client, user_id: str, products: int) -> list[str]:
+    """
+    Builds the data URIs needed to describe a user, their orders and the products they bought.
+
+    Args:
+        - client: The connected MCP client.
+        - user_id: The user to describe.
+        - products: The maximum number of bought products to include.
+
+    Returns: The list of data URIs.
+    """
+    # The product ids come from the user's orders
+    orders_uri = f"data://orders/user/{user_id}"
+    history = json.loads(
+        (await client.call_tool("orders_get_order_data", {"data_detail": orders_uri})).content[0].text
+    )
+    names = list(dict.fromkeys(order["product_name"] for order in history))[:products]
+    catalog = json.loads(
+        (await client.call_tool(
+            "products_get_product_data",
+            {"data_detail": "data://products?fields=product_id,product_name&limit=500"}
+        )).content[0].text
+    )["items"]
+    product_ids = [p["product_id"] for p in catalog if p["product_name"] in names]
+    return (
+        [f"data://users/user/{user_id}", orders_uri]
+        + [f"data://products/product/{product_id}" for product_id in product_ids]
+    )
+
+
+async def main(args: argparse.Namespace):
+    """
+    Times both approaches and prints a comparison table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    async with Client(mcp_server) as client:
+        uris = await build_uris(client, args.user_id, args.products)
+        tools = {"users": "users_get_user_data", "products": "products_get_product_data",
+                 "orders": "orders_get_order_data"}
+        sequential, batch = [], []
+        for _ in range(args.repeat):
+            # One tool call per URI, one after another
+            start = time.perf_counter()
+            for uri in uris:
+                tool = tools[uri.removeprefix("data://").partition("/")[0]]
+                await client.call_tool(tool, {"data_detail": uri})
+            sequential.append((time.perf_counter() - start) * 1000)
+
+            # One batched tool call
+            start = time.perf_counter()
+            await client.call_tool("get_batch_data", {"data_details": uris})
+            batch.append((time.perf_counter() - start) * 1000)
+    await close_pool()
+
+    print(f"{len(uris)} URIs: {', '.join(uris)}")
+    print(f"{'approach':>11} {'p50_ms':>8} {'max_ms':>8}")
+    for name, latencies in [("sequential", sequential), ("batch", batch)]:
+        print(f"{name:>11} {statistics.median(latencies):>8.2f} {max(latencies):>8.2f}")
+    print(f"speedup (p50): {statistics.median(sequential) / statistics.median(batch):.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", default="usr_001", help="The user to describe.")
+    parser.add_argument("--products", type=int, default=5, help="Bought products to include.")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs of each approach.")
+    asyncio.run(main(parser.parse_args()))
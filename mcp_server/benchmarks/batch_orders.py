@@ -0,0 +1,57 @@
+"""
+Batch order placement benchmark.
+
+Places the same number of orders twice on a dedicated product: once as N single create_order
+calls made one after another (as an agent does, one tool turn per order), and once as a single
+create_orders call. Reports the total latency of each approach. The benchmark product and its
+orders are deleted at the end.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.batch_orders --lines 20 50 200
+"""
+import time
+import asyncio
+import argparse
+
+from backend import close_pool
+from benchmarks.order_stress import _setup_hot_product, _teardown_hot_product, HOT_PRODUCT_ID
+from servers.orders.helpers import NewOrderInfo, _create_new_order, _create_new_orders
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs both approaches for every batch size and prints a comparison table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # Create a product with enough stock for every order of the benchmark
+    user_id = await _setup_hot_product(2 * sum(args.lines))
+    try:
+        print(f"{'lines':>6} {'single_ms':>10} {'batch_ms':>9} {'speedup':>8}")
+        for count in args.lines:
+            orders = [
+                NewOrderInfo(user_id=user_id, product_id=HOT_PRODUCT_ID, quantity=1)
+                for _ in range(count)
+            ]
+
+            # N sequential single-order calls
+            start = time.perf_counter()
+            for order in orders:
+                await _create_new_order(order)
+            single = time.perf_counter() - start
+
+            # One batch call
+            start = time.perf_counter()
+            await _create_new_orders(orders)
+            batch = time.perf_counter() - start
+            print(f"{count:>6} {single * 1000:>10.1f} {batch * 1000:>9.1f} {single / batch:>7.1f}x")
+    finally:
+        await _teardown_hot_product()
+        await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[5, 20, 50, 200])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,103 @@
+"""
+Response encoding benchmark.
+
+Reads orders rows once, then compares the default list-of-dicts format with the compact columnar
+format ({"columns": [...], "rows": [[...], ...]}): payload bytes, and the time to shape the rows and
+serialize them the way FastMCP does for a tool result (JSON text content plus structured
+content). It also compares the stdlib json encoder with encode_json on the list-of-dicts rows.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.compact_encoding --rows 50 500 20000
+"""
+import json
+import time
+import asyncio
+import argparse
+import pydantic_core
+
+from backend import db_connector, close_pool, encode_json
+from benchmarks.streaming_memory import _seed_orders, _delete_seeded_orders
+
+
+@db_connector
+async def _fetch_order_rows(cur, rows: int):
+    """
+    Fetches raw order rows (tuples) and their column names.
+    """
+    await cur.execute(
+        "SELECT * FROM orders ORDER BY purchase_date DESC, order_id LIMIT %s;", (rows,)
+    )
+    return [col.name for col in cur.description], await cur.fetchall()
+
+
+def timed(func, repeat: int) -> tuple[float, object]:
+    """
+    Runs func repeat times and returns the best time in milliseconds and the last result.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def tool_result(data) -> str:
+    """
+    Serializes data like FastMCP does for a tool result: the JSON text and the structured content.
+    """
+    text = pydantic_core.to_json(data, fallback=str).decode()
+    pydantic_core.to_jsonable_python(data)
+    return text
+
+
+async def main(args: argparse.Namespace):
+    """
+    Measures every format for every row count and prints a comparison table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # Seed enough orders for the largest row count, if requested
+    if args.seed:
+        await _seed_orders(args.seed)
+
+    print(
+        f"{'rows':>7} {'dicts_kb':>9} {'compact_kb':>11} {'saved':>6} "
+        f"{'dicts_ms':>9} {'compact_ms':>11} {'stdlib_ms':>10} {'encode_json_ms':>15}"
+    )
+    for count in args.rows:
+        columns, rows = await _fetch_order_rows(count)
+
+        # Shape and serialize the rows in each format, as a tool result
+        dicts_ms, dicts_text = timed(
+            lambda: tool_result([dict(zip(columns, row)) for row in rows]), args.repeat
+        )
+        compact_ms, compact_text = timed(
+            lambda: tool_result({"columns": columns, "rows": rows}), args.repeat
+        )
+
+        # Encode the same list of dicts with the stdlib encoder and with encode_json
+        items = [dict(zip(columns, row)) for row in rows]
+        stdlib_ms, _ = timed(lambda: json.dumps(items, default=str), args.repeat)
+        native_ms, _ = timed(lambda: encode_json(items), args.repeat)
+
+        print(
+            f"{len(rows):>7} {len(dicts_text) / 1024:>9.1f} {len(compact_text) / 1024:>11.1f} "
+            f"{1 - len(compact_text) / len(dicts_text):>6.0%} {dicts_ms:>9.2f} {compact_ms:>11.2f} "
+            f"{stdlib_ms:>10.2f} {native_ms:>15.2f}"
+        )
+
+    # Remove the synthetic orders, if requested
+    if args.cleanup:
+        await _delete_seeded_orders()
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[50, 500, 20000])
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs of each encoding.")
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic orders to insert first.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic orders at the end.")
+    asyncio.run(main(parser.parse_args()))
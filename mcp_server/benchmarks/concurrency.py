@@ -0,0 +1,83 @@
+"""
+Concurrency benchmark for the async database path.
+
+Runs the same helper many times while keeping a fixed number of requests in flight and reports
+the throughput for each concurrency level. With the async pool the database waits of concurrent
+requests overlap, so throughput should grow with the number of in-flight requests until the pool
+(DB_POOL_MAX_SIZE) or the database saturates.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.concurrency --requests 400 --concurrency 1 2 4 8 16 --query-delay 0.01
+"""
+import time
+import asyncio
+import argparse
+
+from backend import db_connector, close_pool
+from servers.orders.helpers import _fetch_order_by_id
+
+
+@db_connector
+async def _fetch_order_with_delay(cur, order_id: str, delay: float):
+    """
+    Fetches an order after a server-side sleep, to simulate a slower query.
+    """
+    await cur.execute("SELECT pg_sleep(%s);", (delay,))
+    await cur.execute("SELECT * FROM orders WHERE order_id = %s;", (order_id,))
+    return await cur.fetchone()
+
+
+async def run_level(concurrency: int, requests: int, order_id: str, delay: float) -> float:
+    """
+    Runs the helper `requests` times with at most `concurrency` calls in flight.
+
+    Args:
+        - concurrency: The number of in-flight requests.
+        - requests: The total number of requests to run.
+        - order_id: The order to fetch.
+        - delay: Server-side sleep per request, in seconds (0 to run the plain helper).
+
+    Returns: The throughput in requests per second.
+    """
+    # Bound the number of in-flight requests with a semaphore
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one_request():
+        async with slots:
+            if delay:
+                return await _fetch_order_with_delay(order_id, delay)
+            return await _fetch_order_by_id(order_id)
+
+    # Run all the requests and measure the elapsed time
+    start = time.perf_counter()
+    await asyncio.gather(*[one_request() for _ in range(requests)])
+    return requests / (time.perf_counter() - start)
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs the benchmark for every concurrency level and prints a summary table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # Warm up the pool so connection setup is not part of the measurements
+    await run_level(max(args.concurrency), max(args.concurrency), args.order_id, 0)
+
+    # Measure every concurrency level and compare it with the sequential baseline
+    print(f"{'in_flight':>10} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for concurrency in args.concurrency:
+        throughput = await run_level(concurrency, args.requests, args.order_id, args.query_delay)
+        baseline = baseline or throughput
+        print(f"{concurrency:>10} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400, help="Requests per concurrency level.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--query-delay", type=float, default=0.01, help="Server-side sleep per query.")
+    parser.add_argument("--order-id", default="ord_001", help="The order fetched by every request.")
+    asyncio.run(main(parser.parse_args()))
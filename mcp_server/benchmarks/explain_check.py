@@ -0,0 +1,182 @@
+"""
+Query plan check for the database helpers.
+
+Runs every helper of servers/*/helpers.py against the database with sequential scans disabled and
+captures the EXPLAIN plan of each query it sends. With enable_seqscan off the planner only picks a
+sequential scan when no index can serve the query, so any "Seq Scan" node in a plan means the
+query will scan the whole table once the table is large. Keyset pagination is also checked deep
+in the orders table: that page is run with EXPLAIN ANALYZE, and an index scan that starts at the
+first row and filters its way down to the cursor ("Rows Removed by Filter" above
+DEEP_PAGE_MAX_FILTERED) is reported too, since its latency grows with the page depth. All writes
+are rolled back at the end. The script exits with status 1 when a plan fails either check.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.explain_check
+"""
+import sys
+import asyncio
+import inspect
+from psycopg import sql
+
+from backend import pooled_connection, close_pool, encode_cursor
+from servers.users.helpers import (
+    NewUserInfo,
+    UserUpdateInfo,
+    _fetch_users,
+    _fetch_user_by_id,
+    _add_new_user,
+    _modify_user,
+)
+from servers.products.helpers import _fetch_products, _fetch_product_by_id, _search_products
+from servers.orders.helpers import (
+    NewOrderInfo,
+    _fetch_orders,
+    _fetch_order_by_id,
+    _fetch_user_purchase_history,
+    _create_new_order,
+    _fetch_customer_sales,
+    _fetch_product_sales,
+    _fetch_daily_sales,
+)
+
+# Rows a continuation query may discard on its way to the cursor: at most about one purchase
+# date's worth of orders, never the pages before it
+DEEP_PAGE_MAX_FILTERED = 10_000
+
+# Position of the deep page, as a share of the orders table
+DEEP_PAGE_POSITION = 0.9
+
+
+class ExplainingCursor:
+    """
+    Cursor proxy that captures the EXPLAIN plan of every query before running it.
+    """
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.plans = []
+        self.analyze = False
+
+    async def execute(self, query, params=None):
+        # Plan the query with the same parameters (and run it, with analyze), then run it for real
+        if isinstance(query, sql.Composable):
+            query = query.as_string(self._cursor)
+        options = "ANALYZE, FORMAT JSON" if self.analyze else "FORMAT JSON"
+        await self._cursor.execute(f"EXPLAIN ({options}) {query}", params)
+        self.plans.append((query, (await self._cursor.fetchone())[0][0]["Plan"]))
+        return await self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """
+    Collects the relations read with a sequential scan anywhere in a plan tree.
+
+    Args:
+        - plan: A plan node of EXPLAIN (FORMAT JSON).
+
+    Returns: The names of the sequentially scanned relations.
+    """
+    # Check the node itself, then its children
+    own = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    return own + [rel for child in plan.get("Plans", []) for rel in find_seq_scans(child)]
+
+
+def rows_removed_by_filter(plan: dict) -> int:
+    """
+    Adds up the rows discarded by filters anywhere in an analyzed plan tree.
+
+    Args:
+        - plan: A plan node of EXPLAIN (ANALYZE, FORMAT JSON).
+
+    Returns: The number of rows read and then filtered out.
+    """
+    # Count the node itself, then its children
+    own = plan.get("Rows Removed by Filter", 0) * plan.get("Actual Loops", 1)
+    return own + sum(rows_removed_by_filter(child) for child in plan.get("Plans", []))
+
+
+async def main() -> int:
+    """
+    Runs the helpers with plan capture and prints a report.
+
+    Returns: The exit status, 1 if a query falls back to a sequential scan.
+    """
+    # Pick existing ids and a continuation token to call the helpers with
+    user_id = (await _fetch_users(page_size=1))["items"][0]["user_id"]
+    product_id = (await _fetch_products(page_size=1))["items"][0]["product_id"]
+    first_orders = await _fetch_orders(page_size=1)
+    order_id = first_orders["items"][0]["order_id"]
+    calls = [
+        (_fetch_users, (), {}),
+        (_fetch_users, (), {"cursor": (await _fetch_users(page_size=1))["next_cursor"]}),
+        (_fetch_user_by_id, (user_id,), {}),
+        (_fetch_products, (), {}),
+        (_fetch_products, (), {"cursor": (await _fetch_products(page_size=1))["next_cursor"]}),
+        (_fetch_product_by_id, (product_id,), {}),
+        (_search_products, (), {"query": "speed"}),
+        (_search_products, (), {"category": "Hypercar", "max_price": 2000000, "in_stock": True}),
+        (_search_products, (), {"min_price": 100000, "max_price": 500000}),
+        (_fetch_orders, (), {}),
+        (_fetch_orders, (), {"cursor": first_orders["next_cursor"]}),
+        (_fetch_order_by_id, (order_id,), {}),
+        (_fetch_user_purchase_history, (user_id,), {}),
+        (_fetch_customer_sales, (user_id,), {}),
+        (_fetch_customer_sales, (), {}),
+        (_fetch_product_sales, (product_id,), {}),
+        (_fetch_product_sales, (), {"sort_by": "units_sold"}),
+        (_fetch_daily_sales, (), {}),
+        (_create_new_order, (NewOrderInfo(user_id=user_id, product_id=product_id, quantity=1),), {}),
+        (_add_new_user, (NewUserInfo(name="Explain Check", email="explain.check@example.com"),), {}),
+        (_modify_user, (user_id, UserUpdateInfo(phone_number="555-0000")), {}),
+    ]
+
+    # A continuation token pointing deep into the orders table
+    async with pooled_connection() as conn:
+        cur = await conn.execute(
+            """
+            SELECT purchase_date, order_id FROM orders ORDER BY purchase_date DESC, order_id
+            OFFSET (SELECT (count(*) * %s)::bigint FROM orders) LIMIT 1;
+            """,
+            (DEEP_PAGE_POSITION,)
+        )
+        deep_keys = await cur.fetchone()
+    deep_calls = [
+        (_fetch_orders, (), {"cursor": encode_cursor(list(deep_keys), 50)}),
+    ] if deep_keys else []
+
+    failures = 0
+    async with pooled_connection() as conn:
+        # Disable sequential scans for this transaction only
+        await conn.execute("SET LOCAL enable_seqscan = off;")
+        async with conn.cursor() as cur:
+            explaining = ExplainingCursor(cur)
+            for helper, args, kwargs in calls:
+                # Call the undecorated helper with the capturing cursor
+                explaining.plans.clear()
+                await inspect.unwrap(helper)(explaining, *args, **kwargs)
+                seq_scans = [rel for _, plan in explaining.plans for rel in find_seq_scans(plan)]
+                failures += bool(seq_scans)
+                status = f"SEQ SCAN on {', '.join(seq_scans)}" if seq_scans else "ok"
+                label = helper.__name__ + (" (next page)" if "cursor" in kwargs else "")
+                print(f"{label:<42} {status}")
+
+            # Deep pages must start at the cursor, not filter their way down to it
+            explaining.analyze = True
+            for helper, args, kwargs in deep_calls:
+                explaining.plans.clear()
+                await inspect.unwrap(helper)(explaining, *args, **kwargs)
+                removed = sum(rows_removed_by_filter(plan) for _, plan in explaining.plans)
+                failures += removed > DEEP_PAGE_MAX_FILTERED
+                status = f"FILTERED {removed} rows" if removed > DEEP_PAGE_MAX_FILTERED else "ok"
+                label = f"{helper.__name__} (page at {DEEP_PAGE_POSITION:.0%})"
+                print(f"{label:<42} {status}")
+        # Leave the database untouched
+        await conn.rollback()
+    await close_pool()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,107 @@
+"""
+ID scheme benchmark: former random IDs against time-ordered IDs.
+
+For each scheme, inserts --rows rows into a scratch table shaped like the key of orders
+(VARCHAR(255) primary key), --batch-size rows per statement, and reports the insert throughput,
+the primary key collisions (rows rejected by ON CONFLICT DO NOTHING) and the size of the primary
+key index: random keys split index pages all over the B-tree and leave them partly empty, while
+time-ordered keys fill the rightmost page and move on. The schemes are:
+- random: "ord_" + the first 8 hex digits of a UUID4 (the former scheme, 32 random bits);
+- random_long: "ord_" + 26 random base32 digits, as long as a time-ordered ID but in random order
+  (isolates the effect of the insert order from the effect of the key length);
+- time_ordered: backend.new_id("ord") (48-bit millisecond time + 80 random bits).
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.id_generation --rows 1000000 --batch-size 1000
+"""
+import math
+import time
+import uuid
+import asyncio
+import secrets
+import argparse
+
+from backend import ID_ALPHABET, connect, new_id
+
+# The ID generator of each scheme
+SCHEMES = {
+    "random": lambda: f"ord_{str(uuid.uuid4())[:8]}",
+    "random_long": lambda: f"ord_{''.join(secrets.choice(ID_ALPHABET) for _ in range(26))}",
+    "time_ordered": lambda: new_id("ord"),
+}
+
+
+async def run_scheme(conn, name: str, rows: int, batch_size: int) -> dict:
+    """
+    Inserts the rows of one scheme into a fresh scratch table and measures the result.
+
+    Args:
+        - conn: An autocommit database connection.
+        - name: The scheme name, a key of SCHEMES.
+        - rows: The number of rows to insert.
+        - batch_size: The number of rows per INSERT statement.
+
+    Returns: The scheme's insert throughput, collisions and index size.
+    """
+    generate = SCHEMES[name]
+    await conn.execute("DROP TABLE IF EXISTS id_benchmark;")
+    await conn.execute(
+        "CREATE TABLE id_benchmark (order_id VARCHAR(255) PRIMARY KEY, quantity INTEGER);"
+    )
+
+    # Insert in batches, skipping the IDs that already exist
+    inserted, elapsed = 0, 0.0
+    for offset in range(0, rows, batch_size):
+        ids = [generate() for _ in range(min(batch_size, rows - offset))]
+        start = time.perf_counter()
+        cur = await conn.execute(
+            """
+            INSERT INTO id_benchmark (order_id, quantity)
+            SELECT unnest(%s::text[]), 1 ON CONFLICT (order_id) DO NOTHING;
+            """,
+            (ids,)
+        )
+        elapsed += time.perf_counter() - start
+        inserted += cur.rowcount
+
+    # Measure the primary key index
+    cur = await conn.execute("SELECT pg_relation_size('id_benchmark_pkey');")
+    index_bytes = (await cur.fetchone())[0]
+    await conn.execute("DROP TABLE id_benchmark;")
+    return {
+        "rows_per_second": inserted / elapsed,
+        "collisions": rows - inserted,
+        "index_mb": index_bytes / 2**20,
+    }
+
+
+async def main(args: argparse.Namespace):
+    """
+    Benchmarks both schemes and prints a comparison table.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    # The former scheme's odds of at least one collision, by the birthday bound
+    expected = 1 - math.exp(-args.rows * (args.rows - 1) / 2 / 2**32)
+    print(f"{args.rows} rows, {args.batch_size} per statement")
+    print(f"random scheme: P(at least one collision) = {expected:.4f}")
+
+    conn = await connect(autocommit=True)
+    try:
+        print(f"{'scheme':>13} {'rows/s':>9} {'collisions':>10} {'index_mb':>9}")
+        for name in SCHEMES:
+            result = await run_scheme(conn, name, args.rows, args.batch_size)
+            print(
+                f"{name:>13} {result['rows_per_second']:>9.0f} {result['collisions']:>10} "
+                f"{result['index_mb']:>9.1f}"
+            )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per scheme.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT statement.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,193 @@
+"""
+Load driver for the MCP server.
+
+Calls the mounted tools and resources of main.py the way concurrent agent sessions do, either
+in-process (through a FastMCP client bound to the server object, the default) or over HTTP (--url,
+against a running `python main.py`). Each of --concurrency workers opens its own MCP session and
+loops over a weighted mix of operations for --duration seconds. Operations pick their ids from the
+synthetic data set of benchmarks.synthetic_data with a seeded random generator, so runs are
+repeatable. Reports the count, errors, p50/p95/p99 latency and throughput of each operation.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.synthetic_data --users 100000 --products 10000 --orders 1000000
+    python -m benchmarks.load_driver --concurrency 32 --duration 30
+    python -m benchmarks.load_driver --url http://localhost:8000/mcp --concurrency 32 --writes
+"""
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from fastmcp import Client
+
+from backend import close_pool
+from benchmarks.product_search import percentile
+from benchmarks.synthetic_data import CATEGORIES, _count_synthetic_rows
+
+
+def build_operations(sizes: dict[str, int], writes: bool) -> dict[str, tuple]:
+    """
+    Builds the weighted operation mix.
+
+    Args:
+        - sizes: The number of synthetic users, products and orders.
+        - writes: Whether to include order placement.
+
+    Returns: A dictionary mapping each operation name to its weight and to a function that takes a
+        random generator and returns ("tool", name, arguments) or ("resource", uri, None).
+    """
+    def user_id(rng):
+        return f"usr_syn_{rng.randint(1, sizes['users'])}"
+
+    def product_id(rng):
+        return f"car_syn_{rng.randint(1, sizes['products'])}"
+
+    operations = {
+        "get_user": (10, lambda rng: (
+            "tool", "users_get_user_data", {"data_detail": f"data://users/user/{user_id(rng)}"}
+        )),
+        "get_product": (15, lambda rng: (
+            "tool", "products_get_product_data",
+            {"data_detail": f"data://products/product/{product_id(rng)}"}
+        )),
+        "get_order": (10, lambda rng: (
+            "resource", f"data://orders/orders/order/ord_syn_{rng.randint(1, sizes['orders'])}", None
+        )),
+        "purchase_history": (15, lambda rng: (
+            "tool", "orders_get_order_data",
+            {"data_detail": f"data://orders/user/{user_id(rng)}?limit=20"}
+        )),
+        "list_orders": (5, lambda rng: (
+            "tool", "orders_get_order_data", {"data_detail": "data://orders?limit=50"}
+        )),
+        "list_products": (5, lambda rng: ("resource", "data://products/products", None)),
+        "search_products": (15, lambda rng: (
+            "tool", "products_search_products",
+            {
+                "category": rng.choice(CATEGORIES),
+                "max_price": rng.randrange(100000, 3000000, 100000),
+                "in_stock": True,
+                "page_size": 20,
+            }
+        )),
+        "customer_sales": (5, lambda rng: (
+            "tool", "orders_get_customer_sales", {"user_id": user_id(rng)}
+        )),
+        "top_products": (5, lambda rng: (
+            "tool", "orders_get_product_sales", {"sort_by": "units_sold", "limit": 10}
+        )),
+        "batch_data": (10, lambda rng: (
+            "tool", "get_batch_data",
+            {"data_details": [
+                f"data://users/user/{user_id(rng)}",
+                f"data://orders/user/{user_id(rng)}?limit=10",
+                f"data://products/product/{product_id(rng)}",
+            ]}
+        )),
+    }
+    if writes:
+        operations["create_order"] = (5, lambda rng: (
+            "tool", "orders_create_order",
+            {"order_info": {"user_id": user_id(rng), "product_id": product_id(rng), "quantity": 1}}
+        ))
+    return operations
+
+
+async def worker(
+    target, operations: dict, seed: int, deadline: float, latencies: dict, errors: dict
+):
+    """
+    Runs operations from the mix on its own MCP session until the deadline.
+
+    Args:
+        - target: The server object (in-process) or the server URL (HTTP).
+        - operations: The weighted operation mix of build_operations.
+        - seed: The seed of this worker's random generator.
+        - deadline: The perf_counter time at which to stop.
+        - latencies: Latencies in seconds, appended per operation name.
+        - errors: Error counts, incremented per operation name.
+    """
+    rng = random.Random(seed)
+    names = list(operations)
+    weights = [operations[name][0] for name in names]
+    async with Client(target) as client:
+        while time.perf_counter() < deadline:
+            # Pick an operation and call it, timing the full round trip
+            name = rng.choices(names, weights)[0]
+            kind, target_name, arguments = operations[name][1](rng)
+            start = time.perf_counter()
+            try:
+                if kind == "tool":
+                    result = await client.call_tool(target_name, arguments, raise_on_error=False)
+                    failed = result.is_error or any(
+                        '"status":"failure"' in getattr(block, "text", "") for block in result.content
+                    )
+                else:
+                    await client.read_resource(target_name)
+                    failed = False
+            except Exception:
+                failed = True
+            latencies[name].append(time.perf_counter() - start)
+            errors[name] += failed
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs the workers and prints the per-operation report.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # Size the id ranges from the synthetic data set
+    sizes = await _count_synthetic_rows()
+    if not all(sizes.values()):
+        raise SystemExit(f"Load the synthetic data set first (benchmarks.synthetic_data): {sizes}")
+    operations = build_operations(sizes, args.writes)
+
+    # Target the server object in-process, unless a URL is given
+    if args.url:
+        target = args.url
+    else:
+        from main import mcp_server
+        target = mcp_server
+
+    # Run the workers, each with its own session and random generator
+    latencies, errors = defaultdict(list), defaultdict(int)
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        worker(target, operations, args.seed + i, deadline, latencies, errors)
+        for i in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+    await close_pool()
+
+    mode = f"HTTP {args.url}" if args.url else "in-process"
+    print(f"{args.concurrency} workers, {elapsed:.1f}s, {mode}")
+    print(
+        f"{'operation':>17} {'count':>7} {'errors':>6} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+        f"{'req/s':>8}"
+    )
+    for name in operations:
+        values = [latency * 1000 for latency in latencies[name]]
+        if values:
+            print(
+                f"{name:>17} {len(values):>7} {errors[name]:>6} {percentile(values, 50):>8.2f} "
+                f"{percentile(values, 95):>8.2f} {percentile(values, 99):>8.2f} "
+                f"{len(values) / elapsed:>8.1f}"
+            )
+    values = [latency * 1000 for name in latencies for latency in latencies[name]]
+    print(
+        f"{'total':>17} {len(values):>7} {sum(errors.values()):>6} {percentile(values, 50):>8.2f} "
+        f"{percentile(values, 95):>8.2f} {percentile(values, 99):>8.2f} {len(values) / elapsed:>8.1f}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="MCP endpoint of a running server (default: in-process).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent sessions.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the workers' generators.")
+    parser.add_argument("--writes", action="store_true", help="Include order placement.")
+    asyncio.run(main(parser.parse_args()))
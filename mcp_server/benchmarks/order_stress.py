@@ -0,0 +1,99 @@
+"""
+Concurrent order stress test on one hot product.
+
+Creates a dedicated product with a limited stock, fires many concurrent create_order calls at it
+and reports orders per second. It then checks that stock never went below zero and that the
+stock consumed matches the orders that succeeded. The benchmark product and its orders are
+deleted at the end.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.order_stress --stock 500 --orders 1000 --concurrency 32
+"""
+import sys
+import time
+import asyncio
+import argparse
+
+from backend import db_connector, close_pool
+from servers.orders.helpers import NewOrderInfo, _create_new_order
+
+# Product created for the duration of the benchmark
+HOT_PRODUCT_ID = "car_bench_hot"
+
+
+@db_connector
+async def _setup_hot_product(cur, stock: int) -> str:
+    """
+    Creates the hot product with the given stock and returns an existing user id.
+    """
+    await cur.execute(
+        """
+        INSERT INTO products (product_id, product_name, description, price, stock_quantity, category)
+        VALUES (%s, 'Benchmark Hot SKU', 'Created by benchmarks.order_stress.', 1.00, %s, 'Benchmark');
+        """,
+        (HOT_PRODUCT_ID, stock)
+    )
+    await cur.execute("SELECT user_id FROM users ORDER BY user_id LIMIT 1;")
+    return (await cur.fetchone())[0]
+
+
+@db_connector
+async def _teardown_hot_product(cur) -> int:
+    """
+    Deletes the hot product and its orders, returning the stock left before deletion.
+    """
+    await cur.execute("SELECT stock_quantity FROM products WHERE product_id = %s;", (HOT_PRODUCT_ID,))
+    stock_left = (await cur.fetchone())[0]
+    await cur.execute("DELETE FROM orders WHERE product_id = %s;", (HOT_PRODUCT_ID,))
+    await cur.execute("DELETE FROM products WHERE product_id = %s;", (HOT_PRODUCT_ID,))
+    return stock_left
+
+
+async def main(args: argparse.Namespace) -> int:
+    """
+    Runs the stress test and prints its results.
+
+    Args:
+        - args: The parsed command line arguments.
+
+    Returns: The exit status, 1 if the stock invariants were violated.
+    """
+    # Create the hot product and bound the number of in-flight orders
+    user_id = await _setup_hot_product(args.stock)
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def place_order():
+        async with slots:
+            return await _create_new_order(
+                NewOrderInfo(user_id=user_id, product_id=HOT_PRODUCT_ID, quantity=args.quantity)
+            )
+
+    # Fire all the orders concurrently and time them
+    try:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[place_order() for _ in range(args.orders)])
+        elapsed = time.perf_counter() - start
+    finally:
+        stock_left = await _teardown_hot_product()
+        await close_pool()
+
+    # Check that the stock consumed matches the successful orders and never went negative
+    succeeded = sum(r["status"] == "success" for r in results)
+    rejected = sum(r.get("error_type") == "InsufficientStock" for r in results)
+    consistent = stock_left >= 0 and args.stock - stock_left == succeeded * args.quantity
+    print(f"orders/sec:        {args.orders / elapsed:.1f}")
+    print(f"succeeded:         {succeeded}")
+    print(f"insufficient:      {rejected}")
+    print(f"other failures:    {args.orders - succeeded - rejected}")
+    print(f"stock left:        {stock_left}")
+    print(f"stock consistent:  {consistent}")
+    return 0 if consistent else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stock", type=int, default=500, help="Initial stock of the hot product.")
+    parser.add_argument("--orders", type=int, default=1000, help="Number of orders to place.")
+    parser.add_argument("--quantity", type=int, default=1, help="Units per order.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Orders in flight at once.")
+    sys.exit(asyncio.run(main(parser.parse_args())))
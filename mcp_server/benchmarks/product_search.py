@@ -0,0 +1,163 @@
+"""
+Product search latency benchmark.
+
+Seeds a large synthetic catalog (ids prefixed with car_bench_), then times search_products for a
+set of typical agent searches (free text, category, price range, availability and their
+combinations, first and next page) and reports p50/p95/max latencies. For comparison it also
+times the pre-search approach once: reading the whole catalog and filtering it client-side.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.product_search --seed 1000000 --repeat 50 --cleanup
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from decimal import Decimal
+
+from backend import db_connector, parse_output, close_pool
+from servers.products.helpers import _search_products
+
+
+# Typical agent searches, as keyword arguments of _search_products
+SEARCHES = {
+    "text": {"query": "gravity"},
+    "text, selective": {"query": "quantum comet"},
+    "text phrase": {"query": '"whirlwind of speed"'},
+    "category": {"category": "hypercar"},
+    "price range": {"min_price": 500000, "max_price": 510000},
+    "category + price + stock": {"category": "hypercar", "max_price": 2000000, "in_stock": True},
+    "text + category + stock": {"query": "cosmos", "category": "roadster", "in_stock": True},
+}
+
+
+@db_connector
+async def _seed_products(cur, rows: int):
+    """
+    Inserts synthetic products with varied names, descriptions, categories, prices and stock.
+    """
+    await cur.execute(
+        """
+        INSERT INTO products (product_id, product_name, description, price, stock_quantity, category)
+        SELECT 'car_bench_' || g,
+               n.words[1 + g %% 10] || ' ' || n.words[1 + (g / 10) %% 10] || ' ' || g,
+               d.texts[1 + (g / 7) %% 8],
+               50000 + (g::bigint * 7919) %% 3000000,
+               g %% 6,
+               c.names[1 + (g / 3) %% 6]
+        FROM generate_series(1, %s) AS g,
+             (SELECT ARRAY['Aether', 'Vortex', 'Nebula', 'Quantum', 'Solaris', 'Eclipse',
+                           'Pulsar', 'Comet', 'Zenith', 'Orion'] AS words) AS n,
+             (SELECT ARRAY['A supercar that defies gravity.', 'Experience the whirlwind of speed.',
+                           'Cruise the cosmos in style.', 'Precision engineering for the track.',
+                           'Electric torque with a silent roar.', 'A grand tourer for long roads.',
+                           'Lightweight carbon body and chassis.', 'Luxury meets raw power.']
+                     AS texts) AS d,
+             (SELECT ARRAY['Supercar', 'Hypercar', 'Roadster', 'Grand Tourer', 'Electric',
+                           'Track'] AS names) AS c;
+        """,
+        (rows,)
+    )
+    await cur.execute("ANALYZE products;")
+
+
+@db_connector
+async def _delete_seeded_products(cur):
+    """
+    Removes the synthetic products inserted by _seed_products.
+    """
+    await cur.execute("DELETE FROM products WHERE product_id LIKE 'car\\_bench\\_%%';")
+
+
+@db_connector
+async def _fetch_whole_catalog(cur):
+    """
+    Reads the whole products table, the way the agent had to before search_products.
+    """
+    await cur.execute(
+        "SELECT product_id, product_name, description, price, stock_quantity, category FROM products;"
+    )
+    return await parse_output(cur)
+
+
+async def time_search(kwargs: dict, repeat: int) -> tuple[list[float], list[float], int]:
+    """
+    Times a search, for its first page and for the page right after it.
+
+    Args:
+        - kwargs: The search filters.
+        - repeat: The number of timed runs of each page.
+
+    Returns: A tuple with the first-page latencies, the next-page latencies (empty when there is a
+        single page), both in milliseconds, and the number of items on the first page.
+    """
+    # Warm up the pool and the caches of the database once
+    first_page = await _search_products(**kwargs)
+    first, following = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        page = await _search_products(**kwargs)
+        first.append((time.perf_counter() - start) * 1000)
+        if page["next_cursor"]:
+            start = time.perf_counter()
+            await _search_products(**kwargs, cursor=page["next_cursor"])
+            following.append((time.perf_counter() - start) * 1000)
+    return first, following, len(first_page["items"])
+
+
+def percentile(values: list[float], pct: int) -> float:
+    """
+    Returns the pct-th percentile of values (nearest rank).
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def main(args: argparse.Namespace):
+    """
+    Seeds the catalog, runs every search and prints a latency table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # Seed the catalog first, if requested
+    if args.seed:
+        start = time.perf_counter()
+        await _seed_products(args.seed)
+        print(f"seeded {args.seed} products in {time.perf_counter() - start:.1f}s")
+
+    # Time every search, first page and next page
+    print(f"{'search':>26} {'page':>5} {'items':>6} {'p50_ms':>8} {'p95_ms':>8} {'max_ms':>8}")
+    for name, kwargs in SEARCHES.items():
+        first, following, items = await time_search(kwargs, args.repeat)
+        for page, latencies in [("first", first), ("next", following)]:
+            if latencies:
+                print(
+                    f"{name:>26} {page:>5} {items:>6} {statistics.median(latencies):>8.2f} "
+                    f"{percentile(latencies, 95):>8.2f} {max(latencies):>8.2f}"
+                )
+
+    # Time the client-side alternative once: whole catalog, filtered in Python
+    start = time.perf_counter()
+    catalog = await _fetch_whole_catalog()
+    matches = [
+        p for p in catalog
+        if p["category"] == "Hypercar" and p["price"] <= Decimal(2000000) and p["stock_quantity"] > 0
+    ]
+    print(
+        f"client-side filter of {len(catalog)} products ({len(matches)} matches): "
+        f"{(time.perf_counter() - start) * 1000:.0f} ms"
+    )
+
+    # Remove the synthetic catalog, if requested
+    if args.cleanup:
+        await _delete_seeded_products()
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic products to insert first.")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs of each search.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic products at the end.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,198 @@
+"""
+Read/write split check.
+
+Runs against a primary and one or more streaming replicas (DB_REPLICA_DSNS) and checks, step by
+step, where the database helpers run:
+1. reads are spread over the replicas once their first lag check passed;
+2. right after an order is placed, the reads stay on the primary (read-your-writes) and see it,
+   then go back to the replicas once DB_READ_YOUR_WRITES_WINDOW is over;
+3. while replay is paused on every replica and the primary keeps writing, the replicas fall
+   behind by more than --max-lag seconds and reads fall back to the primary, until replay resumes;
+4. while the WAL receiver of every replica is disconnected (primary_conninfo emptied) and the
+   primary keeps writing, the replicas have replayed all they received but fall behind the
+   primary, so reads fall back to the primary too, until they reconnect.
+It also reports the read latency on each target.
+
+Usage (from the mcp_server directory, with a replica of the database on port 5433):
+    DB_REPLICA_DSNS="host=localhost port=5433 dbname=sports_cars_db user=admin" \
+        python -m benchmarks.replica_routing --max-lag 1
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from collections import Counter
+from psycopg import AsyncConnection, sql
+
+import backend
+from backend import db_connector, db_reader, close_pool, get_replica_status
+from servers.orders.helpers import NewOrderInfo, _create_new_order, _fetch_order_by_id
+
+
+@db_reader
+async def _read_target(cur) -> str:
+    """
+    Tells which server a read runs on: "replica" or "primary".
+    """
+    await cur.execute("SELECT pg_is_in_recovery();")
+    return "replica" if (await cur.fetchone())[0] else "primary"
+
+
+@db_connector
+async def _write_heartbeat(cur):
+    """
+    Writes to the primary (a transaction that changes nothing but still produces WAL).
+    """
+    await cur.execute("SELECT txid_current();")
+
+
+@db_connector
+async def _delete_order(cur, order_id: str):
+    """
+    Deletes an order and gives its stock back.
+    """
+    await cur.execute(
+        "DELETE FROM orders WHERE order_id = %s RETURNING product_id, quantity;", (order_id,)
+    )
+    product_id, quantity = await cur.fetchone()
+    await cur.execute(
+        "UPDATE products SET stock_quantity = stock_quantity + %s WHERE product_id = %s;",
+        (quantity, product_id)
+    )
+
+
+async def read_targets(reads: int) -> tuple[Counter, dict[str, list[float]]]:
+    """
+    Runs reads one after another and counts where they ran.
+
+    Returns: The count of reads per target and their latencies in milliseconds.
+    """
+    targets, latencies = Counter(), {"primary": [], "replica": []}
+    for _ in range(reads):
+        start = time.perf_counter()
+        target = await _read_target()
+        latencies[target].append((time.perf_counter() - start) * 1000)
+        targets[target] += 1
+    return targets, latencies
+
+
+async def set_replay(paused: bool):
+    """
+    Pauses or resumes WAL replay on every replica.
+    """
+    for dsn in backend.DB_REPLICA_DSNS:
+        async with await AsyncConnection.connect(dsn, autocommit=True) as conn:
+            await conn.execute(
+                "SELECT pg_wal_replay_pause();" if paused else "SELECT pg_wal_replay_resume();"
+            )
+
+
+async def set_streaming(conninfos: dict[str, str] | None) -> dict[str, str]:
+    """
+    Disconnects the WAL receiver of every replica (None), or reconnects them to the primary.
+
+    Args:
+        conninfos: The primary_conninfo of each replica to restore, or None to empty them.
+
+    Returns: The primary_conninfo of each replica before the change.
+    """
+    previous = {}
+    for dsn in backend.DB_REPLICA_DSNS:
+        async with await AsyncConnection.connect(dsn, autocommit=True) as conn:
+            cur = await conn.execute("SHOW primary_conninfo;")
+            previous[dsn] = (await cur.fetchone())[0]
+            value = "" if conninfos is None else conninfos[dsn]
+            await conn.execute(
+                sql.SQL("ALTER SYSTEM SET primary_conninfo = {};").format(sql.Literal(value))
+            )
+            await conn.execute("SELECT pg_reload_conf();")
+    return previous
+
+
+async def lag_behind(label: str, args: argparse.Namespace, settle: float):
+    """
+    Keeps the primary writing for longer than --max-lag, then prints where the reads went.
+    """
+    deadline = time.monotonic() + args.max_lag + 2 * settle
+    while time.monotonic() < deadline:
+        await _write_heartbeat()
+        await asyncio.sleep(0.2)
+    backend._last_write.clear()
+    await _read_target()
+    await asyncio.sleep(settle)
+    targets, _ = await read_targets(args.reads)
+    lags = [round(status["lag_seconds"], 1) for status in get_replica_status()]
+    print(f"{label}{dict(targets)}, lag: {lags}s")
+
+
+async def back_to_replicas(label: str, args: argparse.Namespace, settle: float):
+    """
+    Waits for the replicas to catch up, then prints where the reads went.
+    """
+    await _read_target()
+    await asyncio.sleep(settle)
+    targets, _ = await read_targets(args.reads)
+    print(f"{label}{dict(targets)}")
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs the checks and prints where the reads went at each step.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    if not backend.DB_REPLICA_DSNS:
+        raise SystemExit("Set DB_REPLICA_DSNS to the replica connection strings first.")
+    backend.DB_REPLICA_MAX_LAG = args.max_lag
+    settle = backend.DB_REPLICA_CHECK_INTERVAL + 0.5
+
+    # 1. Reads go to the replicas once they were checked
+    await _read_target()
+    await asyncio.sleep(settle)
+    targets, latencies = await read_targets(args.reads)
+    print(f"1. steady state:        {dict(targets)}")
+
+    # 2. A session that placed an order reads from the primary, and sees its order
+    order = await _create_new_order(
+        NewOrderInfo(user_id=args.user_id, product_id=args.product_id, quantity=1)
+    )
+    found = await _fetch_order_by_id(order["order_id"])
+    targets, _ = await read_targets(args.reads)
+    print(f"2. after a write:       {dict(targets)}, order visible: {bool(found)}")
+    await asyncio.sleep(backend.DB_READ_YOUR_WRITES_WINDOW + settle)
+    targets, _ = await read_targets(args.reads)
+    print(f"   window over:         {dict(targets)}")
+    await _delete_order(order["order_id"])
+
+    # 3. Replicas that fall behind are skipped until they catch up
+    await asyncio.sleep(backend.DB_READ_YOUR_WRITES_WINDOW)
+    await set_replay(paused=True)
+    try:
+        await lag_behind("3. replicas lagging:    ", args, settle)
+    finally:
+        await set_replay(paused=False)
+    await back_to_replicas("   replay resumed:      ", args, settle)
+
+    # 4. Replicas cut off from the primary are skipped until they reconnect
+    conninfos = await set_streaming(None)
+    try:
+        await lag_behind("4. replicas cut off:    ", args, settle)
+    finally:
+        await set_streaming(conninfos)
+    await asyncio.sleep(args.max_lag)
+    await back_to_replicas("   reconnected:         ", args, settle)
+
+    for target, values in latencies.items():
+        if values:
+            print(f"read p50 on the {target}: {statistics.median(values):.2f} ms")
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reads", type=int, default=50, help="Reads per step.")
+    parser.add_argument("--max-lag", type=float, default=1.0, help="Maximum replica lag (s).")
+    parser.add_argument("--user-id", default="usr_001", help="The user of the test order.")
+    parser.add_argument("--product-id", default="car_001", help="The product of the test order.")
+    asyncio.run(main(parser.parse_args()))
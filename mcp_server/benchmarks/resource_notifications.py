@@ -0,0 +1,129 @@
+"""
+Resource subscription benchmark.
+
+Subscribes an MCP session to the product resource of --product-id and to the purchase history of
+--user-id, either in-process (the default) or over HTTP (--url, against a running
+`python main.py`), then:
+1. places --orders orders one at a time, --gap seconds apart, and reports the time from placing
+   each order to receiving the resources/updated notification of the product;
+2. places --burst orders concurrently and reports how many notifications the burst produced for
+   each URI (coalescing: ideally one per URI);
+3. stays idle for --idle seconds and compares the reads of a client polling the product every
+   --poll-interval seconds, which also sees a change --poll-interval / 2 seconds late on average,
+   with the notifications received (none).
+The test orders are deleted and their stock given back at the end.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.resource_notifications --orders 20 --burst 50
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from collections import defaultdict
+from fastmcp import Client
+from mcp.types import ResourceUpdatedNotification, ServerNotification
+
+from backend import close_pool
+from benchmarks.replica_routing import _delete_order
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs the three steps and prints their results.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    product_uri = f"data://products/products/product/{args.product_id}"
+    history_uri = f"data://orders/orders/user/{args.user_id}"
+    received = defaultdict(list)
+
+    # Record the arrival time of every resources/updated notification
+    async def on_message(message):
+        if isinstance(message, ServerNotification):
+            message = message.root
+        if isinstance(message, ResourceUpdatedNotification):
+            received[str(message.params.uri)].append(time.perf_counter())
+
+    if args.url:
+        target = args.url
+    else:
+        from main import mcp_server
+        target = mcp_server
+
+    order_ids = []
+
+    async def place_order():
+        # Place one order and keep its id for the cleanup
+        result = await client.call_tool("orders_create_order", {"order_info": {
+            "user_id": args.user_id, "product_id": args.product_id, "quantity": 1
+        }})
+        order_ids.append(json.loads(result.content[0].text)["order_id"])
+
+    async with Client(target, message_handler=on_message) as client:
+        capabilities = client.initialize_result.capabilities
+        print(f"subscribe capability: {capabilities.resources.subscribe}")
+        for uri in (product_uri, history_uri):
+            await client.session.subscribe_resource(uri)
+
+        try:
+            # 1. Latency from an order to the notification of its product
+            latencies = []
+            for _ in range(args.orders):
+                seen = len(received[product_uri])
+                start = time.perf_counter()
+                await place_order()
+                while len(received[product_uri]) == seen:
+                    await asyncio.sleep(0.001)
+                latencies.append((received[product_uri][-1] - start) * 1000)
+                await asyncio.sleep(args.gap)
+            print(
+                f"1. order to notification: p50 {statistics.median(latencies):.1f} ms, "
+                f"max {max(latencies):.1f} ms over {args.orders} orders"
+            )
+
+            # 2. A burst of concurrent orders is coalesced
+            await asyncio.sleep(args.gap)
+            counts = {uri: len(received[uri]) for uri in (product_uri, history_uri)}
+            start = time.perf_counter()
+            await asyncio.gather(*[place_order() for _ in range(args.burst)])
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(args.gap)
+            for uri, count in counts.items():
+                print(
+                    f"2. burst of {args.burst} orders in {elapsed * 1000:.0f} ms: "
+                    f"{len(received[uri]) - count} notifications for {uri}"
+                )
+
+            # 3. Polling reads the product every interval, whether it changed or not
+            count = len(received[product_uri])
+            polls, start = 0, time.perf_counter()
+            while time.perf_counter() - start < args.idle:
+                await client.read_resource(product_uri)
+                polls += 1
+                await asyncio.sleep(args.poll_interval)
+            print(
+                f"3. idle for {args.idle:.0f} s: polling every {args.poll_interval} s = {polls} "
+                f"reads, push = {len(received[product_uri]) - count} notifications"
+            )
+        finally:
+            for uri in (product_uri, history_uri):
+                await client.session.unsubscribe_resource(uri)
+            for order_id in order_ids:
+                await _delete_order(order_id)
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="MCP endpoint of a running server (default: in-process).")
+    parser.add_argument("--orders", type=int, default=20, help="Orders placed one at a time.")
+    parser.add_argument("--burst", type=int, default=50, help="Orders placed concurrently.")
+    parser.add_argument("--gap", type=float, default=0.3, help="Seconds between single orders.")
+    parser.add_argument("--idle", type=float, default=5, help="Seconds without writes.")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Polling period (s).")
+    parser.add_argument("--user-id", default="usr_syn_1", help="The user of the test orders.")
+    parser.add_argument("--product-id", default="car_syn_1", help="The product of the test orders.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,108 @@
+"""
+Cold start benchmark: eager against lazy (LAZY_SERVERS=true) sub-server loading.
+
+For each mode, --repeat times, in fresh processes:
+- import: the time to import main.py (FastMCP, backend and, in eager mode, every sub-server);
+- first list: the time from starting `python main.py` to the first answered tools/list, which
+  includes the interpreter start, the imports, the migration check and the HTTP server start;
+- first call: the time of the first tool call after that, which in lazy mode also imports and
+  mounts the sub-server of the tool.
+Reports the median of each. Lazy mode needs an up-to-date manifest (python manifest.py).
+
+Usage (from the mcp_server directory):
+    python manifest.py
+    python -m benchmarks.startup --repeat 5
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+from fastmcp import Client
+
+from manifest import read_manifest
+
+# Environment of each mode
+MODES = {"eager": {"LAZY_SERVERS": "false"}, "lazy": {"LAZY_SERVERS": "true"}}
+
+
+def time_import(env: dict[str, str]) -> float:
+    """
+    Imports main.py in a fresh interpreter.
+
+    Returns: The import time in milliseconds.
+    """
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1]) * 1000
+
+
+async def time_first_response(env: dict[str, str], port: int) -> tuple[float, float]:
+    """
+    Starts the server and times its first tools/list answer, then its first tool call.
+
+    Returns: The time to the first tools/list and the time of the first call, in milliseconds.
+    """
+    url = f"http://127.0.0.1:{port}/mcp"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--port", str(port)], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        # Retry until the server answers
+        while True:
+            try:
+                async with Client(url) as client:
+                    await client.list_tools()
+                    first_list = time.perf_counter() - start
+                    call_start = time.perf_counter()
+                    await client.call_tool(
+                        "products_get_product_data",
+                        {"data_detail": "data://products/product/car_001"},
+                    )
+                    return first_list * 1000, (time.perf_counter() - call_start) * 1000
+            except Exception:
+                if server.poll() is not None:
+                    raise RuntimeError("The server exited during startup.")
+                await asyncio.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def main(args: argparse.Namespace):
+    """
+    Times both modes and prints a comparison table.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    if read_manifest() is None:
+        raise SystemExit("Build the tool manifest first: python manifest.py")
+
+    print(f"{args.repeat} runs per mode, medians")
+    print(f"{'mode':>6} {'import_ms':>10} {'first_list_ms':>14} {'first_call_ms':>14}")
+    for mode, overrides in MODES.items():
+        env = {**os.environ, "PYTHONPATH": ".", **overrides}
+        imports, lists, calls = [], [], []
+        for _ in range(args.repeat):
+            imports.append(time_import(env))
+            first_list, first_call = await time_first_response(env, args.port)
+            lists.append(first_list)
+            calls.append(first_call)
+        print(
+            f"{mode:>6} {statistics.median(imports):>10.1f} {statistics.median(lists):>14.1f} "
+            f"{statistics.median(calls):>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per mode.")
+    parser.add_argument("--port", type=int, default=8100, help="Port of the benchmarked server.")
+    asyncio.run(main(parser.parse_args()))
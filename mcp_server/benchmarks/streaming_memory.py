@@ -0,0 +1,154 @@
+"""
+Memory benchmark for streaming result materialization.
+
+Compares the peak memory needed to turn the whole orders table into JSON with the list-of-dicts
+path (fetchall + parse_output + json.dumps) and with the streaming path (server-side cursor +
+fetchmany batches + stream_output). Each mode runs in its own process, so the reported peak RSS
+is not polluted by the other one.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.streaming_memory --seed 2000000 --cleanup
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import subprocess
+import tracemalloc
+
+from backend import db_connector, parse_output, close_pool
+from servers.orders.helpers import _stream_orders
+
+
+@db_connector
+async def _seed_orders(cur, rows: int):
+    """
+    Inserts synthetic orders (ids prefixed with ord_bench_) spread over existing users and products.
+    """
+    await cur.execute(
+        """
+        INSERT INTO orders (order_id, user_id, product_id, quantity, purchase_date, status)
+        SELECT 'ord_bench_' || g,
+               u.ids[1 + g %% array_length(u.ids, 1)],
+               p.ids[1 + g %% array_length(p.ids, 1)],
+               1 + g %% 3,
+               DATE '2020-01-01' + (g %% 2000),
+               'submitted'
+        FROM generate_series(1, %s) AS g,
+             (SELECT array_agg(user_id) AS ids FROM users) AS u,
+             (SELECT array_agg(product_id) AS ids FROM products) AS p;
+        """,
+        (rows,)
+    )
+
+
+@db_connector
+async def _delete_seeded_orders(cur):
+    """
+    Removes the synthetic orders inserted by _seed_orders.
+    """
+    await cur.execute("DELETE FROM orders WHERE order_id LIKE 'ord\\_bench\\_%%';")
+
+
+@db_connector
+async def _fetch_all_orders(cur):
+    """
+    Fetches the whole orders table as a list of dictionaries, the non-streaming way.
+    """
+    await cur.execute("SELECT * FROM orders ORDER BY purchase_date DESC, order_id;")
+    return await parse_output(cur)
+
+
+async def measure(mode: str) -> dict:
+    """
+    Encodes the whole orders table to JSON with the given mode and measures it.
+
+    Args:
+        - mode: "fetchall" for the list-of-dicts path, "stream" for the streaming path.
+
+    Returns: A dictionary with rows, bytes produced, elapsed time and peak memory figures.
+    """
+    # Trace Python allocations while the table is encoded
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == "fetchall":
+        rows = await _fetch_all_orders()
+        payload_bytes, row_count = len(json.dumps(rows, default=str)), len(rows)
+    else:
+        # Consume the stream the way a response writer would, without keeping the chunks
+        payload_bytes = row_count = 0
+        async for chunk in _stream_orders():
+            payload_bytes += len(chunk)
+            row_count += chunk.count("\n")
+    elapsed = time.perf_counter() - start
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await close_pool()
+
+    # ru_maxrss is reported in kilobytes on Linux
+    return {
+        "mode": mode,
+        "rows": row_count,
+        "payload_mb": payload_bytes / 2**20,
+        "seconds": elapsed,
+        "python_peak_mb": traced_peak / 2**20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+async def prepare(seed: int, cleanup: bool):
+    """
+    Seeds or cleans up synthetic orders as requested.
+
+    Args:
+        - seed: The number of synthetic orders to insert (0 to skip).
+        - cleanup: Whether to delete the synthetic orders.
+    """
+    # Seeding and cleanup both run through the regular pooled helpers
+    if cleanup:
+        await _delete_seeded_orders()
+    if seed:
+        await _seed_orders(seed)
+    await close_pool()
+
+
+def main(args: argparse.Namespace):
+    """
+    Runs each mode in a separate process and prints a comparison table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    # A child process only measures one mode and prints its result as JSON
+    if args.mode:
+        print(json.dumps(asyncio.run(measure(args.mode))))
+        return
+
+    # Seed the table, measure both modes in isolation and clean up if requested
+    asyncio.run(prepare(args.seed, cleanup=False))
+    results = [
+        json.loads(subprocess.run(
+            [sys.executable, "-m", "benchmarks.streaming_memory", "--mode", mode],
+            check=True, capture_output=True, text=True
+        ).stdout)
+        for mode in ["fetchall", "stream"]
+    ]
+    if args.cleanup:
+        asyncio.run(prepare(0, cleanup=True))
+
+    print(f"{'mode':>10} {'rows':>10} {'payload_mb':>11} {'seconds':>8} {'py_peak_mb':>11} {'rss_mb':>8}")
+    for r in results:
+        print(
+            f"{r['mode']:>10} {r['rows']:>10} {r['payload_mb']:>11.1f} {r['seconds']:>8.2f} "
+            f"{r['python_peak_mb']:>11.1f} {r['max_rss_mb']:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic orders to insert first.")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic orders at the end.")
+    parser.add_argument("--mode", choices=["fetchall", "stream"], help=argparse.SUPPRESS)
+    main(parser.parse_args())
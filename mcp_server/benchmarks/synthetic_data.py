@@ -0,0 +1,201 @@
+"""
+Deterministic synthetic data generator.
+
+Scales the users, products and orders tables to a configurable size with synthetic rows (ids
+prefixed with usr_syn_, car_syn_ and ord_syn_), generated inside PostgreSQL with generate_series so
+nothing is transferred from the client. Every value is a pure function of the row number and of
+--seed (and of --end-date for order dates), so two runs with the same arguments produce the
+same data. Orders are loaded in batches of
+--batch rows, each in its own transaction.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.synthetic_data --users 100000 --products 10000 --orders 1000000
+    python -m benchmarks.synthetic_data --cleanup
+"""
+import time
+import asyncio
+import argparse
+from datetime import date
+
+from backend import db_connector, close_pool
+
+
+# Categories of the synthetic products
+CATEGORIES = ["Supercar", "Hypercar", "Roadster", "Grand Tourer", "Electric", "Track"]
+
+
+@db_connector
+async def _count_synthetic_rows(cur) -> dict[str, int]:
+    """
+    Counts the synthetic rows of each table.
+    """
+    await cur.execute(
+        """
+        SELECT (SELECT count(*) FROM users WHERE user_id LIKE 'usr\\_syn\\_%%'),
+               (SELECT count(*) FROM products WHERE product_id LIKE 'car\\_syn\\_%%'),
+               (SELECT count(*) FROM orders WHERE order_id LIKE 'ord\\_syn\\_%%');
+        """
+    )
+    return dict(zip(["users", "products", "orders"], await cur.fetchone()))
+
+
+@db_connector
+async def _generate_users(cur, users: int, seed: int):
+    """
+    Inserts users usr_syn_1 to usr_syn_<users>.
+    """
+    await cur.execute(
+        """
+        INSERT INTO users (user_id, name, email, phone_number, shipping_address)
+        SELECT 'usr_syn_' || g,
+               'Synthetic User ' || g,
+               'user.' || g || '@synthetic.bench',
+               '555-' || lpad(((g::bigint * 7919 + %(seed)s) %% 10000)::text, 4, '0'),
+               g || ' Synthetic Street, Benchtown, USA ' || lpad((g %% 100000)::text, 5, '0')
+        FROM generate_series(1, %(users)s) AS g
+        ON CONFLICT DO NOTHING;
+        """,
+        {"users": users, "seed": seed}
+    )
+
+
+@db_connector
+async def _generate_products(cur, products: int, seed: int):
+    """
+    Inserts products car_syn_1 to car_syn_<products>, with plenty of stock.
+    """
+    await cur.execute(
+        """
+        INSERT INTO products (product_id, product_name, description, price, stock_quantity, category)
+        SELECT 'car_syn_' || g,
+               'Synthetic ' || (%(categories)s::text[])[1 + g %% 6] || ' ' || g,
+               'Synthetic car number ' || g || ' for load testing.',
+               50000 + (g::bigint * 104729 + %(seed)s) %% 2950000,
+               1000000,
+               (%(categories)s::text[])[1 + g %% 6]
+        FROM generate_series(1, %(products)s) AS g
+        ON CONFLICT DO NOTHING;
+        """,
+        {"products": products, "seed": seed, "categories": CATEGORIES}
+    )
+
+
+@db_connector
+async def _generate_orders(
+    cur, first: int, last: int, users: int, products: int, seed: int, end_date: date
+):
+    """
+    Inserts orders ord_syn_<first> to ord_syn_<last>, spread over the synthetic users and products
+    and over the two years before end_date.
+    """
+    await cur.execute(
+        """
+        INSERT INTO orders (order_id, user_id, product_id, quantity, purchase_date, delivery_date, status)
+        SELECT 'ord_syn_' || g,
+               'usr_syn_' || (1 + (g::bigint * 2654435761 + %(seed)s) %% %(users)s),
+               'car_syn_' || (1 + (g::bigint * 40503 + %(seed)s) %% %(products)s),
+               1 + g %% 3,
+               %(end_date)s::date - ((g::bigint * 7 + %(seed)s) %% 730)::int,
+               CASE WHEN g %% 3 = 0
+                    THEN %(end_date)s::date - ((g::bigint * 7 + %(seed)s) %% 730)::int + 7 END,
+               (ARRAY['in_progress', 'submitted', 'delivered'])[1 + g %% 3]
+        FROM generate_series(%(first)s, %(last)s) AS g
+        ON CONFLICT DO NOTHING;
+        """,
+        {
+            "first": first,
+            "last": last,
+            "users": users,
+            "products": products,
+            "seed": seed,
+            "end_date": end_date,
+        }
+    )
+
+
+@db_connector
+async def _analyze(cur):
+    """
+    Refreshes the planner statistics after a bulk load.
+    """
+    await cur.execute("ANALYZE users, products, orders;")
+
+
+@db_connector
+async def _delete_synthetic_rows(cur):
+    """
+    Deletes the synthetic orders, products and users, and their sales summary rows.
+    """
+    await cur.execute("DELETE FROM orders WHERE order_id LIKE 'ord\\_syn\\_%%';")
+    await cur.execute("DELETE FROM products WHERE product_id LIKE 'car\\_syn\\_%%';")
+    await cur.execute("DELETE FROM users WHERE user_id LIKE 'usr\\_syn\\_%%';")
+    await cur.execute("DELETE FROM user_sales_summary WHERE user_id LIKE 'usr\\_syn\\_%%';")
+    await cur.execute("DELETE FROM product_sales_summary WHERE product_id LIKE 'car\\_syn\\_%%';")
+    await cur.execute("DELETE FROM daily_sales_summary WHERE product_id LIKE 'car\\_syn\\_%%';")
+
+
+async def generate(
+    users: int,
+    products: int,
+    orders: int,
+    seed: int = 42,
+    batch: int = 100000,
+    end_date: date | None = None,
+):
+    """
+    Loads the synthetic data set, skipping the rows that already exist.
+
+    Args:
+        - users: The number of synthetic users.
+        - products: The number of synthetic products.
+        - orders: The number of synthetic orders.
+        - seed: The seed every generated value depends on.
+        - batch: The number of orders inserted per transaction.
+        - end_date: The date of the most recent orders, today by default.
+    """
+    # Users and products first, since orders reference them
+    start = time.perf_counter()
+    await _generate_users(users, seed)
+    await _generate_products(products, seed)
+    print(f"users and products: {time.perf_counter() - start:.1f}s")
+
+    # Orders in batches, to keep each transaction (and its trigger work) bounded
+    start = time.perf_counter()
+    for first in range(1, orders + 1, batch):
+        await _generate_orders(
+            first, min(first + batch - 1, orders), users, products, seed, end_date or date.today()
+        )
+    elapsed = time.perf_counter() - start
+    print(f"orders: {elapsed:.1f}s ({orders / elapsed:,.0f} rows/s)" if orders else "orders: none")
+    await _analyze()
+
+
+async def main(args: argparse.Namespace):
+    """
+    Generates or deletes the synthetic data set and prints the resulting row counts.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    if args.cleanup:
+        await _delete_synthetic_rows()
+    else:
+        await generate(
+            args.users, args.products, args.orders, args.seed, args.batch, args.end_date
+        )
+    print(f"synthetic rows: {await _count_synthetic_rows()}")
+    await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000, help="Synthetic users.")
+    parser.add_argument("--products", type=int, default=1000, help="Synthetic products.")
+    parser.add_argument("--orders", type=int, default=100000, help="Synthetic orders.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the generated values.")
+    parser.add_argument("--batch", type=int, default=100000, help="Orders per transaction.")
+    parser.add_argument(
+        "--end-date", type=date.fromisoformat, help="Date of the most recent orders (default: today)."
+    )
+    parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic rows instead.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+"""
+Bulk user import benchmark.
+
+Loads the same number of synthetic users twice: once with one add_new_user insert per user and
+once with a single COPY-based import_users call, and reports rows per second for each. The
+synthetic users (emails ending in @import.bench) are deleted before and after the run.
+
+Usage (from the mcp_server directory):
+    python -m benchmarks.user_import --rows 1000 20000
+"""
+import time
+import asyncio
+import argparse
+
+from backend import db_connector, close_pool
+from servers.users.helpers import NewUserInfo, _add_new_user, _import_users
+
+
+@db_connector
+async def _delete_bench_users(cur):
+    """
+    Deletes the synthetic users created by this benchmark.
+    """
+    await cur.execute("DELETE FROM users WHERE email LIKE '%%@import.bench';")
+
+
+def make_users(count: int, prefix: str) -> list[NewUserInfo]:
+    """
+    Builds deterministic synthetic users.
+
+    Args:
+        - count: The number of users.
+        - prefix: A prefix making the emails unique across runs.
+
+    Returns: The list of users.
+    """
+    return [
+        NewUserInfo(
+            name=f"Bench User {i}",
+            email=f"{prefix}.{i}@import.bench",
+            phone_number=f"555-{i % 10000:04d}",
+            shipping_address=f"{i} Benchmark Road, Loadtown, USA",
+        )
+        for i in range(count)
+    ]
+
+
+async def main(args: argparse.Namespace):
+    """
+    Runs both loading approaches for every size and prints a comparison table.
+
+    Args:
+        - args: The parsed command line arguments.
+    """
+    await _delete_bench_users()
+    try:
+        print(f"{'rows':>7} {'single_rows/s':>14} {'copy_rows/s':>12} {'speedup':>8}")
+        for count in args.rows:
+            # One INSERT per user, as add_new_user does
+            start = time.perf_counter()
+            for user in make_users(count, f"single{count}"):
+                await _add_new_user(user)
+            single = count / (time.perf_counter() - start)
+
+            # One COPY-based import for all the users
+            start = time.perf_counter()
+            await _import_users(make_users(count, f"copy{count}"))
+            bulk = count / (time.perf_counter() - start)
+            print(f"{count:>7} {single:>14.0f} {bulk:>12.0f} {bulk / single:>7.1f}x")
+    finally:
+        await _delete_bench_users()
+        await close_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 20000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,128 @@
+"""
+Multi-worker throughput benchmark.
+
+Starts the HTTP server (python main.py --workers N) for each worker count in --workers, drives it
+with the operation mix of benchmarks.load_driver from --client-processes processes of
+--concurrency sessions each for --duration seconds, and reports requests per second, errors and
+latency percentiles per worker count. The load comes from several processes so that the client
+is not the bottleneck; on a machine with few cores, clients and workers compete for them.
+
+Usage (from the mcp_server directory, with the synthetic data set loaded):
+    python -m benchmarks.worker_scaling --workers 1 2 4 --duration 20
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from backend import close_pool
+from benchmarks.load_driver import build_operations, worker
+from benchmarks.product_search import percentile
+from benchmarks.synthetic_data import _count_synthetic_rows
+
+
+def run_clients(url: str, sizes: dict, writes: bool, seed: int, sessions: int, duration: float):
+    """
+    Runs one client process: sessions concurrent MCP sessions over HTTP.
+
+    Args:
+        - url: The MCP endpoint of the server.
+        - sizes: The number of synthetic users, products and orders.
+        - writes: Whether to include order placement.
+        - seed: The seed of the first session's random generator.
+        - sessions: The number of concurrent sessions.
+        - duration: Seconds to run.
+
+    Returns: The latencies in seconds and the error count of every call.
+    """
+    async def run():
+        operations = build_operations(sizes, writes)
+        latencies, errors = defaultdict(list), defaultdict(int)
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*[
+            worker(url, operations, seed + i, deadline, latencies, errors) for i in range(sessions)
+        ])
+        return [value for values in latencies.values() for value in values], sum(errors.values())
+
+    return asyncio.run(run())
+
+
+def wait_until_ready(port: int, timeout: float = 60):
+    """
+    Waits for the server to answer on its /metrics route.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"The server did not start on port {port}.")
+
+
+async def main(args: argparse.Namespace):
+    """
+    Benchmarks every worker count and prints a comparison table.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    # Size the id ranges from the synthetic data set
+    sizes = await _count_synthetic_rows()
+    await close_pool()
+    if not all(sizes.values()):
+        raise SystemExit(f"Load the synthetic data set first (benchmarks.synthetic_data): {sizes}")
+
+    print(
+        f"{args.client_processes} client processes x {args.concurrency} sessions, "
+        f"{args.duration:.0f}s per run, {os.cpu_count()} CPUs"
+    )
+    print(f"{'workers':>7} {'requests':>9} {'errors':>6} {'p50_ms':>8} {'p99_ms':>8} {'req/s':>8}")
+    for workers in args.workers:
+        # Start the server with this number of workers
+        server = subprocess.Popen(
+            [sys.executable, "main.py", "--workers", str(workers), "--port", str(args.port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(args.port)
+            url = f"http://127.0.0.1:{args.port}/mcp"
+
+            # Drive it from several client processes at once
+            with ProcessPoolExecutor(args.client_processes) as pool:
+                runs = [
+                    pool.submit(
+                        run_clients, url, sizes, args.writes, args.seed + 1000 * i,
+                        args.concurrency, args.duration
+                    )
+                    for i in range(args.client_processes)
+                ]
+                results = [run.result() for run in runs]
+        finally:
+            server.terminate()
+            server.wait()
+
+        latencies = [latency * 1000 for values, _ in results for latency in values]
+        errors = sum(count for _, count in results)
+        print(
+            f"{workers:>7} {len(latencies):>9} {errors:>6} {percentile(latencies, 50):>8.2f} "
+            f"{percentile(latencies, 99):>8.2f} {len(latencies) / args.duration:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts.")
+    parser.add_argument("--client-processes", type=int, default=4, help="Load generator processes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sessions per client process.")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per worker count.")
+    parser.add_argument("--port", type=int, default=8100, help="Port of the benchmarked server.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the sessions' generators.")
+    parser.add_argument("--writes", action="store_true", help="Include order placement.")
+    asyncio.run(main(parser.parse_args()))
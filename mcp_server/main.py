@@ -1,22 +1,360 @@
+import os
+import sys
+import asyncio
+import argparse
+import warnings
+import functools
+import importlib
+import contextlib
+from typing import Any
+import uvicorn
 from fastmcp import FastMCP
+from mcp import types
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from dotenv import load_dotenv
 
-from servers.users.server import user_server
-from servers.products.server import product_server
-from servers.orders.server import order_server
+from manifest import load_server, mount_lazily
+
+# Load environment variables from .env file (backend.py, imported later in lazy mode, loads the
+# same one)
+load_dotenv(dotenv_path='../.env')
+
+# The individual servers by mount prefix: the module defining each one and its FastMCP object
+SUB_SERVERS = {
+    "users": ("servers.users.server", "user_server"),
+    "products": ("servers.products.server", "product_server"),
+    "orders": ("servers.orders.server", "order_server"),
+    "admin": ("servers.admin.server", "admin_server"),
+}
 
 # Initialize the main MCP application
 mcp_server = FastMCP("Ecommerce")
 
-# Mount the individual servers with their respective prefixes
-mcp_server.mount(user_server, prefix="users")
-mcp_server.mount(product_server, prefix="products")
-mcp_server.mount(order_server, prefix="orders")
+# Slots shared by the lookups of every get_batch_data call (created by wire_backend), and the
+# loading of backend.py in lazy mode (see load_backend)
+_batch_slots = None
+_backend_loading = None
+
+
+def wire_backend():
+    """
+    Connects the root server to backend.py: response metrics, resource subscriptions and the
+    get_batch_data concurrency limit.
+
+    Notes:
+        - backend.py (with psycopg, the settings and the pools) is imported here rather than at
+          the top of the module, so that with LAZY_SERVERS=true nothing imports it before the
+          first call (see load_backend).
+    """
+    global _batch_slots
+    from backend import (
+        BATCH_CONCURRENCY,
+        enable_resource_subscriptions,
+        publishes_changes,
+        record_response_size,
+    )
+    _batch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    # Measure the responses where FastMCP encodes them, for every mounted server
+    mcp_server.add_middleware(record_response_size)
+
+    # Push resources/updated notifications to the sessions subscribed to the order and product
+    # resources when the database triggers report changes to their rows
+    enable_resource_subscriptions(mcp_server)
+    publishes_changes(
+        "orders",
+        "data://orders/orders/order/{order_id}",
+        "data://orders/orders/user/{user_id}",
+        "data://orders/orders/user/{user_id}/compact",
+        "data://orders/orders",
+        "data://orders/orders/compact",
+    )
+    publishes_changes(
+        "products",
+        "data://products/products/product/{product_id}",
+        "data://products/products",
+        "data://products/products/compact",
+    )
+
+
+async def load_backend():
+    """
+    In lazy mode, applies the pending migrations, wires the root server to backend.py (see
+    wire_backend) and starts the cache invalidation listener, once, on the first tool call,
+    resource read, subscription or HTTP route that needs the database. Concurrent callers wait
+    for the same load. Does nothing in eager mode, where all of it happens at startup.
+    """
+    global _backend_loading
+    if not lazy:
+        return
+    if _backend_loading is None:
+        async def load():
+            from migrate import apply_migrations
+            from backend import start_invalidation_listener
+            await apply_migrations()
+            wire_backend()
+            start_invalidation_listener()
+        _backend_loading = asyncio.ensure_future(load())
+    # A failed load (e.g. the database is down) is retried by the next caller
+    try:
+        await _backend_loading
+    except Exception:
+        _backend_loading = None
+        raise
+
+
+def defer_subscriptions(server: FastMCP):
+    """
+    In lazy mode, advertises resource subscriptions before backend.py is loaded. The first
+    subscription loads it (see load_backend), which registers the real handlers (see
+    enable_resource_subscriptions), and is then handed over to them.
+
+    Args:
+        - server: The root FastMCP server.
+    """
+    low_level = server._mcp_server
+
+    @low_level.subscribe_resource()
+    async def subscribe(uri):
+        await load_backend()
+        await low_level.request_handlers[types.SubscribeRequest](
+            types.SubscribeRequest(
+                method="resources/subscribe", params=types.SubscribeRequestParams(uri=uri)
+            )
+        )
+
+    @low_level.unsubscribe_resource()
+    async def unsubscribe(uri):
+        # Nothing can be subscribed before the first subscription replaced these handlers
+        return None
+
+    # Advertise the subscribe capability next to the handlers
+    get_capabilities = low_level.get_capabilities
+
+    @functools.wraps(get_capabilities)
+    def with_subscribe(*args, **kwargs):
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    low_level.get_capabilities = with_subscribe
+
+
+def handled(func):
+    """
+    Decorator applying backend.handle_errors to a tool of this module on its first call, so that
+    defining the tool does not import backend.py (see wire_backend).
+    """
+    wrapped = None
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        nonlocal wrapped
+        if wrapped is None:
+            from backend import handle_errors
+            wrapped = handle_errors(func)
+        return await wrapped(*args, **kwargs)
+    return wrapper
+
+
+# Mount the individual servers with their respective prefixes. With LAZY_SERVERS=true, the
+# listings come from the prebuilt manifest, and backend.py and each server are imported on the
+# first call instead
+lazy = os.getenv("LAZY_SERVERS") == "true" and mount_lazily(
+    mcp_server, SUB_SERVERS, prepare=load_backend
+)
+if os.getenv("LAZY_SERVERS") == "true" and not lazy:
+    warnings.warn("No up-to-date tool manifest (python manifest.py): mounting every server.")
+if lazy:
+    defer_subscriptions(mcp_server)
+else:
+    wire_backend()
+    for prefix in SUB_SERVERS:
+        mcp_server.mount(load_server(SUB_SERVERS, prefix), prefix=prefix)
+
+
+def sub_server_module(prefix: str):
+    """
+    Returns the module of an individual server, importing it on first use.
+    """
+    return importlib.import_module(SUB_SERVERS[prefix][0])
+
+
+@mcp_server.custom_route("/export/orders", methods=["GET"])
+async def export_orders(request: Request):
+    """
+    Exposes the streaming orders export of the orders server as a plain HTTP route next to the
+    MCP transport (see export_orders in servers/orders/server.py).
+
+    Args:
+        request: The incoming HTTP request.
+
+    Returns:
+        The streamed export.
+    """
+    await load_backend()
+    return await sub_server_module("orders").export_orders(request)
+
+
+@mcp_server.custom_route("/metrics", methods=["GET"])
+async def metrics(request: Request) -> PlainTextResponse:
+    """
+    Exposes the latency, row, payload and error metrics of every tool and resource, with the
+    connection pool and cache state, in the Prometheus text format.
+
+    Args:
+        request: The incoming HTTP request.
+
+    Returns:
+        The metrics page.
+    """
+    # Before the first call of a lazy server, backend.py is not loaded and nothing was measured
+    if "backend" not in sys.modules:
+        return PlainTextResponse("", media_type="text/plain; version=0.0.4")
+    from backend import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# Each family of data URIs is resolved by the get_*_data tool of its server
+DATA_RESOLVERS = {
+    "users": "get_user_data",
+    "products": "get_product_data",
+    "orders": "get_order_data",
+}
+
+
+async def resolve_data_uri(data_detail: str) -> list[dict[str, Any]] | dict[str, Any]:
+    """
+    Resolves a single data URI with the get_*_data tool of the server it belongs to.
+
+    Args:
+        - data_detail: A data URI such as data://orders/user/usr_001?limit=5.
+
+    Returns: The data, or a failure dictionary if the URI cannot be resolved.
+    """
+    # The URI family is its first path segment, e.g. "users" in data://users/user/usr_001
+    family = data_detail.removeprefix("data://").partition("?")[0].partition("/")[0]
+    if not data_detail.startswith("data://") or family not in DATA_RESOLVERS:
+        return {
+            "status": "failure",
+            "message": f"Invalid data detail: {data_detail}. Use a data://users, "
+                       "data://products or data://orders URL."
+        }
+    return await getattr(sub_server_module(family), DATA_RESOLVERS[family]).fn(data_detail)
+
+
+@mcp_server.tool
+@handled
+async def get_batch_data(data_details: list[str]) -> dict[str, Any]:
+    """
+    Fetches several data URIs in one call, resolving them concurrently. Prefer it over several
+    get_*_data calls whenever more than one piece of data is needed, e.g. a user's profile, their
+    orders and the products they bought.
+
+    data_details is the list of URLs of the data to query. Each of them has one of the formats
+    accepted by get_user_data, get_product_data and get_order_data, e.g.
+    - data://users/user/{user_id}
+    - data://orders/user/{user_id}?fields=order_id,product_name&limit=10
+    - data://products/product/{product_id}
+
+    Args:
+        data_details: the data to retrieve
+
+    Returns:
+        A dictionary mapping every URL to its data. A URL that cannot be resolved maps to a
+        failure message, without affecting the other ones.
+    """
+    # Resolve every distinct URI once, up to the configured batch size
+    from backend import BATCH_MAX_URIS
+    uris = list(dict.fromkeys(data_details))
+    if len(uris) > BATCH_MAX_URIS:
+        raise ValueError(f"At most {BATCH_MAX_URIS} data URIs can be fetched in one call.")
+
+    # Each URI borrows its own pooled connection, so the lookups overlap on the database, at most
+    # BATCH_CONCURRENCY at a time so the pool keeps connections for the other requests
+    async def resolve(uri: str) -> Any:
+        async with _batch_slots:
+            return await resolve_data_uri(uri)
+
+    results = await asyncio.gather(*(resolve(uri) for uri in uris))
+    return dict(zip(uris, results))
+
+
+def create_app():
+    """
+    ASGI app factory of the HTTP server, used by each worker process in multi-worker mode
+    (uvicorn main:create_app --factory).
+
+    Returns:
+        The Starlette app serving the MCP endpoint (/mcp) and the custom routes.
+
+    Notes:
+        - Each worker owns its connection pools and caches. With MCP_STATELESS_HTTP=true, every
+          MCP request is self-contained instead of belonging to a session held in one worker's
+          memory, so any worker can serve any request. The read-your-writes windows of the
+          read/write split are per worker (see current_session), so `python main.py` refuses to
+          start several workers when read replicas are configured.
+        - The worker listens to the cache invalidations of the others (CACHE_INVALIDATION=postgres)
+          and closes its pools on shutdown.
+    """
+    app = mcp_server.http_app(stateless_http=os.getenv("MCP_STATELESS_HTTP") == "true")
+    mcp_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        # In lazy mode, the listener starts with backend.py on the first call (see load_backend)
+        if not lazy:
+            from backend import start_invalidation_listener
+            start_invalidation_listener()
+        async with mcp_lifespan(app):
+            yield
+        if "backend" in sys.modules:
+            from backend import close_pool, stop_change_listener, stop_invalidation_listener
+            await stop_invalidation_listener()
+            await stop_change_listener()
+            await close_pool()
+
+    app.router.lifespan_context = lifespan
+    return app
 
 
 if __name__ == "__main__":
-    mcp_server.run(
-        transport="http",
-        host="0.0.0.0",
-        port=8000,
-        log_level="debug",
-    )
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ecommerce MCP server.")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes.")
+    args = parser.parse_args()
+
+    # Read-your-writes windows live in each worker's memory, so a write on one worker could be
+    # followed by a read of a lagging replica on another: refuse the combination
+    replicas = any(dsn.strip() for dsn in os.getenv("DB_REPLICA_DSNS", "").split(","))
+    if args.workers > 1 and replicas:
+        parser.error("--workers > 1 cannot be combined with DB_REPLICA_DSNS (no read-your-writes).")
+
+    # Bring the database schema up to date before serving requests (in lazy mode, before the
+    # first call instead, see load_backend)
+    if not lazy:
+        from migrate import apply_migrations
+        asyncio.run(apply_migrations())
+    if args.workers == 1:
+        mcp_server.run(
+            transport="http",
+            host=args.host,
+            port=args.port,
+            log_level="debug",
+        )
+    else:
+        # Several processes behind one socket: stateless MCP requests, and cache invalidations
+        # broadcast between the workers through PostgreSQL (the workers inherit the environment)
+        os.environ.setdefault("MCP_STATELESS_HTTP", "true")
+        os.environ.setdefault("CACHE_INVALIDATION", "postgres")
+        uvicorn.run(
+            "main:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level="info",
+        )
@@ -0,0 +1,198 @@
+import json
+import asyncio
+import hashlib
+import importlib
+from pathlib import Path
+from typing import Any
+
+from fastmcp import FastMCP
+from mcp import types
+
+# Precomputed tools, resources and resource templates of the mounted servers, written by
+# `python manifest.py` (e.g. when building the container image) and read by lazy startup
+MANIFEST_PATH = Path(__file__).parent / "tool_manifest.json"
+
+# Folder whose sources the manifest describes: any change to them makes the manifest stale
+SERVERS_DIR = Path(__file__).parent / "servers"
+
+
+def fingerprint() -> str:
+    """
+    Hashes the sources of the servers, to tell whether a manifest still describes them.
+
+    Returns: The hex SHA-256 of the paths and contents of every servers/**/*.py file.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(SERVERS_DIR.rglob("*.py")):
+        digest.update(str(path.relative_to(SERVERS_DIR)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_server(sub_servers: dict[str, tuple[str, str]], prefix: str) -> FastMCP:
+    """
+    Imports a sub-server.
+
+    Args:
+        - sub_servers: The module and attribute of each sub-server, by mount prefix.
+        - prefix: The mount prefix of the sub-server to import.
+
+    Returns: The FastMCP server object.
+    """
+    module, attribute = sub_servers[prefix]
+    return getattr(importlib.import_module(module), attribute)
+
+
+async def describe_server(server: FastMCP, prefix: str) -> dict[str, list[dict[str, Any]]]:
+    """
+    Lists what a sub-server exposes once mounted under a prefix, in the MCP wire format.
+
+    Args:
+        - server: The sub-server.
+        - prefix: Its mount prefix.
+
+    Returns: Its "tools", "resources" and "resource_templates", as JSON-ready dictionaries.
+    """
+    # Mount it alone on a scratch parent, so names and URIs carry the prefix
+    parent = FastMCP("Manifest")
+    parent.mount(server, prefix=prefix)
+    listings = {
+        "tools": await parent._mcp_list_tools(),
+        "resources": await parent._mcp_list_resources(),
+        "resource_templates": await parent._mcp_list_resource_templates(),
+    }
+    return {
+        kind: [item.model_dump(mode="json", by_alias=True, exclude_none=True) for item in items]
+        for kind, items in listings.items()
+    }
+
+
+async def build_manifest(sub_servers: dict[str, tuple[str, str]]) -> dict[str, Any]:
+    """
+    Imports every sub-server and writes the manifest of what they expose to MANIFEST_PATH.
+
+    Args:
+        - sub_servers: The module and attribute of each sub-server, by mount prefix.
+
+    Returns: The manifest: the fingerprint of the sources and the listings of each sub-server.
+    """
+    manifest = {
+        "fingerprint": fingerprint(),
+        "servers": {
+            prefix: await describe_server(load_server(sub_servers, prefix), prefix)
+            for prefix in sub_servers
+        },
+    }
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=1))
+    return manifest
+
+
+def read_manifest() -> dict[str, Any] | None:
+    """
+    Reads the manifest, if it exists and matches the current sources.
+
+    Returns: The manifest, or None if it is missing or stale.
+    """
+    if not MANIFEST_PATH.exists():
+        return None
+    manifest = json.loads(MANIFEST_PATH.read_text())
+    return manifest if manifest.get("fingerprint") == fingerprint() else None
+
+
+def mount_lazily(
+    server: FastMCP, sub_servers: dict[str, tuple[str, str]], prepare: Any = None
+) -> bool:
+    """
+    Serves the listings of the sub-servers from the manifest, and imports and mounts each
+    sub-server on the first tool call or resource read that targets it.
+
+    Args:
+        - server: The root FastMCP server.
+        - sub_servers: The module and attribute of each sub-server, by mount prefix.
+        - prepare: An optional coroutine function awaited before every tool call and resource
+          read, before the target sub-server is loaded (e.g. to load what the servers need).
+
+    Returns: True if lazy loading is set up, False if the manifest is missing or stale (the
+        caller should then mount the sub-servers eagerly).
+
+    Notes:
+        - tools/list, resources/list and resources/templates/list answer with what the loaded
+          servers expose plus the manifest entries of the others, without importing them.
+        - A tool belongs to the sub-server whose prefix starts its name (users_add_new_user), a
+          resource to the one whose prefix starts its path (data://users/...).
+        - The handlers are registered on FastMCP's low-level server, in front of FastMCP's own.
+    """
+    manifest = read_manifest()
+    if manifest is None:
+        return False
+    low_level = server._mcp_server
+    pending = dict.fromkeys(sub_servers)
+
+    # The manifest entries of the sub-servers not loaded yet, as MCP types
+    models = {
+        "tools": types.Tool,
+        "resources": types.Resource,
+        "resource_templates": types.ResourceTemplate,
+    }
+    listings = {
+        prefix: {
+            kind: [model.model_validate(item) for item in manifest["servers"][prefix][kind]]
+            for kind, model in models.items()
+        }
+        for prefix in sub_servers
+    }
+
+    def unloaded(kind: str) -> list:
+        return [item for prefix in pending for item in listings[prefix][kind]]
+
+    def ensure_loaded(prefix: str | None):
+        # Import and mount the sub-server on first use (no await: concurrent calls mount once)
+        if prefix in pending:
+            server.mount(load_server(sub_servers, prefix), prefix=prefix)
+            del pending[prefix]
+
+    def prefix_of_tool(name: str) -> str | None:
+        return next((prefix for prefix in pending if name.startswith(f"{prefix}_")), None)
+
+    def prefix_of_uri(uri) -> str | None:
+        return str(uri).partition("://")[2].partition("/")[0]
+
+    # Listings: the loaded servers, then the manifest entries of the others
+    @low_level.list_tools()
+    async def list_tools() -> list[types.Tool]:
+        return await server._mcp_list_tools() + unloaded("tools")
+
+    @low_level.list_resources()
+    async def list_resources() -> list[types.Resource]:
+        return await server._mcp_list_resources() + unloaded("resources")
+
+    @low_level.list_resource_templates()
+    async def list_resource_templates() -> list[types.ResourceTemplate]:
+        return await server._mcp_list_resource_templates() + unloaded("resource_templates")
+
+    # Calls and reads: load the target server first, then let FastMCP handle the request
+    @low_level.call_tool()
+    async def call_tool(name: str, arguments: dict[str, Any]):
+        if prepare is not None:
+            await prepare()
+        ensure_loaded(prefix_of_tool(name))
+        return await server._mcp_call_tool(name, arguments)
+
+    @low_level.read_resource()
+    async def read_resource(uri):
+        if prepare is not None:
+            await prepare()
+        ensure_loaded(prefix_of_uri(uri))
+        return await server._mcp_read_resource(uri)
+
+    return True
+
+
+if __name__ == "__main__":
+    from main import SUB_SERVERS
+    built = asyncio.run(build_manifest(SUB_SERVERS))
+    counts = {
+        prefix: {kind: len(items) for kind, items in listings.items()}
+        for prefix, listings in built["servers"].items()
+    }
+    print(f"Wrote {MANIFEST_PATH.name}: {counts}")
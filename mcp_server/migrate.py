@@ -0,0 +1,71 @@
+import asyncio
+from pathlib import Path
+
+from backend import connect
+
+# Folder holding the versioned migrations, named <version>_<description>.sql
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Arbitrary key of the advisory lock serializing concurrent migration runs
+MIGRATIONS_LOCK_KEY = 7_240_001
+
+
+def list_migrations() -> list[tuple[int, str, Path]]:
+    """
+    Lists the migration files, ordered by version.
+
+    Returns: A list of (version, name, path) tuples.
+    """
+    # The version is the numeric prefix of the file name
+    return sorted(
+        (int(path.stem.split("_", 1)[0]), path.stem, path)
+        for path in MIGRATIONS_DIR.glob("*.sql")
+    )
+
+
+async def apply_migrations() -> list[str]:
+    """
+    Applies the pending migrations to the database, each one in its own transaction.
+
+    Returns: The names of the migrations applied by this run.
+
+    Notes:
+        - Applied versions are recorded in the schema_migrations table.
+        - An advisory lock makes concurrent server starts apply each migration only once.
+    """
+    applied = []
+    conn = await connect(autocommit=True)
+    try:
+        # Serialize concurrent runs and make sure the bookkeeping table exists
+        # (autocommit, so that each migration below gets its own real transaction)
+        await conn.execute("SELECT pg_advisory_lock(%s);", (MIGRATIONS_LOCK_KEY,))
+        await conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            );
+            """
+        )
+        cur = await conn.execute("SELECT version FROM schema_migrations;")
+        done = {row[0] for row in await cur.fetchall()}
+
+        # Apply every pending migration together with its bookkeeping row
+        for version, name, path in list_migrations():
+            if version in done:
+                continue
+            async with conn.transaction():
+                await conn.execute(path.read_text())
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name)
+                )
+            applied.append(name)
+    finally:
+        # Closing the session also releases the advisory lock
+        await conn.close()
+    return applied
+
+
+if __name__ == "__main__":
+    print(asyncio.run(apply_migrations()) or "Database schema is up to date.")
@@ -0,0 +1,7 @@
+-- Purchase history: WHERE user_id = ... ORDER BY purchase_date DESC
+CREATE INDEX IF NOT EXISTS orders_user_id_purchase_date_idx
+    ON orders (user_id, purchase_date DESC);
+
+-- Order listing and keyset pagination: ORDER BY purchase_date DESC, order_id
+CREATE INDEX IF NOT EXISTS orders_purchase_date_order_id_idx
+    ON orders (purchase_date DESC, order_id);
@@ -0,0 +1,18 @@
+-- Full-text search over product_name (weight A) and description (weight B), kept in sync by
+-- PostgreSQL as a stored generated column
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(product_name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS products_search_vector_idx
+    ON products USING GIN (search_vector);
+
+-- Category facet: WHERE lower(category) = lower(...)
+CREATE INDEX IF NOT EXISTS products_category_idx
+    ON products (lower(category));
+
+-- Price range facet: WHERE price BETWEEN ... AND ...
+CREATE INDEX IF NOT EXISTS products_price_idx
+    ON products (price);
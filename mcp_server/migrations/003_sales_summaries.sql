@@ -0,0 +1,114 @@
+-- Sales summaries, kept up to date by statement-level triggers on orders: every INSERT (or DELETE)
+-- adds (or subtracts) the aggregates of the rows it touched, in the same transaction.
+-- Revenue is quantity * price, with the price of the product when the order is written.
+
+-- Block order writes while the summaries are created and backfilled, so no order is missed
+LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE;
+
+-- Per user: lifetime order count, units bought and spend
+CREATE TABLE IF NOT EXISTS user_sales_summary (
+    user_id VARCHAR(255) PRIMARY KEY,
+    order_count BIGINT NOT NULL,
+    units BIGINT NOT NULL,
+    total_spent NUMERIC(16, 2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_sales_summary_total_spent_idx
+    ON user_sales_summary (total_spent DESC);
+
+-- Per product: lifetime order count, units sold and revenue
+CREATE TABLE IF NOT EXISTS product_sales_summary (
+    product_id VARCHAR(255) PRIMARY KEY,
+    order_count BIGINT NOT NULL,
+    units_sold BIGINT NOT NULL,
+    revenue NUMERIC(16, 2) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS product_sales_summary_revenue_idx
+    ON product_sales_summary (revenue DESC);
+CREATE INDEX IF NOT EXISTS product_sales_summary_units_sold_idx
+    ON product_sales_summary (units_sold DESC);
+
+-- Per day and product: order count, units sold and revenue (daily totals and period rankings)
+CREATE TABLE IF NOT EXISTS daily_sales_summary (
+    sales_date DATE NOT NULL,
+    product_id VARCHAR(255) NOT NULL,
+    order_count BIGINT NOT NULL,
+    units_sold BIGINT NOT NULL,
+    revenue NUMERIC(16, 2) NOT NULL,
+    PRIMARY KEY (sales_date, product_id)
+);
+
+-- Backfill the summaries from the existing orders
+INSERT INTO user_sales_summary (user_id, order_count, units, total_spent)
+SELECT o.user_id, count(*), sum(o.quantity), sum(o.quantity * p.price)
+FROM orders o JOIN products p ON o.product_id = p.product_id
+GROUP BY o.user_id
+ON CONFLICT (user_id) DO NOTHING;
+
+INSERT INTO product_sales_summary (product_id, order_count, units_sold, revenue)
+SELECT o.product_id, count(*), sum(o.quantity), sum(o.quantity * p.price)
+FROM orders o JOIN products p ON o.product_id = p.product_id
+GROUP BY o.product_id
+ON CONFLICT (product_id) DO NOTHING;
+
+INSERT INTO daily_sales_summary (sales_date, product_id, order_count, units_sold, revenue)
+SELECT o.purchase_date, o.product_id, count(*), sum(o.quantity), sum(o.quantity * p.price)
+FROM orders o JOIN products p ON o.product_id = p.product_id
+GROUP BY o.purchase_date, o.product_id
+ON CONFLICT (sales_date, product_id) DO NOTHING;
+
+-- Apply the orders changed by one statement (the changed_orders transition table) to the
+-- summaries. TG_ARGV[0] is 1 for inserted orders and -1 for deleted ones. Keys are upserted in
+-- sorted order so that concurrent transactions lock summary rows in the same order.
+CREATE OR REPLACE FUNCTION refresh_sales_summaries() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    sign INTEGER := TG_ARGV[0]::INTEGER;
+BEGIN
+    -- Orders rejected for lack of stock insert no row: nothing to apply
+    IF NOT EXISTS (SELECT 1 FROM changed_orders) THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO user_sales_summary AS s (user_id, order_count, units, total_spent)
+    SELECT c.user_id, sign * count(*), sign * sum(c.quantity), sign * sum(c.quantity * p.price)
+    FROM changed_orders c JOIN products p ON c.product_id = p.product_id
+    GROUP BY c.user_id ORDER BY c.user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units = s.units + EXCLUDED.units,
+        total_spent = s.total_spent + EXCLUDED.total_spent;
+
+    INSERT INTO product_sales_summary AS s (product_id, order_count, units_sold, revenue)
+    SELECT c.product_id, sign * count(*), sign * sum(c.quantity), sign * sum(c.quantity * p.price)
+    FROM changed_orders c JOIN products p ON c.product_id = p.product_id
+    GROUP BY c.product_id ORDER BY c.product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units_sold = s.units_sold + EXCLUDED.units_sold,
+        revenue = s.revenue + EXCLUDED.revenue;
+
+    INSERT INTO daily_sales_summary AS s (sales_date, product_id, order_count, units_sold, revenue)
+    SELECT c.purchase_date, c.product_id,
+           sign * count(*), sign * sum(c.quantity), sign * sum(c.quantity * p.price)
+    FROM changed_orders c JOIN products p ON c.product_id = p.product_id
+    GROUP BY c.purchase_date, c.product_id ORDER BY c.purchase_date, c.product_id
+    ON CONFLICT (sales_date, product_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units_sold = s.units_sold + EXCLUDED.units_sold,
+        revenue = s.revenue + EXCLUDED.revenue;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS orders_sales_summaries_insert ON orders;
+CREATE TRIGGER orders_sales_summaries_insert
+    AFTER INSERT ON orders
+    REFERENCING NEW TABLE AS changed_orders
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_summaries('1');
+
+DROP TRIGGER IF EXISTS orders_sales_summaries_delete ON orders;
+CREATE TRIGGER orders_sales_summaries_delete
+    AFTER DELETE ON orders
+    REFERENCING OLD TABLE AS changed_orders
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_summaries('-1');
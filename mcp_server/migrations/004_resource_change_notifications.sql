@@ -0,0 +1,68 @@
+-- Change capture for resource subscriptions: every statement that writes orders or products sends
+-- the keys of the rows it touched on the resource_changes channel, once it commits. The server
+-- listens to the channel and pushes resources/updated notifications for the matching URIs.
+-- Payload: {"table": "orders", "rows": [{"order_id": "...", "user_id": "..."}, ...]}, at most
+-- 100 distinct rows per notification to stay well under the 8000 byte NOTIFY payload limit.
+-- TG_ARGV lists the key columns to send. PostgreSQL drops duplicate notifications of a
+-- transaction, so a transaction that writes the same rows twice notifies them once.
+CREATE OR REPLACE FUNCTION notify_resource_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    payload TEXT;
+BEGIN
+    FOR payload IN
+        SELECT json_build_object('table', TG_TABLE_NAME, 'rows', jsonb_agg(row_keys))::TEXT
+        FROM (
+            SELECT row_keys, row_number() OVER () - 1 AS position
+            FROM (
+                SELECT DISTINCT (
+                    SELECT jsonb_object_agg(key, to_jsonb(c) -> key) FROM unnest(TG_ARGV) AS key
+                ) AS row_keys
+                FROM changed_rows c
+            ) keyed
+        ) numbered
+        GROUP BY position / 100
+    LOOP
+        PERFORM pg_notify('resource_changes', payload);
+    END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+-- Orders: the order itself and the purchase history of its user
+DROP TRIGGER IF EXISTS orders_notify_insert ON orders;
+CREATE TRIGGER orders_notify_insert
+    AFTER INSERT ON orders
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('order_id', 'user_id');
+
+DROP TRIGGER IF EXISTS orders_notify_update ON orders;
+CREATE TRIGGER orders_notify_update
+    AFTER UPDATE ON orders
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('order_id', 'user_id');
+
+DROP TRIGGER IF EXISTS orders_notify_delete ON orders;
+CREATE TRIGGER orders_notify_delete
+    AFTER DELETE ON orders
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('order_id', 'user_id');
+
+-- Products: price, stock and description changes (an order updates the stock of its product)
+DROP TRIGGER IF EXISTS products_notify_insert ON products;
+CREATE TRIGGER products_notify_insert
+    AFTER INSERT ON products
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('product_id');
+
+DROP TRIGGER IF EXISTS products_notify_update ON products;
+CREATE TRIGGER products_notify_update
+    AFTER UPDATE ON products
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('product_id');
+
+DROP TRIGGER IF EXISTS products_notify_delete ON products;
+CREATE TRIGGER products_notify_delete
+    AFTER DELETE ON products
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_resource_changes('product_id');
@@ -0,0 +1,7 @@
+-- Mapping of the order IDs rewritten by rekey_orders.py (former random or seed IDs, e.g.
+-- ord_1a2b3c4d) to their time-ordered replacement, so that lookups by a former ID still find the
+-- order. Empty until rekey_orders.py runs.
+CREATE TABLE IF NOT EXISTS legacy_order_ids (
+    legacy_id VARCHAR(255) PRIMARY KEY,
+    order_id VARCHAR(255) NOT NULL UNIQUE
+);
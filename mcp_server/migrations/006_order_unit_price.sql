@@ -0,0 +1,112 @@
+-- Price each order at its own unit price instead of the current product price, so the sales
+-- summaries of migrations/003 stay exact when prices change: a deleted order subtracts what its
+-- insert added, and updated orders (quantity, product, user, date or price) move their amount
+-- from the old summary rows to the new ones.
+
+-- Block order writes while the column is filled and the summaries are rebuilt
+LOCK TABLE orders IN SHARE ROW EXCLUSIVE MODE;
+
+-- The unit price, copied from the product when the order is placed
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS unit_price NUMERIC(12, 2);
+
+-- Fill it for the existing orders with the current prices (the summaries were computed with the
+-- same ones), without notifying a change of the order resources, which do not expose it
+ALTER TABLE orders DISABLE TRIGGER orders_notify_update;
+UPDATE orders o SET unit_price = p.price
+FROM products p
+WHERE o.product_id = p.product_id AND o.unit_price IS NULL;
+ALTER TABLE orders ENABLE TRIGGER orders_notify_update;
+ALTER TABLE orders ALTER COLUMN unit_price SET NOT NULL;
+
+-- Writers that do not set it (seed data, benchmarks) get the current price of the product
+CREATE OR REPLACE FUNCTION fill_order_unit_price() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    SELECT price INTO NEW.unit_price FROM products WHERE product_id = NEW.product_id;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS orders_fill_unit_price ON orders;
+CREATE TRIGGER orders_fill_unit_price
+    BEFORE INSERT ON orders
+    FOR EACH ROW WHEN (NEW.unit_price IS NULL)
+    EXECUTE FUNCTION fill_order_unit_price();
+
+-- Rebuild the summaries from the orders, which also repairs any drift left by price changes
+TRUNCATE user_sales_summary, product_sales_summary, daily_sales_summary;
+
+INSERT INTO user_sales_summary (user_id, order_count, units, total_spent)
+SELECT user_id, count(*), sum(quantity), sum(quantity * unit_price)
+FROM orders
+GROUP BY user_id;
+
+INSERT INTO product_sales_summary (product_id, order_count, units_sold, revenue)
+SELECT product_id, count(*), sum(quantity), sum(quantity * unit_price)
+FROM orders
+GROUP BY product_id;
+
+INSERT INTO daily_sales_summary (sales_date, product_id, order_count, units_sold, revenue)
+SELECT purchase_date, product_id, count(*), sum(quantity), sum(quantity * unit_price)
+FROM orders
+GROUP BY purchase_date, product_id;
+
+-- Apply the orders changed by one statement (the changed_orders transition table) to the
+-- summaries. TG_ARGV[0] is 1 for inserted (or updated, new) rows and -1 for deleted (or updated,
+-- old) rows. Keys are upserted in sorted order so that concurrent transactions lock summary rows
+-- in the same order.
+CREATE OR REPLACE FUNCTION refresh_sales_summaries() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    sign INTEGER := TG_ARGV[0]::INTEGER;
+BEGIN
+    -- Orders rejected for lack of stock insert no row: nothing to apply
+    IF NOT EXISTS (SELECT 1 FROM changed_orders) THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO user_sales_summary AS s (user_id, order_count, units, total_spent)
+    SELECT user_id, sign * count(*), sign * sum(quantity), sign * sum(quantity * unit_price)
+    FROM changed_orders
+    GROUP BY user_id ORDER BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units = s.units + EXCLUDED.units,
+        total_spent = s.total_spent + EXCLUDED.total_spent;
+
+    INSERT INTO product_sales_summary AS s (product_id, order_count, units_sold, revenue)
+    SELECT product_id, sign * count(*), sign * sum(quantity), sign * sum(quantity * unit_price)
+    FROM changed_orders
+    GROUP BY product_id ORDER BY product_id
+    ON CONFLICT (product_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units_sold = s.units_sold + EXCLUDED.units_sold,
+        revenue = s.revenue + EXCLUDED.revenue;
+
+    INSERT INTO daily_sales_summary AS s (sales_date, product_id, order_count, units_sold, revenue)
+    SELECT purchase_date, product_id,
+           sign * count(*), sign * sum(quantity), sign * sum(quantity * unit_price)
+    FROM changed_orders
+    GROUP BY purchase_date, product_id ORDER BY purchase_date, product_id
+    ON CONFLICT (sales_date, product_id) DO UPDATE SET
+        order_count = s.order_count + EXCLUDED.order_count,
+        units_sold = s.units_sold + EXCLUDED.units_sold,
+        revenue = s.revenue + EXCLUDED.revenue;
+
+    RETURN NULL;
+END;
+$$;
+
+-- An UPDATE subtracts its old rows and adds its new ones (transition tables cannot be limited to
+-- some columns, so updates that change no summarized column also run both, for a net change of 0)
+DROP TRIGGER IF EXISTS orders_sales_summaries_update_old ON orders;
+CREATE TRIGGER orders_sales_summaries_update_old
+    AFTER UPDATE ON orders
+    REFERENCING OLD TABLE AS changed_orders
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_summaries('-1');
+
+DROP TRIGGER IF EXISTS orders_sales_summaries_update_new ON orders;
+CREATE TRIGGER orders_sales_summaries_update_new
+    AFTER UPDATE ON orders
+    REFERENCING NEW TABLE AS changed_orders
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_sales_summaries('1');
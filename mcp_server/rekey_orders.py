@@ -0,0 +1,82 @@
+import asyncio
+import argparse
+from datetime import datetime, time, timezone
+
+from backend import connect, is_time_ordered_id, new_id
+
+
+async def rekey_orders(batch_size: int = 1000, limit: int | None = None) -> int:
+    """
+    Rewrites the order IDs of the former schemes (random, e.g. "ord_1a2b3c4d", or seed, e.g.
+    "ord_001") into time-ordered IDs, and records each former ID in legacy_order_ids.
+
+    Args:
+        - batch_size: The number of orders scanned per transaction.
+        - limit: The maximum number of orders to rewrite (default: all).
+
+    Returns: The number of orders rewritten.
+
+    Notes:
+        - The time part of a new ID is the purchase date of the order (midnight UTC), so rewritten
+          orders sort before the ones placed later.
+        - Orders are scanned in primary key order, one batch per transaction with its rows
+          locked, so the server can keep running. Running the script again resumes the work.
+        - Lookups by a former ID keep working through legacy_order_ids (see _fetch_order_by_id).
+    """
+    rekeyed, last_id = 0, ""
+    conn = await connect()
+    try:
+        while limit is None or rekeyed < limit:
+            async with conn.transaction():
+                # Lock the next batch of orders, in primary key order
+                cur = await conn.execute(
+                    """
+                    SELECT order_id, purchase_date FROM orders
+                    WHERE order_id > %s ORDER BY order_id LIMIT %s FOR UPDATE;
+                    """,
+                    (last_id, batch_size)
+                )
+                rows = await cur.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                # Give the orders with a former ID a new ID dated from their purchase
+                legacy = [row for row in rows if not is_time_ordered_id(row[0])]
+                legacy = legacy[:limit - rekeyed] if limit is not None else legacy
+                if not legacy:
+                    continue
+                legacy_ids = [order_id for order_id, _ in legacy]
+                order_ids = [
+                    new_id("ord", int(datetime.combine(day, time(), timezone.utc).timestamp() * 1000))
+                    for _, day in legacy
+                ]
+
+                # Rewrite the IDs and remember the former ones
+                await conn.execute(
+                    """
+                    UPDATE orders o SET order_id = m.order_id
+                    FROM unnest(%s::text[], %s::text[]) AS m(legacy_id, order_id)
+                    WHERE o.order_id = m.legacy_id;
+                    """,
+                    (legacy_ids, order_ids)
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO legacy_order_ids (legacy_id, order_id)
+                    SELECT * FROM unnest(%s::text[], %s::text[]);
+                    """,
+                    (legacy_ids, order_ids)
+                )
+                rekeyed += len(legacy)
+    finally:
+        await conn.close()
+    return rekeyed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rewrites former order IDs into time-ordered IDs.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Orders per transaction.")
+    parser.add_argument("--limit", type=int, help="Maximum number of orders to rewrite.")
+    args = parser.parse_args()
+    print(f"{asyncio.run(rekey_orders(args.batch_size, args.limit))} orders rewritten.")
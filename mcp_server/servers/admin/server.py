@@ -0,0 +1,51 @@
+from typing import Any
+from fastmcp import FastMCP
+
+from backend import (
+    DB_REPLICA_MAX_LAG,
+    SLOW_QUERY_SAMPLE_RATE,
+    SLOW_QUERY_THRESHOLD_MS,
+    handle_errors,
+    get_replica_status,
+    get_slow_queries,
+)
+
+
+# Define the server for operational (admin) data
+admin_server = FastMCP("Admin")
+
+
+# --- MCP Resources ---
+
+@admin_server.resource("data://slow_queries")
+@handle_errors
+async def get_slow_query_log() -> dict[str, Any]:
+    """
+    Exposes the slow-query log: the most recent database statements that exceeded the slow-query
+    threshold, among the sampled database calls.
+
+    Returns:
+        A dictionary with the threshold and the sample rate, and the logged statements, newest
+        first, under "queries". Each one has the tool or resource and the helper that ran it, its
+        duration, its SQL text, its parameters redacted to their types and its
+        EXPLAIN (ANALYZE, BUFFERS) plan (None while it is being captured).
+    """
+    return {
+        "threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "sample_rate": SLOW_QUERY_SAMPLE_RATE,
+        "queries": get_slow_queries(),
+    }
+
+
+@admin_server.resource("data://replicas")
+@handle_errors
+async def get_replicas() -> dict[str, Any]:
+    """
+    Exposes the read replicas and their last lag check.
+
+    Returns:
+        A dictionary with the maximum lag of a usable replica, and for each replica under
+        "replicas" its host, port and database, its lag in seconds, whether reads are routed to it
+        and the error of its last check, if any.
+    """
+    return {"max_lag_seconds": DB_REPLICA_MAX_LAG, "replicas": get_replica_status()}
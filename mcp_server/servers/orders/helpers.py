@@ -1,7 +1,21 @@
-from datetime import date
+from datetime import date, timedelta
 from pydantic import BaseModel, Field
 
-from backend import db_connector, parse_output
+from psycopg import sql
+
+from backend import (
+    MAX_PAGE_SIZE,
+    db_connector,
+    db_reader,
+    db_streamer,
+    invalidates_cache,
+    new_id,
+    parse_output,
+    parse_page,
+    decode_cursor,
+    project_columns,
+    stream_output,
+)
 
 
 # --- Pydantic Models ---
@@ -11,64 +25,376 @@ class NewOrderInfo(BaseModel):
     quantity: int = Field(gt=0, description="The number of units to order. Must be positive.")
 
 
+# Columns that can be selected from the orders table and from a user's purchase history
+ORDER_COLUMNS = [
+    "order_id", "user_id", "product_id", "quantity", "purchase_date", "delivery_date", "status"
+]
+PURCHASE_HISTORY_COLUMNS = [
+    "order_id", "purchase_date", "status", "product_name", "quantity", "price"
+]
+
+# Columns the product sales rankings can be sorted by
+SALES_SORT_COLUMNS = ["revenue", "units_sold", "order_count"]
+
+
 # --- Internal Database Logic ---
-@db_connector
-def _fetch_orders(cur):
+def _new_order_id() -> str:
     """
-    Fetches all orders from the database.
+    Generates the ID of a new order (time-ordered, see backend.new_id).
     """
-    cur.execute("SELECT * FROM orders ORDER BY purchase_date DESC;")
-    return parse_output(cur)
+    return new_id("ord")
 
-@db_connector
-def _fetch_order_by_id(cur, order_id: str):
+@db_reader
+async def _fetch_orders(
+    cur,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    fields: str | list[str] | None = None,
+    compact: bool = False,
+):
+    """
+    Fetches a page of orders, newest first, using keyset pagination on (purchase_date, order_id).
+    Only the requested fields (whitelisted in ORDER_COLUMNS) are selected.
+    """
+    keys, page_size, compact = decode_cursor(cursor, page_size, compact)
+    columns, hidden = project_columns(fields, ORDER_COLUMNS, ["purchase_date", "order_id"])
+    if keys:
+        # Continue right after the last order of the previous page. The leading
+        # purchase_date <= bound is an index condition, so the scan starts at the cursor
+        # instead of filtering out every newer row
+        await cur.execute(
+            sql.SQL(
+                """
+                SELECT {} FROM orders
+                WHERE purchase_date <= %s::date
+                  AND (purchase_date < %s::date OR (purchase_date = %s::date AND order_id > %s))
+                ORDER BY purchase_date DESC, order_id LIMIT %s;
+                """
+            ).format(columns),
+            (keys[0], keys[0], keys[0], keys[1], page_size + 1)
+        )
+    else:
+        await cur.execute(
+            sql.SQL(
+                "SELECT {} FROM orders ORDER BY purchase_date DESC, order_id LIMIT %s;"
+            ).format(columns),
+            (page_size + 1,)
+        )
+    return await parse_page(cur, page_size, ["purchase_date", "order_id"], hidden, compact)
+
+@db_streamer
+async def _stream_orders(cur):
+    """
+    Streams the whole orders table, newest first, as JSON lines.
     """
-    Fetches a single order by its ID.
+    await cur.execute("SELECT * FROM orders ORDER BY purchase_date DESC, order_id;")
+    async for chunk in stream_output(cur):
+        yield chunk
+
+@db_reader
+async def _fetch_order_by_id(cur, order_id: str, fields: str | list[str] | None = None):
+    """
+    Fetches a single order by its ID, with only the requested fields. An ID rewritten by
+    rekey_orders.py is resolved to the order's current ID.
+    """
+    columns, _ = project_columns(fields, ORDER_COLUMNS)
+    await cur.execute(
+        sql.SQL(
+            """
+            SELECT {} FROM orders
+            WHERE order_id = COALESCE(
+                (SELECT order_id FROM legacy_order_ids WHERE legacy_id = %s), %s
+            );
+            """
+        ).format(columns),
+        (order_id, order_id)
+    )
+    return await parse_output(cur, one=True)
+
+@db_reader
+async def _fetch_user_purchase_history(
+    cur,
+    user_id: str,
+    fields: str | list[str] | None = None,
+    limit: int | str | None = None,
+    compact: bool = False,
+):
     """
-    cur.execute("SELECT * FROM orders WHERE order_id = %s;", (order_id,))
-    return parse_output(cur, one=True)
+    Fetches the orders associated with a specific user, newest first, optionally limited to
+    the latest ones and to the requested fields (whitelisted in PURCHASE_HISTORY_COLUMNS).
+    """
+    columns, _ = project_columns(fields, PURCHASE_HISTORY_COLUMNS)
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE) if limit else None
+    await cur.execute(
+        sql.SQL(
+            """
+            SELECT {} FROM (
+                SELECT o.order_id, o.purchase_date, o.status, p.product_name, o.quantity, p.price
+                FROM orders o JOIN products p ON o.product_id = p.product_id
+                WHERE o.user_id = %s
+            ) AS history
+            ORDER BY purchase_date DESC LIMIT %s;
+            """
+        ).format(columns),
+        (user_id, limit)
+    )
+    return await parse_output(cur, compact=compact)
 
+# Stock changes must be visible to the next catalog read, so the product caches are
+# invalidated once the order is committed
+@invalidates_cache("products")
+@invalidates_cache("product_by_id", key_from=lambda order_details: [order_details.product_id])
 @db_connector
-def _fetch_user_purchase_history(cur, user_id: str):
+async def _create_new_order(cur, order_details: NewOrderInfo):
     """
-    Fetches all orders associated with a specific user.
+    Creates a new order in the database and reserves its stock, in a single statement.
+    The stock decrement only happens if enough stock is left, so concurrent orders can never
+    drive stock_quantity below zero. The order keeps the price of the product it was placed at
+    (unit_price), which the sales summaries add up.
     """
-    cur.execute(
+    # Reserve the stock and insert the order atomically, in one round trip
+    order_id = _new_order_id()
+    await cur.execute(
         """
-        SELECT o.order_id, o.purchase_date, o.status, p.product_name, o.quantity, p.price
-        FROM orders o JOIN products p ON o.product_id = p.product_id
-        WHERE o.user_id = %s ORDER BY o.purchase_date DESC;
+        WITH reserved AS (
+            UPDATE products SET stock_quantity = stock_quantity - %(quantity)s
+            WHERE product_id = %(product_id)s AND stock_quantity >= %(quantity)s
+            RETURNING product_id, price
+        )
+        INSERT INTO orders (
+            order_id, user_id, product_id, quantity, unit_price, purchase_date, status
+        )
+        SELECT %(order_id)s, %(user_id)s, product_id, %(quantity)s, price, %(purchase_date)s,
+               'submitted'
+        FROM reserved RETURNING order_id;
         """,
-        (user_id,)
+        {**order_details.model_dump(), "order_id": order_id, "purchase_date": date.today()}
     )
-    return parse_output(cur)
+    new_order = await cur.fetchone()
+    if new_order:
+        return {"order_id": new_order[0], "status": "success"}
+
+    # Nothing was reserved: tell an unknown product apart from insufficient stock
+    await cur.execute(
+        "SELECT stock_quantity FROM products WHERE product_id = %s;", (order_details.product_id,)
+    )
+    stock = await cur.fetchone()
+    if not stock:
+        return {
+            "status": "failure",
+            "error_type": "ProductNotFound",
+            "error_message": f"Product with ID '{order_details.product_id}' not found."
+        }
+    return {
+        "status": "failure",
+        "error_type": "InsufficientStock",
+        "error_message": (
+            f"Insufficient stock for product {order_details.product_id}: "
+            f"{order_details.quantity} requested, {stock[0]} available."
+        ),
+        "product_id": order_details.product_id,
+        "requested_quantity": order_details.quantity,
+        "available_quantity": stock[0],
+    }
+
 
+# All the ordered products change stock, so their cache entries are dropped after the commit
+@invalidates_cache("products")
+@invalidates_cache(
+    "product_by_id",
+    key_from=lambda orders, all_or_nothing=True: {order.product_id for order in orders}
+)
 @db_connector
-def _create_new_order(cur, order_details: NewOrderInfo):
+async def _create_new_orders(cur, orders: list[NewOrderInfo], all_or_nothing: bool = True):
     """
-    Creates a new order in the database and updates stock.
+    Creates several orders in one transaction, with multi-row statements.
+    Lines are validated in order against the locked stock of their product; with all_or_nothing
+    a single invalid line rejects the whole batch, otherwise only the invalid lines are skipped.
     """
-    import uuid
-    # Check for sufficient stock
-    cur.execute("SELECT stock_quantity FROM products WHERE product_id = %s;", (order_details.product_id,))
-    stock = cur.fetchone()
-    if not stock or stock[0] < order_details.quantity:
-        raise ValueError(f"Insufficient stock for product {order_details.product_id}.")
+    # Lock the ordered products (in a fixed order, to avoid deadlocks) and read their stock
+    product_ids = sorted({order.product_id for order in orders})
+    await cur.execute(
+        """
+        SELECT product_id, stock_quantity FROM products
+        WHERE product_id = ANY(%s) ORDER BY product_id FOR UPDATE;
+        """,
+        (product_ids,)
+    )
+    stock = dict(await cur.fetchall())
+    await cur.execute(
+        "SELECT user_id FROM users WHERE user_id = ANY(%s);",
+        (list({order.user_id for order in orders}),)
+    )
+    known_users = {row[0] for row in await cur.fetchall()}
+
+    # Validate every line against the stock left by the previous ones
+    results = []
+    for line, order in enumerate(orders):
+        if order.user_id not in known_users:
+            error = ("UserNotFound", f"User with ID '{order.user_id}' not found.")
+        elif order.product_id not in stock:
+            error = ("ProductNotFound", f"Product with ID '{order.product_id}' not found.")
+        elif stock[order.product_id] < order.quantity:
+            error = (
+                "InsufficientStock",
+                f"Insufficient stock for product {order.product_id}: "
+                f"{order.quantity} requested, {stock[order.product_id]} available."
+            )
+        else:
+            stock[order.product_id] -= order.quantity
+            results.append({"line": line, "status": "success", "order_id": _new_order_id()})
+            continue
+        results.append(
+            {"line": line, "status": "failure", "error_type": error[0], "error_message": error[1]}
+        )
+
+    # Reject the whole batch without writing anything, if requested
+    accepted = [(orders[r["line"]], r["order_id"]) for r in results if r["status"] == "success"]
+    if all_or_nothing and len(accepted) < len(orders):
+        return {
+            "status": "failure",
+            "created": 0,
+            "lines": [
+                {"line": r["line"], "status": "not_created"} if r["status"] == "success" else r
+                for r in results
+            ],
+        }
+
+    # Insert all accepted orders and decrement the stock of their products in one statement
+    if accepted:
+        await cur.execute(
+            """
+            WITH new_orders AS (
+                SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::int[])
+                    AS t(order_id, user_id, product_id, quantity)
+            ), reserved AS (
+                UPDATE products p SET stock_quantity = p.stock_quantity - r.quantity
+                FROM (
+                    SELECT product_id, SUM(quantity) AS quantity FROM new_orders GROUP BY product_id
+                ) r
+                WHERE p.product_id = r.product_id
+                RETURNING p.product_id, p.price
+            )
+            INSERT INTO orders (
+                order_id, user_id, product_id, quantity, unit_price, purchase_date, status
+            )
+            SELECT n.order_id, n.user_id, n.product_id, n.quantity, r.price, %s, 'submitted'
+            FROM new_orders n JOIN reserved r ON n.product_id = r.product_id;
+            """,
+            (
+                [order_id for _, order_id in accepted],
+                [order.user_id for order, _ in accepted],
+                [order.product_id for order, _ in accepted],
+                [order.quantity for order, _ in accepted],
+                date.today(),
+            )
+        )
+    return {
+        "status": "success" if len(accepted) == len(orders) else "partial" if accepted else "failure",
+        "created": len(accepted),
+        "lines": results,
+    }
+
+
+# --- Sales Summaries (maintained by triggers on orders, see migrations/003) ---
+
+@db_reader
+async def _fetch_customer_sales(cur, user_id: str | None = None, limit: int | None = None):
+    """
+    Fetches the lifetime order count, units and spend of one user (a primary key lookup), or the
+    top customers by spend (an index scan of `limit` rows).
+    """
+    if user_id:
+        await cur.execute(
+            """
+            SELECT s.user_id, u.name, s.order_count, s.units, s.total_spent
+            FROM user_sales_summary s JOIN users u ON s.user_id = u.user_id
+            WHERE s.user_id = %s;
+            """,
+            (user_id,)
+        )
+        return await parse_output(cur, one=True)
 
-    # Create the new order
-    order_id = f"ord_{str(uuid.uuid4())[:8]}"
-    cur.execute(
+    await cur.execute(
         """
-        INSERT INTO orders (order_id, user_id, product_id, quantity, purchase_date, status)
-        VALUES (%s, %s, %s, %s, %s, 'submitted') RETURNING order_id;
+        SELECT s.user_id, u.name, s.order_count, s.units, s.total_spent
+        FROM user_sales_summary s JOIN users u ON s.user_id = u.user_id
+        ORDER BY s.total_spent DESC LIMIT %s;
         """,
-        (order_id, order_details.user_id, order_details.product_id, order_details.quantity, date.today())
+        (min(max(int(limit or 10), 1), MAX_PAGE_SIZE),)
     )
-    new_order_id = cur.fetchone()[0]
+    return await parse_output(cur)
+
+@db_reader
+async def _fetch_product_sales(
+    cur,
+    product_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    sort_by: str = "revenue",
+    limit: int | None = None,
+):
+    """
+    Fetches the order count, units sold and revenue of one product, or the best-selling products
+    sorted by sort_by. Without dates the lifetime summary is read; with a date range the daily
+    summary rows of the period are added up.
+    """
+    if sort_by not in SALES_SORT_COLUMNS:
+        raise ValueError(f"Unknown sort_by '{sort_by}'. Use one of: {', '.join(SALES_SORT_COLUMNS)}.")
+    limit = 1 if product_id else min(max(int(limit or 10), 1), MAX_PAGE_SIZE)
 
-    # Decrement stock
-    cur.execute(
-        "UPDATE products SET stock_quantity = stock_quantity - %s WHERE product_id = %s;",
-        (order_details.quantity, order_details.product_id)
+    # Lifetime figures come straight from the per-product summary
+    if not start_date and not end_date:
+        await cur.execute(
+            sql.SQL(
+                """
+                SELECT s.product_id, p.product_name, s.order_count, s.units_sold, s.revenue
+                FROM product_sales_summary s JOIN products p ON s.product_id = p.product_id
+                WHERE %(product_id)s::text IS NULL OR s.product_id = %(product_id)s
+                ORDER BY s.{} DESC LIMIT %(limit)s;
+                """
+            ).format(sql.Identifier(sort_by)),
+            {"product_id": product_id, "limit": limit}
+        )
+    else:
+        # Period figures add up one summary row per product and day of the period
+        await cur.execute(
+            sql.SQL(
+                """
+                SELECT s.product_id, p.product_name, sum(s.order_count)::bigint AS order_count,
+                       sum(s.units_sold)::bigint AS units_sold, sum(s.revenue) AS revenue
+                FROM daily_sales_summary s JOIN products p ON s.product_id = p.product_id
+                WHERE s.sales_date BETWEEN %(start_date)s AND %(end_date)s
+                  AND (%(product_id)s::text IS NULL OR s.product_id = %(product_id)s)
+                GROUP BY s.product_id, p.product_name
+                ORDER BY {} DESC LIMIT %(limit)s;
+                """
+            ).format(sql.Identifier(sort_by)),
+            {
+                "product_id": product_id,
+                "start_date": start_date or date.min,
+                "end_date": end_date or date.today(),
+                "limit": limit,
+            }
+        )
+    rows = await parse_output(cur)
+    return (rows[0] if rows else {}) if product_id else rows
+
+@db_reader
+async def _fetch_daily_sales(cur, start_date: date | None = None, end_date: date | None = None):
+    """
+    Fetches the order count, units sold and revenue of every day of a period (by default, the
+    last 30 days), from the daily summary.
+    """
+    end_date = end_date or date.today()
+    await cur.execute(
+        """
+        SELECT sales_date, sum(order_count)::bigint AS order_count,
+               sum(units_sold)::bigint AS units_sold, sum(revenue) AS revenue
+        FROM daily_sales_summary
+        WHERE sales_date BETWEEN %s AND %s
+        GROUP BY sales_date ORDER BY sales_date;
+        """,
+        (start_date or end_date - timedelta(days=30), end_date)
     )
-    return {"order_id": new_order_id, "status": "success"}
\ No newline at end of file
+    return await parse_output(cur)
@@ -1,14 +1,21 @@
 from typing import Any
 from datetime import date
 from fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
 
-from backend import handle_errors
+from backend import handle_errors, parse_data_uri, wants_compact
 from servers.orders.helpers import (
     NewOrderInfo,
     _fetch_orders, 
+    _stream_orders,
     _fetch_order_by_id, 
     _create_new_order,
-    _fetch_user_purchase_history
+    _create_new_orders,
+    _fetch_user_purchase_history,
+    _fetch_customer_sales,
+    _fetch_product_sales,
+    _fetch_daily_sales,
 )
 
 # Define the server for order-related operations
@@ -18,18 +25,45 @@ order_server = FastMCP("Orders")
 # --- MCP Resources (Exposing the Table via GET) ---
 @order_server.resource("data://orders",)
 @handle_errors
-def get_all_orders() -> list[dict[str, Any]]:
+async def get_all_orders() -> dict[str, Any]:
     """
-    Exposes the entire orders table.
+    Exposes the first page of the orders table.
 
     Returns:
-        A list of dictionaries representing the orders.
+        A dictionary with the page of orders under "items" and the token of the next page
+        under "next_cursor" (read it from data://orders/page/{cursor}).
     """
-    return _fetch_orders()
+    return await _fetch_orders()
+
+@order_server.resource("data://orders/compact")
+@handle_errors
+async def get_all_orders_compact() -> dict[str, Any]:
+    """
+    Exposes the first page of the orders table in the compact format.
+
+    Returns:
+        A dictionary with the column names under "columns", one list of values per order under
+        "rows" and the token of the next page (also compact) under "next_cursor".
+    """
+    return await _fetch_orders(compact=True)
+
+@order_server.resource("data://orders/page/{cursor}")
+@handle_errors
+async def get_orders_page(cursor: str) -> dict[str, Any]:
+    """
+    Exposes the page of the orders table that follows the given continuation token.
+
+    Args:
+        cursor: The "next_cursor" token returned with the previous page.
+
+    Returns:
+        A dictionary with the page of orders under "items" and the token of the next page.
+    """
+    return await _fetch_orders(cursor=cursor)
 
 @order_server.resource("data://orders/order/{order_id}")
 @handle_errors
-def get_order_by_id(order_id: str) -> dict[str, Any]:
+async def get_order_by_id(order_id: str) -> dict[str, Any]:
     """
     Exposes a single order record from the orders table. 
 
@@ -39,14 +73,14 @@ def get_order_by_id(order_id: str) -> dict[str, Any]:
     Returns: 
         A dictionary representing the order.
     """
-    order = _fetch_order_by_id(order_id)
+    order = await _fetch_order_by_id(order_id)
     if not order:
         return {"status": "failure", "message": f"Order with ID '{order_id}' not found."}
     return order
 
 @order_server.resource("data://orders/user/{user_id}")
 @handle_errors
-def get_user_orders(user_id: str) -> list[dict[str, Any]]:
+async def get_user_orders(user_id: str) -> list[dict[str, Any]]:
     """
     Exposes the history of purschases for a single user.
 
@@ -56,26 +90,59 @@ def get_user_orders(user_id: str) -> list[dict[str, Any]]:
     Returns:
         A list of dictionaries representing the user's orders.
     """
-    history = _fetch_user_purchase_history(user_id)
+    history = await _fetch_user_purchase_history(user_id)
     if not history:
         return [{"message": f"No orders found for user ID '{user_id}'."}]
     return history
 
+@order_server.resource("data://orders/user/{user_id}/compact")
+@handle_errors
+async def get_user_orders_compact(user_id: str) -> dict[str, Any]:
+    """
+    Exposes the history of purchases for a single user in the compact format.
+
+    Args:
+        user_id: The ID of the user to retrieve orders for.
+
+    Returns:
+        A dictionary with the column names under "columns" and one list of values per order
+        under "rows".
+    """
+    return await _fetch_user_purchase_history(user_id, compact=True)
+
 # --- MCP Tools (Functions for the Agent to Use) ---
 @order_server.tool
 @handle_errors
-def create_order(order_info: NewOrderInfo) -> dict[str, Any]:
+async def create_order(order_info: NewOrderInfo) -> dict[str, Any]:
     """
-    Places a new order, validates stock, and decrements stock quantity.
+    Places a new order, reserving its stock atomically (stock never goes below zero).
 
     Args:
         order_info: A model containing user_id, product_id, and quantity.
     
     Returns:
-        A dictionary with the new order's ID and a success status.
+        A dictionary with the new order's ID and a success status, or a failure with
+        error_type "InsufficientStock" (and the available quantity) or "ProductNotFound".
+    """
+    return await _create_new_order(order_info)
+
+
+@order_server.tool
+@handle_errors
+async def create_orders(orders: list[NewOrderInfo], all_or_nothing: bool = True) -> dict[str, Any]:
     """
-    return _create_new_order(order_info)
+    Places several orders at once (e.g. all the lines of a B2B order), in a single transaction.
+
+    Args:
+        orders: The order lines, each with user_id, product_id, and quantity.
+        all_or_nothing: If True, no order is created unless every line is valid.
+            If False, valid lines are created and invalid ones are reported.
 
+    Returns:
+        A dictionary with the overall status ("success", "partial" or "failure"), the number of
+        orders created and, for each line, its order ID or the reason it was not created.
+    """
+    return await _create_new_orders(orders, all_or_nothing)
 
 @order_server.tool
 @handle_errors
@@ -88,8 +155,17 @@ async def get_order_data(
 
     data_details is the URL of the data to query. It has to be of the format 
     - data://orders/order/{order_id}: for a specific order given its id
-    - data://orders/user/{user_id}: all the orders for the given user
-    - data://orders: all the users
+    - data://orders/user/{user_id}: all the orders for the given user (newest first,
+      "limit={n}" keeps only the latest n)
+    - data://orders: the first page of orders, newest first
+    - data://orders?page_size={n}&cursor={next_cursor}: a page of orders; pass the
+      "next_cursor" returned with a page to read the following one
+    Any of them accepts "fields=a,b,..." (comma-separated, no braces) to return only some
+    columns, and the listing accepts "limit={n}" as an alias of page_size, e.g.
+    data://orders?fields=order_id&limit=10
+    Listings also accept "format=compact" to get {"columns": [...], "rows": [[...], ...]}
+    instead of one dictionary per row (smaller for large results); the pages that follow a
+    compact page are compact too.
 
     Args:
         data_detail: the data to retrieve
@@ -97,16 +173,110 @@ async def get_order_data(
     Returns:
         A list of dictionaries representing the data.
     """
-    if data_detail.startswith("data://orders/order/"):
-        order_id = data_detail.split("/")[-1]
-        return _fetch_order_by_id(order_id)
-    elif data_detail.startswith("data://orders/user/"):
-        user_id = data_detail.split("/")[-1]
-        return _fetch_user_purchase_history(user_id)
-    elif data_detail == "data://orders":
-        return _fetch_orders()
+    # Split the query parameters from the requested data URI
+    path, params = parse_data_uri(data_detail)
+    if path.startswith("data://orders/order/"):
+        order_id = path.split("/")[-1]
+        return await _fetch_order_by_id(order_id, fields=params.get("fields"))
+    elif path.startswith("data://orders/user/"):
+        user_id = path.split("/")[-1]
+        return await _fetch_user_purchase_history(
+            user_id,
+            fields=params.get("fields"),
+            limit=params.get("limit"),
+            compact=wants_compact(params),
+        )
+    elif path == "data://orders":
+        return await _fetch_orders(
+            page_size=params.get("limit") or params.get("page_size"),
+            cursor=params.get("cursor"),
+            fields=params.get("fields"),
+            compact=wants_compact(params),
+        )
     else:
         return {
             "status": "failure", 
             "message": f"Invalid data detail: {data_detail}. Please use a valid order data URL."
         }
+
+
+@order_server.tool
+@handle_errors
+async def get_customer_sales(
+    user_id: str | None = None, limit: int = 10
+) -> list[dict[str, Any]] | dict[str, Any]:
+    """
+    Returns how much customers have spent, from pre-computed totals (no need to add up orders).
+
+    Args:
+        user_id: The user to report on. If omitted, the top customers by spend are returned.
+        limit: The number of top customers to return when user_id is omitted.
+
+    Returns:
+        For a user, a dictionary with their order_count, units bought and total_spent (empty if
+        they never ordered). Otherwise a list of the top customers, highest total_spent first.
+    """
+    return await _fetch_customer_sales(user_id, limit)
+
+
+@order_server.tool
+@handle_errors
+async def get_product_sales(
+    product_id: str | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    sort_by: str = "revenue",
+    limit: int = 10,
+) -> list[dict[str, Any]] | dict[str, Any]:
+    """
+    Returns units sold and revenue per product, from pre-computed totals, e.g. for
+    "top-selling products this month" (start_date = first day of the month, sort_by="units_sold").
+
+    Args:
+        product_id: The product to report on. If omitted, the best-selling products are returned.
+        start_date: The first day of the period (inclusive). Lifetime totals are returned
+            when both dates are omitted.
+        end_date: The last day of the period (inclusive), today by default.
+        sort_by: "revenue", "units_sold" or "order_count".
+        limit: The number of products to return when product_id is omitted.
+
+    Returns:
+        For a product, a dictionary with its order_count, units_sold and revenue. Otherwise a list
+        of products sorted by sort_by, highest first.
+    """
+    return await _fetch_product_sales(product_id, start_date, end_date, sort_by, limit)
+
+
+@order_server.tool
+@handle_errors
+async def get_daily_sales(
+    start_date: date | None = None, end_date: date | None = None
+) -> list[dict[str, Any]]:
+    """
+    Returns the number of orders, units sold and revenue of each day of a period, from
+    pre-computed totals. Days without sales are omitted.
+
+    Args:
+        start_date: The first day of the period (inclusive), 30 days before end_date by default.
+        end_date: The last day of the period (inclusive), today by default.
+
+    Returns:
+        A list of dictionaries with sales_date, order_count, units_sold and revenue, oldest first.
+    """
+    return await _fetch_daily_sales(start_date, end_date)
+
+
+# --- HTTP Routes (mounted by the main server) ---
+async def export_orders(request: Request) -> StreamingResponse:
+    """
+    Streams the entire orders table, newest first, as JSON lines.
+    Rows are read in batches through a server-side cursor and written to the response as they
+    arrive, so memory stays bounded by the batch size instead of the table size.
+
+    Args:
+        request: The incoming HTTP request.
+
+    Returns:
+        A streaming response with one JSON order per line.
+    """
+    return StreamingResponse(_stream_orders(), media_type="application/x-ndjson")
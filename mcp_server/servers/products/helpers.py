@@ -1,21 +1,123 @@
-from backend import db_connector, parse_output
+from psycopg import sql
+
+from backend import db_reader, cached, parse_output, parse_page, decode_cursor, project_columns
+
+
+# Columns that can be selected from the products table
+PRODUCT_COLUMNS = ["product_id", "product_name", "description", "price", "stock_quantity", "category"]
 
 
 # --- Internal Database Logic ---
 
-@db_connector
-def _fetch_products(cur, brief: bool = False):
+@cached("products")
+@db_reader
+async def _fetch_products(
+    cur,
+    brief: bool = False,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    fields: str | list[str] | None = None,
+    compact: bool = False,
+):
+    """
+    Fetches a page of product data from the database, using keyset pagination on product_id.
+    Only the requested fields (whitelisted in PRODUCT_COLUMNS) are selected.
+    """
+    keys, page_size, compact = decode_cursor(cursor, page_size, compact)
+    columns, hidden = project_columns(
+        fields or (["product_id", "product_name"] if brief else None), PRODUCT_COLUMNS, ["product_id"]
+    )
+    if keys:
+        # Continue right after the last product_id of the previous page
+        await cur.execute(
+            sql.SQL(
+                "SELECT {} FROM products WHERE product_id > %s ORDER BY product_id LIMIT %s;"
+            ).format(columns),
+            (keys[0], page_size + 1)
+        )
+    else:
+        await cur.execute(
+            sql.SQL("SELECT {} FROM products ORDER BY product_id LIMIT %s;").format(columns),
+            (page_size + 1,)
+        )
+    return await parse_page(cur, page_size, ["product_id"], hidden, compact)
+
+@cached("product_by_id")
+@db_reader
+async def _fetch_product_by_id(cur, product_id: str, fields: str | list[str] | None = None):
     """
-    Fetches product data from the database.
+    Fetches a single product by its ID, with only the requested fields.
     """
-    query = "SELECT product_id, product_name FROM products;" if brief else "SELECT * FROM products;"
-    cur.execute(query)
-    return parse_output(cur)
+    columns, _ = project_columns(fields, PRODUCT_COLUMNS)
+    await cur.execute(
+        sql.SQL("SELECT {} FROM products WHERE product_id = %s;").format(columns),
+        (product_id,)
+    )
+    return await parse_output(cur, one=True)
 
-@db_connector
-def _fetch_product_by_id(cur, product_id: str):
+@db_reader
+async def _search_products(
+    cur,
+    query: str | None = None,
+    category: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock: bool = False,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    fields: str | list[str] | None = None,
+    compact: bool = False,
+):
     """
-    Fetches a single product by its ID.
+    Searches products by free text over product_name and description, and filters them by
+    category, price range and availability. Results are ranked by text relevance (then by
+    product_id) and paginated with a keyset on (rank, product_id).
     """
-    cur.execute("SELECT * FROM products WHERE product_id = %s;", (product_id,))
-    return parse_output(cur, one=True)
+    keys, page_size, compact = decode_cursor(cursor, page_size, compact)
+    allowed = PRODUCT_COLUMNS + ["rank"] if query else PRODUCT_COLUMNS
+    columns, hidden = project_columns(fields, allowed, ["rank", "product_id"])
+
+    # Rank by relevance when there is a text query, otherwise every match ranks the same
+    params = []
+    if query:
+        rank = sql.SQL("ts_rank(search_vector, websearch_to_tsquery('english', %s))")
+        params.append(query)
+    else:
+        rank = sql.SQL("0::real")
+
+    # Combine the requested filters, each one served by its own index
+    filters = []
+    if query:
+        filters.append(sql.SQL("search_vector @@ websearch_to_tsquery('english', %s)"))
+        params.append(query)
+    if category:
+        filters.append(sql.SQL("lower(category) = lower(%s)"))
+        params.append(category)
+    if min_price is not None:
+        filters.append(sql.SQL("price >= %s::numeric"))
+        params.append(min_price)
+    if max_price is not None:
+        filters.append(sql.SQL("price <= %s::numeric"))
+        params.append(max_price)
+    if in_stock:
+        filters.append(sql.SQL("stock_quantity > 0"))
+
+    # Continue right after the last (rank, product_id) of the previous page
+    after = sql.SQL("TRUE")
+    if keys:
+        after = sql.SQL("rank < %s OR (rank = %s AND product_id > %s)")
+        params.extend([keys[0], keys[0], keys[1]])
+
+    await cur.execute(
+        sql.SQL(
+            """
+            SELECT {} FROM (
+                SELECT *, {} AS rank FROM products WHERE {}
+            ) AS matches
+            WHERE {}
+            ORDER BY rank DESC, product_id LIMIT %s;
+            """
+        ).format(columns, rank, sql.SQL(" AND ").join(filters or [sql.SQL("TRUE")]), after),
+        (*params, page_size + 1)
+    )
+    return await parse_page(cur, page_size, ["rank", "product_id"], hidden, compact)
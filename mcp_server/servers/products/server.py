@@ -1,8 +1,8 @@
 from typing import Any
 from fastmcp import FastMCP
 
-from backend import handle_errors
-from servers.products.helpers import _fetch_products, _fetch_product_by_id
+from backend import handle_errors, parse_data_uri, wants_compact
+from servers.products.helpers import _fetch_products, _fetch_product_by_id, _search_products
 
 
 # Define the server for product-related operations
@@ -13,19 +13,48 @@ product_server = FastMCP("Products")
 
 @product_server.resource("data://products")
 @handle_errors
-def get_all_products() -> list[dict[str, Any]]:
+async def get_all_products() -> dict[str, Any]:
     """
-    Exposes the entire products table.
+    Exposes the first page of the products table.
 
     Returns:
-        A list of dictionaries representing all products with full details.
+        A dictionary with the page of products under "items" and the token of the next page
+        under "next_cursor" (read it from data://products/page/{cursor}).
     """
-    return _fetch_products(brief=False)
+    return await _fetch_products(brief=False)
+
+
+@product_server.resource("data://products/compact")
+@handle_errors
+async def get_all_products_compact() -> dict[str, Any]:
+    """
+    Exposes the first page of the products table in the compact format.
+
+    Returns:
+        A dictionary with the column names under "columns", one list of values per product under
+        "rows" and the token of the next page (also compact) under "next_cursor".
+    """
+    return await _fetch_products(brief=False, compact=True)
+
+
+@product_server.resource("data://products/page/{cursor}")
+@handle_errors
+async def get_products_page(cursor: str) -> dict[str, Any]:
+    """
+    Exposes the page of the products table that follows the given continuation token.
+
+    Args:
+        cursor: The "next_cursor" token returned with the previous page.
+
+    Returns:
+        A dictionary with the page of products under "items" and the token of the next page.
+    """
+    return await _fetch_products(brief=False, cursor=cursor)
 
 
 @product_server.resource("data://products/product/{product_id}")
 @handle_errors
-def get_product_by_id(product_id: str) -> dict[str, Any]:
+async def get_product_by_id(product_id: str) -> dict[str, Any]:
     """
     Exposes a single product record from the products table.
 
@@ -35,7 +64,7 @@ def get_product_by_id(product_id: str) -> dict[str, Any]:
     Returns:
         A dictionary representing the product, or a failure message if not found.
     """
-    product = _fetch_product_by_id(product_id)
+    product = await _fetch_product_by_id(product_id)
     if not product:
         return {"status": "failure", "message": f"Product with ID '{product_id}' not found."}
     return product
@@ -43,7 +72,7 @@ def get_product_by_id(product_id: str) -> dict[str, Any]:
 
 @product_server.tool
 @handle_errors
-def get_product_data(
+async def get_product_data(
     data_detail: str
 ) -> list[dict[str, Any]] | dict[str, Any]:
     """
@@ -52,7 +81,15 @@ def get_product_data(
 
     data_details is the URL of the data to query. It has to be of the format
     - data://products/product/{product_id}: for a specific product given its id
-    - data://products: all the products
+    - data://products: the first page of products, sorted by product_id
+    - data://products?page_size={n}&cursor={next_cursor}: a page of products; pass the
+      "next_cursor" returned with a page to read the following one
+    Any of them accepts "fields=a,b,..." (comma-separated, no braces) to return only some
+    columns, and the listing accepts "limit={n}" as an alias of page_size, e.g.
+    data://products?fields=product_id&limit=10
+    Listings also accept "format=compact" to get {"columns": [...], "rows": [[...], ...]}
+    instead of one dictionary per row (smaller for large results); the pages that follow a
+    compact page are compact too.
 
     Args:
         data_detail: the data to retrieve
@@ -60,13 +97,69 @@ def get_product_data(
     Returns:
         A list of dictionaries representing the data.
     """
-    if data_detail.startswith("data://products/product/"):
-        product_id = data_detail.split("/")[-1]
-        return _fetch_product_by_id(product_id)
-    elif data_detail == "data://products":
-        return _fetch_products()
+    # Split the query parameters from the requested data URI
+    path, params = parse_data_uri(data_detail)
+    if path.startswith("data://products/product/"):
+        product_id = path.split("/")[-1]
+        return await _fetch_product_by_id(product_id, fields=params.get("fields"))
+    elif path == "data://products":
+        return await _fetch_products(
+            page_size=params.get("limit") or params.get("page_size"),
+            cursor=params.get("cursor"),
+            fields=params.get("fields"),
+            compact=wants_compact(params),
+        )
     else:
         return {
             "status": "failure", 
             "message": f"Invalid data detail: {data_detail}. Please use a valid order data URL."
         }
+
+@product_server.tool
+@handle_errors
+async def search_products(
+    query: str | None = None,
+    category: str | None = None,
+    min_price: float | None = None,
+    max_price: float | None = None,
+    in_stock: bool = False,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    fields: str | None = None,
+    compact: bool = False,
+) -> dict[str, Any]:
+    """
+    Searches the product catalog on the database side, so only the matching products are returned.
+    Use it instead of listing all the products whenever the request has a filter, e.g.
+    "available hypercars under $2M" -> category="Hypercar", max_price=2000000, in_stock=True.
+
+    Args:
+        query: Free text searched in the product name and description (supports "quoted phrases",
+            "or" and -excluded words). Results are ranked by relevance when given.
+        category: The product category, case-insensitive (e.g. "Supercar", "Hypercar").
+        min_price: The minimum price, inclusive.
+        max_price: The maximum price, inclusive.
+        in_stock: Whether to return only the products with stock left.
+        page_size: The number of products per page.
+        cursor: The "next_cursor" returned with a page, to read the following one with the
+            same filters.
+        fields: Comma-separated columns to return (e.g. "product_id,product_name,price");
+            all of them when omitted.
+        compact: Whether to return {"columns": [...], "rows": [[...], ...]} instead of one
+            dictionary per product (smaller for large pages).
+
+    Returns:
+        A dictionary with the matching products under "items", most relevant first, and the
+        token of the next page under "next_cursor".
+    """
+    return await _search_products(
+        query=query,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        page_size=page_size,
+        cursor=cursor,
+        fields=fields,
+        compact=compact,
+    )
@@ -1,7 +1,21 @@
-import uuid
+import io
+import csv
+import json
+import time
+from collections import deque
 from pydantic import BaseModel, Field
 
-from backend import db_connector, parse_output
+from psycopg import sql
+
+from backend import (
+    db_connector,
+    db_reader,
+    new_id,
+    parse_output,
+    parse_page,
+    decode_cursor,
+    project_columns,
+)
 
 
 # --- Pydantic Models for Data Validation ---
@@ -18,32 +32,66 @@ class UserUpdateInfo(BaseModel):
     shipping_address: str | None = Field(None, description="New shipping address for the user.")
 
 
+# Reports of the latest bulk imports, newest first
+_import_reports = deque(maxlen=20)
+
+
+# Columns that can be selected from the users table
+USER_COLUMNS = ["user_id", "name", "email", "phone_number", "shipping_address"]
+
+
 # --- Internal Database Logic ---
 
-@db_connector
-def _fetch_users(cur, brief: bool = False):
+@db_reader
+async def _fetch_users(
+    cur,
+    brief: bool = False,
+    page_size: int | None = None,
+    cursor: str | None = None,
+    fields: str | list[str] | None = None,
+    compact: bool = False,
+):
     """
-    Fetches user data from the database.
+    Fetches a page of user data from the database, using keyset pagination on user_id.
+    Only the requested fields (whitelisted in USER_COLUMNS) are selected.
     """
-    query = "SELECT user_id, name FROM users;" if brief else "SELECT * FROM users;"
-    cur.execute(query)
-    return parse_output(cur)
+    keys, page_size, compact = decode_cursor(cursor, page_size, compact)
+    columns, hidden = project_columns(
+        fields or (["user_id", "name"] if brief else None), USER_COLUMNS, ["user_id"]
+    )
+    if keys:
+        # Continue right after the last user_id of the previous page
+        await cur.execute(
+            sql.SQL(
+                "SELECT {} FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s;"
+            ).format(columns),
+            (keys[0], page_size + 1)
+        )
+    else:
+        await cur.execute(
+            sql.SQL("SELECT {} FROM users ORDER BY user_id LIMIT %s;").format(columns),
+            (page_size + 1,)
+        )
+    return await parse_page(cur, page_size, ["user_id"], hidden, compact)
 
-@db_connector
-def _fetch_user_by_id(cur, user_id: str):
+@db_reader
+async def _fetch_user_by_id(cur, user_id: str, fields: str | list[str] | None = None):
     """
-    Fetches a single user by their ID.
+    Fetches a single user by their ID, with only the requested fields.
     """
-    cur.execute("SELECT * FROM users WHERE user_id = %s;", (user_id,))
-    return parse_output(cur, one=True)
+    columns, _ = project_columns(fields, USER_COLUMNS)
+    await cur.execute(
+        sql.SQL("SELECT {} FROM users WHERE user_id = %s;").format(columns), (user_id,)
+    )
+    return await parse_output(cur, one=True)
 
 @db_connector
-def _add_new_user(cur, user_info: NewUserInfo):
+async def _add_new_user(cur, user_info: NewUserInfo):
     """
     Adds a new user to the database.
     """
-    user_id = f"usr_{str(uuid.uuid4())[:8]}"
-    cur.execute(
+    user_id = new_id("usr")
+    await cur.execute(
         """
         INSERT INTO users (user_id, name, email, phone_number, shipping_address)
         VALUES (%s, %s, %s, %s, %s) RETURNING user_id;
@@ -51,12 +99,12 @@ def _add_new_user(cur, user_info: NewUserInfo):
         (user_id, user_info.name, user_info.email, user_info.phone_number, user_info.shipping_address)
     )
     return {
-        "user_id": cur.fetchone()[0], 
+        "user_id": (await cur.fetchone())[0], 
         "status": "success"
     }
 
 @db_connector
-def _modify_user(cur, user_id: str, user_data: UserUpdateInfo):
+async def _modify_user(cur, user_id: str, user_data: UserUpdateInfo):
     """
     Updates an existing user's data.
     """
@@ -68,7 +116,7 @@ def _modify_user(cur, user_id: str, user_data: UserUpdateInfo):
     values = list(update_fields.values()) + [user_id]
     
     query = f"UPDATE users SET {set_clause} WHERE user_id = %s;"
-    cur.execute(query, tuple(values))
+    await cur.execute(query, tuple(values))
 
     if cur.rowcount == 0:
         return {"status": "failure", "message": f"User with ID '{user_id}' not found."}
@@ -77,3 +125,101 @@ def _modify_user(cur, user_id: str, user_data: UserUpdateInfo):
         "status": "success", 
         "updated_fields": list(update_fields.keys())
     }
+
+
+def _parse_user_records(content: str, content_format: str = "csv"):
+    """
+    Parses CSV (with a header row) or JSON-lines content into validated user records.
+    Invalid records are reported instead of aborting the whole content.
+    """
+    # Read the raw records in the requested format
+    if content_format == "csv":
+        raw_records = list(csv.DictReader(io.StringIO(content)))
+    elif content_format == "jsonl":
+        raw_records = [line for line in content.splitlines() if line.strip()]
+    else:
+        raise ValueError(f"Unsupported content format '{content_format}', use 'csv' or 'jsonl'.")
+
+    # Validate each record, keeping its position for the report
+    users, lines, invalid = [], [], []
+    for line, raw in enumerate(raw_records):
+        try:
+            record = json.loads(raw) if content_format == "jsonl" else raw
+            users.append(NewUserInfo(**{k: v or None for k, v in record.items()}))
+            lines.append(line)
+        except (ValueError, TypeError, AttributeError) as e:
+            invalid.append({"line": line, "error_type": type(e).__name__, "error_message": str(e)})
+    return users, lines, invalid
+
+@db_connector
+async def _import_users(cur, users: list[NewUserInfo], lines: list[int] | None = None):
+    """
+    Bulk imports users: rows are loaded with COPY into a staging table, then merged into users.
+    Rows whose email already exists, or appears earlier in the same batch, are reported as
+    conflicts and skipped without aborting the rest of the batch.
+    """
+    start = time.perf_counter()
+    lines = lines if lines is not None else list(range(len(users)))
+
+    # Stage the rows with COPY, the fastest way to load many rows
+    await cur.execute(
+        """
+        CREATE TEMP TABLE users_import (
+            line INTEGER NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            phone_number VARCHAR(255),
+            shipping_address TEXT
+        ) ON COMMIT DROP;
+        """
+    )
+    async with cur.copy(
+        "COPY users_import (line, user_id, name, email, phone_number, shipping_address) FROM STDIN"
+    ) as copy:
+        for line, user in zip(lines, users):
+            await copy.write_row(
+                (line, new_id("usr"), user.name, user.email,
+                 user.phone_number, user.shipping_address)
+            )
+
+    # Merge the first row of every email into users and report the rows that were skipped
+    await cur.execute(
+        """
+        WITH ranked AS (
+            SELECT *, row_number() OVER (PARTITION BY email ORDER BY line) AS email_rank
+            FROM users_import
+        ), inserted AS (
+            INSERT INTO users (user_id, name, email, phone_number, shipping_address)
+            SELECT user_id, name, email, phone_number, shipping_address FROM ranked
+            WHERE email_rank = 1
+            ON CONFLICT (email) DO NOTHING
+            RETURNING user_id
+        )
+        SELECT line, email, email_rank > 1 AS duplicate_in_batch FROM ranked
+        WHERE user_id NOT IN (SELECT user_id FROM inserted)
+        ORDER BY line;
+        """
+    )
+    conflicts = [
+        {
+            "line": line,
+            "email": email,
+            "error_type": "EmailConflict",
+            "error_message": (
+                f"Email '{email}' appears earlier in this batch." if duplicate_in_batch
+                else f"A user with email '{email}' already exists."
+            ),
+        }
+        for line, email, duplicate_in_batch in await cur.fetchall()
+    ]
+    elapsed = time.perf_counter() - start
+    created = len(users) - len(conflicts)
+    return {
+        "status": "success" if not conflicts else "partial" if created else "failure",
+        "received": len(users),
+        "created": created,
+        "conflicts": conflicts,
+        "seconds": round(elapsed, 4),
+        "rows_per_second": round(len(users) / elapsed, 1) if elapsed else None,
+    }
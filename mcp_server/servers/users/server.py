@@ -1,14 +1,18 @@
 from typing import Any
+from datetime import datetime, timezone
 from fastmcp import FastMCP
 
-from backend import handle_errors
+from backend import handle_errors, parse_data_uri, wants_compact
 from servers.users.helpers import (
     NewUserInfo, 
     UserUpdateInfo,
     _fetch_users, 
     _fetch_user_by_id, 
     _add_new_user,
-    _modify_user
+    _modify_user,
+    _import_users,
+    _import_reports,
+    _parse_user_records,
 )
 
 
@@ -20,18 +24,45 @@ user_server = FastMCP("Users")
 
 @user_server.resource("data://users")
 @handle_errors
-def get_all_users() -> list[dict[str, Any]]:
+async def get_all_users() -> dict[str, Any]:
     """
-    Exposes the entire users table.
+    Exposes the first page of the users table.
 
     Returns:
-        A list of dictionaries representing all users with full details.
+        A dictionary with the page of users under "items" and the token of the next page
+        under "next_cursor" (read it from data://users/page/{cursor}).
     """
-    return _fetch_users(brief=False)
+    return await _fetch_users(brief=False)
+
+@user_server.resource("data://users/compact")
+@handle_errors
+async def get_all_users_compact() -> dict[str, Any]:
+    """
+    Exposes the first page of the users table in the compact format.
+
+    Returns:
+        A dictionary with the column names under "columns", one list of values per user under
+        "rows" and the token of the next page (also compact) under "next_cursor".
+    """
+    return await _fetch_users(brief=False, compact=True)
+
+@user_server.resource("data://users/page/{cursor}")
+@handle_errors
+async def get_users_page(cursor: str) -> dict[str, Any]:
+    """
+    Exposes the page of the users table that follows the given continuation token.
+
+    Args:
+        cursor: The "next_cursor" token returned with the previous page.
+
+    Returns:
+        A dictionary with the page of users under "items" and the token of the next page.
+    """
+    return await _fetch_users(brief=False, cursor=cursor)
 
 @user_server.resource("data://users/user/{user_id}")
 @handle_errors
-def get_user_by_id(user_id: str) -> dict[str, Any]:
+async def get_user_by_id(user_id: str) -> dict[str, Any]:
     """
     Exposes a single user record from the users table.
 
@@ -41,16 +72,28 @@ def get_user_by_id(user_id: str) -> dict[str, Any]:
     Returns:
         A dictionary representing the user, or a failure message if not found.
     """
-    user = _fetch_user_by_id(user_id)
+    user = await _fetch_user_by_id(user_id)
     if not user:
         return {"status": "failure", "message": f"User with ID '{user_id}' not found."}
     return user
 
+@user_server.resource("data://users/imports")
+@handle_errors
+async def get_user_imports() -> list[dict[str, Any]]:
+    """
+    Exposes the reports of the latest bulk user imports, newest first.
+
+    Returns:
+        A list of dictionaries with, for each import, the rows received and created, the
+        per-row conflicts and the load speed in rows per second.
+    """
+    return list(_import_reports)
+
 # --- MCP Tools (to be used by an agent) ---
 
 @user_server.tool
 @handle_errors
-def add_new_user(user_info: NewUserInfo) -> dict[str, Any]:
+async def add_new_user(user_info: NewUserInfo) -> dict[str, Any]:
     """
     Adds a new user with the provided information.
 
@@ -60,11 +103,46 @@ def add_new_user(user_info: NewUserInfo) -> dict[str, Any]:
     Returns:
         A dictionary with the new user's ID and a success status.
     """
-    return _add_new_user(user_info)
+    return await _add_new_user(user_info)
+
+@user_server.tool
+@handle_errors
+async def import_users(
+    users: list[NewUserInfo] | None = None,
+    content: str | None = None,
+    content_format: str = "csv",
+) -> dict[str, Any]:
+    """
+    Bulk imports many users at once (e.g. a partner's customer list).
+
+    Args:
+        users: The users to import, as a list of models with name, email and optional details.
+        content: Alternatively, the users as raw text: CSV with a header row
+            (name,email,phone_number,shipping_address) or one JSON object per line.
+        content_format: The format of content, "csv" or "jsonl".
+
+    Returns:
+        A dictionary with the number of users received and created, the rows skipped because
+        their email already exists or is repeated in the batch, the invalid rows and the load
+        speed in rows per second.
+    """
+    # Collect the records, from the models or from the raw content
+    lines, invalid = None, []
+    if content is not None:
+        users, lines, invalid = _parse_user_records(content, content_format)
+
+    # Load the valid records and keep the report for data://users/imports
+    report = {
+        **await _import_users(users or [], lines),
+        "invalid": invalid,
+        "imported_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _import_reports.appendleft(report)
+    return report
 
 @user_server.tool
 @handle_errors
-def modify_user_info(user_id: str, updates: UserUpdateInfo) -> dict[str, Any]:
+async def modify_user_info(user_id: str, updates: UserUpdateInfo) -> dict[str, Any]:
     """
     Updates one or more details for an existing user.
 
@@ -75,12 +153,12 @@ def modify_user_info(user_id: str, updates: UserUpdateInfo) -> dict[str, Any]:
     Returns:
         A dictionary confirming the update.
     """
-    return _modify_user(user_id, updates)
+    return await _modify_user(user_id, updates)
 
 
 @user_server.tool
 @handle_errors
-def get_user_data(
+async def get_user_data(
     data_detail: str
 ) -> list[dict[str, Any]] | dict[str, Any]:
     """
@@ -89,7 +167,15 @@ def get_user_data(
 
     data_detail is the URL of the data to query. It has to be of the format
     - data://users/user/{user_id}: for a specific user given its id
-    - data://users: all the users
+    - data://users: the first page of users, sorted by user_id
+    - data://users?page_size={n}&cursor={next_cursor}: a page of users; pass the
+      "next_cursor" returned with a page to read the following one
+    Any of them accepts "fields=a,b,..." (comma-separated, no braces) to return only some
+    columns, and the listing accepts "limit={n}" as an alias of page_size, e.g.
+    data://users?fields=user_id&limit=10
+    Listings also accept "format=compact" to get {"columns": [...], "rows": [[...], ...]}
+    instead of one dictionary per row (smaller for large results); the pages that follow a
+    compact page are compact too.
 
     Args:
         data_detail: the data to retrieve
@@ -97,11 +183,18 @@ def get_user_data(
     Returns:
         A list of dictionaries representing the data.
     """
-    if data_detail.startswith("data://users/user/"):
-        user_id = data_detail.split("/")[-1]
-        return _fetch_user_by_id(user_id)
-    elif data_detail == "data://users":
-        return _fetch_users()
+    # Split the query parameters from the requested data URI
+    path, params = parse_data_uri(data_detail)
+    if path.startswith("data://users/user/"):
+        user_id = path.split("/")[-1]
+        return await _fetch_user_by_id(user_id, fields=params.get("fields"))
+    elif path == "data://users":
+        return await _fetch_users(
+            page_size=params.get("limit") or params.get("page_size"),
+            cursor=params.get("cursor"),
+            fields=params.get("fields"),
+            compact=wants_compact(params),
+        )
     else:
         return {
             "status": "failure", 
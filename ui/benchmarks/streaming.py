@@ -0,0 +1,125 @@
+"""
+Time-to-first-visible-output benchmark, with a stubbed local model.
+
+Runs the same exchange --repeat times through the agent of bot.py, built with a stub chat model
+instead of Gemini: the model first calls the users_get_user_data tool of the MCP server at
+MCP_SERVER_URL, then writes a --words word answer, one word every --token-delay seconds after a
+--think-delay wait before each response. Compares:
+- blocking: the answer is shown once agent.ainvoke returns (the former UI);
+- streaming: the UI shows the first stream_agent event (a tool call starting), then the tokens.
+It reports the time to the first visible output, to the first answer token and to the end.
+
+Usage (from the ui directory):
+    python -m benchmarks.streaming --repeat 10 --think-delay 0.5 --token-delay 0.02
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from bot import build_agent, get_tools, run_on_agent_loop, stream_agent
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model stub: calls a tool on the first step, then streams a fixed answer.
+    """
+    think_delay: float = 0.5
+    token_delay: float = 0.02
+    words: int = 60
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _response(self, messages) -> AIMessage:
+        # Call the tool until a tool result is in the conversation, then answer
+        if not any(isinstance(message, ToolMessage) for message in messages):
+            return AIMessage(content="", tool_calls=[{
+                "name": "users_get_user_data",
+                "args": {"data_detail": "data://users/user/usr_001"},
+                "id": "call_1",
+            }])
+        return AIMessage(content=" ".join(f"word{i}" for i in range(self.words)))
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.think_delay + self.token_delay * self.words)
+        return ChatResult(generations=[ChatGeneration(message=self._response(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.think_delay + self.token_delay * self.words)
+        return ChatResult(generations=[ChatGeneration(message=self._response(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.think_delay)
+        response = self._response(messages)
+        if response.tool_calls:
+            call = response.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[{
+                "name": call["name"], "args": json.dumps(call["args"]), "id": call["id"],
+                "index": 0,
+            }]))
+            return
+        for i, word in enumerate(response.content.split(" ")):
+            await asyncio.sleep(self.token_delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=("" if i == 0 else " ") + word))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+async def main(args: argparse.Namespace):
+    """
+    Times both modes and prints a comparison table.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    # The agent of bot.py, with the stub model and the tools of the persistent MCP session
+    llm = StubChatModel(think_delay=args.think_delay, token_delay=args.token_delay, words=args.words)
+    agent = build_agent(llm, await run_on_agent_loop(get_tools()))
+    agent.verbose = False
+    inputs = {"chat_history": [], "input": "Show me the profile of usr_001."}
+
+    results = {"blocking": [], "streaming": []}
+    for _ in range(args.repeat):
+        # Blocking: nothing is visible until the agent returns
+        start = time.perf_counter()
+        await run_on_agent_loop(agent.ainvoke(inputs))
+        elapsed = (time.perf_counter() - start) * 1000
+        results["blocking"].append((elapsed, elapsed, elapsed))
+
+        # Streaming: the first event is visible, then every token
+        start = time.perf_counter()
+        first_event = first_token = None
+        async for event in stream_agent(inputs, agent):
+            now = (time.perf_counter() - start) * 1000
+            first_event = first_event or now
+            if event["type"] == "token":
+                first_token = first_token or now
+        results["streaming"].append((first_event, first_token, (time.perf_counter() - start) * 1000))
+
+    print(
+        f"{args.repeat} runs, think {args.think_delay}s per step, {args.words} words at "
+        f"{args.token_delay}s"
+    )
+    print(f"{'mode':>10} {'first_visible_ms':>17} {'first_token_ms':>15} {'total_ms':>9}")
+    for name, timings in results.items():
+        first_visible, first_token, total = (statistics.median(values) for values in zip(*timings))
+        print(f"{name:>10} {first_visible:>17.1f} {first_token:>15.1f} {total:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="Runs of each mode.")
+    parser.add_argument("--think-delay", type=float, default=0.5, help="Model wait per step (s).")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Model wait per word (s).")
+    parser.add_argument("--words", type=int, default=60, help="Words in the answer.")
+    asyncio.run(main(parser.parse_args()))
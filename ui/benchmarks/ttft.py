@@ -0,0 +1,108 @@
+"""
+Agent time-to-first-token benchmark.
+
+Sends the same message --repeat times through two agent setups, against the MCP server at
+MCP_SERVER_URL:
+- reinit: the agent rebuilt for every message, as before: a new MultiServerMCPClient listing the
+  tools over a new session, and a new chat model and agent executor;
+- persistent: the process-wide agent of bot.py, reusing its MCP session, cached tools and model.
+For each message it reports the time until the chat model is called (the setup overhead) and,
+unless --skip-model is given, until its first streamed token (which needs a valid GOOGLE_API_KEY).
+
+Usage (from the ui directory):
+    python -m benchmarks.ttft --repeat 10 --message "List all available hypercars."
+    python -m benchmarks.ttft --repeat 50 --skip-model
+"""
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from langchain_mcp_adapters.client import MultiServerMCPClient
+
+from bot import build_agent, build_llm, initialize_agent, run_on_agent_loop
+
+
+async def reinit_agent():
+    """
+    Builds the agent the way it was built for every message before it was made persistent.
+    """
+    mcp_client = MultiServerMCPClient({
+        "fastmcp": {
+            "url": os.environ['MCP_SERVER_URL'],
+            "transport": "streamable_http",
+        }
+    })
+    return build_agent(build_llm(), await mcp_client.get_tools())
+
+
+async def first_events(
+    agent, inputs: dict, start: float, skip_model: bool
+) -> tuple[float, float | None]:
+    """
+    Streams the agent events until the first token.
+
+    Args:
+        agent: The agent executor.
+        inputs: The agent inputs.
+        start: The perf_counter time at which the message was sent.
+        skip_model: Whether to stop at the chat model call, without waiting for the model.
+
+    Returns:
+        The milliseconds until the chat model was called and until its first token (None if the
+        model failed, e.g. without a valid API key).
+    """
+    model_ms = None
+    try:
+        async for event in agent.astream_events(inputs, version="v2"):
+            if event["event"] == "on_chat_model_start" and model_ms is None:
+                model_ms = (time.perf_counter() - start) * 1000
+                if skip_model:
+                    break
+            elif event["event"] == "on_chat_model_stream":
+                return model_ms, (time.perf_counter() - start) * 1000
+    except Exception:
+        pass
+    return model_ms, None
+
+
+async def main(args: argparse.Namespace):
+    """
+    Times both setups and prints a comparison table.
+
+    Args:
+        args: The parsed command line arguments.
+    """
+    inputs = {"chat_history": [], "input": args.message}
+    results = {"reinit": [], "persistent": []}
+    for _ in range(args.repeat):
+        # The agent rebuilt for the message, on the caller's loop
+        start = time.perf_counter()
+        results["reinit"].append(await first_events(await reinit_agent(), inputs, start, args.skip_model))
+
+        # The process-wide agent, on its own long-lived loop
+        start = time.perf_counter()
+        agent = await initialize_agent()
+        results["persistent"].append(
+            await run_on_agent_loop(first_events(agent, inputs, start, args.skip_model))
+        )
+
+    print(f"{args.repeat} messages: {args.message!r}")
+    print(f"{'setup':>11} {'to_model_p50_ms':>16} {'ttft_p50_ms':>12}")
+    for name, timings in results.items():
+        to_model = [model_ms for model_ms, _ in timings if model_ms is not None]
+        ttft = [ttft_ms for _, ttft_ms in timings if ttft_ms is not None]
+        print(
+            f"{name:>11} {statistics.median(to_model) if to_model else float('nan'):>16.2f} "
+            f"{statistics.median(ttft) if ttft else float('nan'):>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--message", default="List all available hypercars.", help="The message.")
+    parser.add_argument("--repeat", type=int, default=10, help="Messages sent to each setup.")
+    parser.add_argument(
+        "--skip-model", action="store_true", help="Stop at the chat model call (no API key needed)."
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -1,7 +1,14 @@
 import os
+import re
+import time
+import asyncio
+import threading
+from mcp import ClientSession
+from mcp.types import ServerNotification, ToolListChangedNotification
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langchain_mcp_adapters.tools import load_mcp_tools
 
 
 #from langgraph.prebuilt import create_tool_calling_agent
@@ -25,23 +32,162 @@ When answering a question, follow these guidelines:
 - Display JSON as tables if the JSON contains more than one record.
 """
 
-async def initialize_agent():
+# Chat history budget: estimated tokens of history sent with each message, and the number of most
+# recent turns (a user message and its answer) always kept verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", "2"))
+
+# Bulky blocks of older answers, replaced by references: markdown tables and fenced code/JSON
+TABLE_PATTERN = re.compile(r"(?:^[ \t]*\|.*\|[ \t]*(?:\n|$))+", re.MULTILINE)
+CODE_PATTERN = re.compile(r"```.*?(?:```|$)", re.DOTALL)
+
+# Process-wide agent state, shared by every Streamlit session: the event loop all agent and MCP
+# coroutines run on, the open MCP session, the cached tools, the agent and the tools list it was
+# built from (the agent keeps its own copy of the list, so it cannot be compared to _tools)
+_loop = None
+_loop_lock = threading.Lock()
+_session = None
+_session_closing = None
+_session_lock = None
+_tools = None
+_agent = None
+_agent_tools = None
+
+
+def get_agent_loop() -> asyncio.AbstractEventLoop:
     """
-    Initializes the LangGraph agent, and other session state variables.
+    Returns the process-wide event loop of the agent, started on first use in a daemon thread.
+
+    Notes:
+        - Streamlit runs every script rerun with a new event loop (asyncio.run), but the MCP
+          session and the Gemini async client are bound to the loop they were created on. Running
+          them on one long-lived loop is what lets them be reused across messages, instead of
+          re-initializing the agent for each one.
+    """
+    global _loop
+    # Start the loop once, even if several sessions ask at the same time
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="agent-loop", daemon=True).start()
+    return _loop
+
+
+async def run_on_agent_loop(coro):
+    """
+    Runs a coroutine on the agent event loop and awaits its result from the calling loop.
+
+    Args:
+        coro: The coroutine, e.g. an agent invocation.
 
     Returns:
-        An executable LangGraph agent and a list for storing chat messages.
+        The result of the coroutine.
+    """
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, get_agent_loop()))
+
+
+async def _handle_server_message(message):
+    """
+    Marks the cached tools stale when the server announces that its tool list changed.
     """
+    global _tools
+    if isinstance(message, ServerNotification) and isinstance(
+        message.root, ToolListChangedNotification
+    ):
+        _tools = None
+
+
+async def _hold_session(ready: asyncio.Future):
+    """
+    Opens the streamable-HTTP MCP session and keeps it open until it is closed.
+
+    Notes:
+        - The transport must be closed by the task that opened it, so one task owns the session
+          for its whole life and the others only use it.
+    """
+    global _session, _session_closing
     # initialize MCP client
     mcp_client = MultiServerMCPClient({
         "fastmcp": {
             "url": os.environ['MCP_SERVER_URL'],
             "transport": "streamable_http",
+            "session_kwargs": {"message_handler": _handle_server_message},
         }
     })
-    # Fetch tools from MCP client
-    tools = await mcp_client.get_tools()
+    try:
+        async with mcp_client.session("fastmcp") as session:
+            _session, _session_closing = session, asyncio.Event()
+            ready.set_result(session)
+            await _session_closing.wait()
+    except Exception as e:
+        if not ready.done():
+            ready.set_exception(e)
+    finally:
+        _session = None
+
+
+async def get_mcp_session() -> ClientSession:
+    """
+    Returns the process-wide MCP session, opening it on first use.
+    Must run on the agent event loop.
+
+    Returns:
+        An initialized MCP client session.
+    """
+    global _session_lock
+    if _session_lock is None:
+        _session_lock = asyncio.Lock()
+    # Open the session once, even if several messages arrive at the same time
+    async with _session_lock:
+        if _session is None:
+            ready = asyncio.get_running_loop().create_future()
+            asyncio.create_task(_hold_session(ready))
+            await ready
+    return _session
+
+
+async def close_mcp_session():
+    """
+    Closes the process-wide MCP session and drops the cached tools and agent, so the next message
+    reconnects and reloads them. Must run on the agent event loop.
+    """
+    global _tools, _agent
+    if _session_closing is not None:
+        _session_closing.set()
+    _tools, _agent = None, None
 
+
+async def get_tools() -> list:
+    """
+    Returns the tools of the MCP server, listed once and cached until the server announces a
+    change to its tool list. Must run on the agent event loop.
+
+    Returns:
+        The MCP tools as LangChain tools, bound to the process-wide session.
+    """
+    global _tools
+    if _tools is None:
+        _tools = await load_mcp_tools(await get_mcp_session())
+    return _tools
+
+
+def build_llm() -> ChatGoogleGenerativeAI:
+    """
+    Creates the chat model.
+    """
+    return ChatGoogleGenerativeAI(
+        model=os.environ['GOOGLE_GEMINI_MODEL'],
+        temperature=0.1,
+        max_tokens=None,
+        timeout=None,
+        max_retries=5
+    )
+
+
+def build_agent(llm: ChatGoogleGenerativeAI, tools: list) -> AgentExecutor:
+    """
+    Creates the tool-calling agent executor for a chat model and a list of tools.
+    """
     # Create the prompt template
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -52,17 +198,8 @@ async def initialize_agent():
         ]
     )
 
-    # Initialize chat model
-    llm = ChatGoogleGenerativeAI(
-        model=os.environ['GOOGLE_GEMINI_MODEL'],
-        temperature=0.1,
-        max_tokens=None,
-        timeout=None,
-        max_retries=5
-    )
-
     # define agent
-    agent_executor = AgentExecutor(
+    return AgentExecutor(
         agent=create_tool_calling_agent(
             llm=llm,
             prompt=prompt,
@@ -73,10 +210,227 @@ async def initialize_agent():
         handle_parsing_errors=True,
     )
 
-    # Initialize messages list for chat history
-    # This is not ideal, but I am not interested in the agent definition
-    # For the purpose of the demo this is enough
-    return agent_executor
+
+async def _initialize_agent() -> AgentExecutor:
+    """
+    Returns the process-wide agent, rebuilt only when the cached tools were reloaded.
+    Must run on the agent event loop.
+    """
+    global _agent, _agent_tools
+    tools = await get_tools()
+    if _agent is None or _agent_tools is not tools:
+        _agent, _agent_tools = build_agent(build_llm(), tools), tools
+    return _agent
+
+
+async def initialize_agent():
+    """
+    Initializes the LangGraph agent, and other session state variables.
+
+    Returns:
+        An executable LangGraph agent, to invoke with invoke_agent.
+    """
+    return await run_on_agent_loop(_initialize_agent())
+
+
+def _session_lost() -> bool:
+    """
+    Tells whether the MCP session was closed, e.g. because the server restarted.
+    """
+    return _session is None or _session_closing.is_set()
+
+
+async def invoke_agent(inputs: dict) -> dict:
+    """
+    Invokes the agent on the agent event loop, reconnecting once if the MCP session was lost
+    (e.g. the server restarted).
+
+    Args:
+        inputs: The agent inputs: "input" and "chat_history".
+
+    Returns:
+        The agent response, with the answer under "output".
+    """
+    async def invoke():
+        try:
+            return await (await _initialize_agent()).ainvoke(inputs)
+        except Exception:
+            if not _session_lost():
+                raise
+            # The session is gone: reconnect, reload the tools and try again
+            await close_mcp_session()
+            return await (await _initialize_agent()).ainvoke(inputs)
+
+    return await run_on_agent_loop(invoke())
+
+
+def _chunk_text(content) -> str:
+    """
+    Extracts the text of a streamed model chunk: a string, or a list of content parts.
+    """
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "") for part in content
+    )
+
+
+async def stream_agent(inputs: dict, agent: AgentExecutor | None = None):
+    """
+    Runs the agent on the agent event loop and streams its progress to the calling loop.
+
+    Args:
+        inputs: The agent inputs: "input" and "chat_history".
+        agent: The agent executor to run, the process-wide agent by default.
+
+    Returns:
+        An async iterator of events, as dictionaries with a "type":
+        - "token": a piece of model output, under "text";
+        - "tool_start": a tool call started, with the tool "name" and its "run_id";
+        - "tool_end": a tool call ended, with its "name", "run_id", duration in "seconds" and
+          whether it "failed";
+        - "output": the final answer, under "output".
+
+    Notes:
+        - Like invoke_agent, it reconnects once if the MCP session was lost, as long as nothing
+          was streamed yet.
+    """
+    loop, queue, done = asyncio.get_running_loop(), asyncio.Queue(), object()
+
+    def emit(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    async def pump(retry: bool = True):
+        # Translate the agent events, timing each tool call
+        started, emitted = {}, False
+        try:
+            runner = agent or await _initialize_agent()
+            async for event in runner.astream_events(inputs, version="v2"):
+                kind, data = event["event"], event["data"]
+                if kind == "on_chat_model_stream" and (text := _chunk_text(data["chunk"].content)):
+                    emit({"type": "token", "text": text})
+                elif kind == "on_tool_start":
+                    started[event["run_id"]] = time.perf_counter()
+                    emit({"type": "tool_start", "name": event["name"], "run_id": event["run_id"]})
+                elif kind in ("on_tool_end", "on_tool_error"):
+                    start = started.pop(event["run_id"], time.perf_counter())
+                    emit({
+                        "type": "tool_end",
+                        "name": event["name"],
+                        "run_id": event["run_id"],
+                        "seconds": time.perf_counter() - start,
+                        "failed": kind == "on_tool_error",
+                    })
+                elif kind == "on_chain_end" and not event["parent_ids"]:
+                    emit({"type": "output", "output": data["output"].get("output")})
+                else:
+                    continue
+                emitted = True
+        except Exception as e:
+            if emitted or not retry or agent is not None or not _session_lost():
+                emit(e)
+                return
+            # The session is gone before anything was streamed: reconnect and try again
+            await close_mcp_session()
+            await pump(retry=False)
+            return
+        emit(done)
+
+    # Pump on the agent loop, stopping it if the caller stops reading
+    future = asyncio.run_coroutine_threadsafe(pump(), get_agent_loop())
+    try:
+        while (item := await queue.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens of a text, at about four characters per token.
+
+    Notes:
+        - An estimate is enough to keep a budget, and it avoids a token-counting API call.
+    """
+    return (len(text) + 3) // 4
+
+
+def compact_message(content: str) -> str:
+    """
+    Replaces the bulky blocks of an answer by short references: markdown tables (usually tool
+    output rendered by the model) and fenced code or JSON blocks.
+
+    Args:
+        content: The message text.
+
+    Returns:
+        The text, with e.g. "[table of 12 rows omitted]" in place of a table.
+    """
+    content = TABLE_PATTERN.sub(
+        lambda m: f"[table of {max(m.group().count(chr(10)) - 2, 1)} rows omitted]\n", content
+    )
+    return CODE_PATTERN.sub(
+        lambda m: f"[code block of {m.group().count(chr(10)) - 1} lines omitted]", content
+    )
+
+
+def build_chat_history(
+    messages: list[dict], user_input: str = "", budget: int = HISTORY_TOKEN_BUDGET,
+    recent_turns: int = HISTORY_RECENT_TURNS
+) -> tuple[list[dict], dict]:
+    """
+    Builds the chat history sent to the agent within a token budget.
+
+    Args:
+        messages: The whole conversation, as dictionaries with "role" and "content" keys.
+        user_input: The new user message, counted in the reported prompt size.
+        budget: The estimated tokens the history may take.
+        recent_turns: The number of most recent turns kept verbatim.
+
+    Returns:
+        The history messages, and the prompt size report: estimated tokens of the system prompt,
+        history and input, and the numbers of messages kept, compacted and summarized.
+
+    Notes:
+        - Older messages are compacted first (bulky blocks replaced by references). If the history
+          is still over budget, the oldest turns are folded, oldest first, into one message
+          listing what the user asked. The recent turns are kept even over budget.
+    """
+    # Keep the recent turns verbatim and compact the older ones (only roles and contents are sent)
+    split = max(len(messages) - 2 * recent_turns, 0)
+    older = [
+        {"role": m["role"], "content": compact_message(m["content"])} for m in messages[:split]
+    ]
+    compacted = sum(o["content"] != m["content"] for o, m in zip(older, messages))
+    recent = [{"role": m["role"], "content": m["content"]} for m in messages[split:]]
+
+    # Fold the oldest messages into a recap until the history fits the budget
+    def size(history: list[dict]) -> int:
+        return sum(count_tokens(m["content"]) for m in history)
+
+    folded, recap = 0, []
+    while older and size(recap + older + recent) > budget:
+        folded += 1
+        asked = [m["content"] for m in messages[:folded] if m["role"] == "user"]
+        recap = [{
+            "role": "assistant",
+            "content": "Summary of the earlier conversation, the user asked: "
+                       + "; ".join(a[:100] for a in asked),
+        }]
+        older = older[1:]
+    history = recap + older + recent
+
+    return history, {
+        "system_tokens": count_tokens(SYSTEM_PROMPT),
+        "history_tokens": size(history),
+        "input_tokens": count_tokens(user_input),
+        "prompt_tokens": count_tokens(SYSTEM_PROMPT) + size(history) + count_tokens(user_input),
+        "messages_kept": len(older) + len(recent),
+        "messages_compacted": compacted,
+        "messages_summarized": folded,
+    }
 
 
 async def initialize_session() -> tuple[AgentExecutor, list]:
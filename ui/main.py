@@ -1,6 +1,6 @@
 import asyncio
 import streamlit as st
-from bot import initialize_session, initialize_agent
+from bot import initialize_session, stream_agent, build_chat_history
 
 
 
@@ -29,7 +29,12 @@ async def app():
 
     # Display past messages from the chat history
     for msg in st.session_state.messages:
-        st.chat_message(msg["role"]).write(msg["content"])
+        with st.chat_message(msg["role"]):
+            for tool_call in msg.get("tool_calls", []):
+                st.caption(tool_call)
+            st.write(msg["content"])
+            if "prompt_size" in msg:
+                st.caption(msg["prompt_size"])
 
     # --- Chat Logic ---
 
@@ -42,28 +47,64 @@ async def app():
         # The 'chat_history' is often managed internally by the agent graph,
         # but we can pass it if the agent is designed for it.
         # For this setup, we rely on the prompt template placeholders.
-
-        # Invoke the agent and get the response
-        with st.spinner("Thinking..."):
-            
-            # NOTE: re-initializing the agent is only needed with GEMINI models
-            # when running in asyncronous mode
-            # This is a known issue: https://github.com/pydantic/pydantic-ai/issues/748
-            st.session_state.agent = await initialize_agent()
-
-            # invoke agent and get answer
-            response = await st.session_state.agent.ainvoke(
+        # Older turns are compacted or summarized to keep the history within its token budget.
+        chat_history, prompt_stats = build_chat_history(st.session_state.messages, prompt)
+        prompt_size = (
+            f"Prompt: ~{prompt_stats['prompt_tokens']} tokens "
+            f"({prompt_stats['history_tokens']} of history: {prompt_stats['messages_kept']} "
+            f"messages, {prompt_stats['messages_compacted']} compacted, "
+            f"{prompt_stats['messages_summarized']} summarized)"
+        )
+
+        # Stream the agent response: tool calls as they run, then the answer as it is written
+        with st.chat_message("assistant"):
+            tools_area = st.container()
+            answer_area = st.empty()
+            answer_area.markdown("_Thinking..._")
+
+            # NOTE: GEMINI models in asyncronous mode break when called from a new event loop,
+            # and Streamlit uses one per rerun (https://github.com/pydantic/pydantic-ai/issues/748).
+            # The agent runs on a long-lived loop of its own instead, so it is not re-initialized
+            # and its MCP session and tools are reused across messages.
+
+            # stream agent events and render them as they arrive
+            streamed, bot_response, tool_lines, tool_calls = "", None, {}, []
+            async for event in stream_agent(
                 {
-                    "chat_history": st.session_state.messages,
+                    "chat_history": chat_history,
                     "input": prompt,
                 }
+            ):
+                if event["type"] == "token":
+                    streamed += event["text"]
+                    answer_area.markdown(streamed + "▌")
+                elif event["type"] == "tool_start":
+                    tool_lines[event["run_id"]] = tools_area.empty()
+                    tool_lines[event["run_id"]].caption(f"⏳ Running `{event['name']}`...")
+                elif event["type"] == "tool_end":
+                    tool_call = (
+                        f"{'❌' if event['failed'] else '✅'} `{event['name']}` "
+                        f"({event['seconds'] * 1000:.0f} ms)"
+                    )
+                    tool_lines[event["run_id"]].caption(tool_call)
+                    tool_calls.append(tool_call)
+                elif event["type"] == "output":
+                    bot_response = event["output"]
+
+            bot_response = bot_response or streamed or (
+                "Sorry, I encountered an issue and could not respond."
             )
-            bot_response = response.get("output", "Sorry, I encountered an issue and could not respond.")
+            answer_area.write(bot_response)
+            st.caption(prompt_size)
 
-        # Add agent's response to the chat history and display it
+        # Add the exchange to the chat history
         st.session_state.messages.append({"role": "user", "content": prompt})
-        st.session_state.messages.append({"role": "assistant", "content": bot_response})
-        st.chat_message("assistant").write(bot_response)
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": bot_response,
+            "prompt_size": prompt_size,
+            "tool_calls": tool_calls,
+        })
 
 
 if __name__ == "__main__":